@@ -1,27 +1,166 @@
-import os, sqlite3, hashlib
+import os, csv, hashlib, threading, time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from auth.db import get_pool
 
 DB_PATH = "data/users.db"
 DEFAULT_ADMIN = {"username": "admin", "password": "admin123"}
+IMPORT_BATCH_SIZE = 1000  # Пользователей на транзакцию при массовом импорте
+USER_CACHE_TTL = 30.0  # Сколько секунд найденная строка пользователя живёт в кэше
+
+# Частые запросы: одинаковый текст позволяет соединениям пула держать их подготовленными
+SQL_CREATE_USERS = """CREATE TABLE IF NOT EXISTS users (
+                     id INTEGER PRIMARY KEY, username TEXT UNIQUE,
+                     password TEXT, is_admin INTEGER DEFAULT 0)"""
+SQL_COUNT_ADMINS = "SELECT COUNT(*) FROM users WHERE is_admin=1"
+SQL_COUNT_USERS = "SELECT COUNT(*) FROM users"
+SQL_COUNT_PREFIX = "SELECT COUNT(*) FROM users WHERE username>=? AND username<?"
+SQL_FIND_USER = "SELECT id, username, password, is_admin FROM users WHERE username=?"
+SQL_INSERT_USER = "INSERT INTO users (username,password,is_admin) VALUES (?,?,?)"
+SQL_INSERT_USER_IGNORE = "INSERT OR IGNORE INTO users (username,password,is_admin) VALUES (?,?,?)"
+SQL_PAGE = "SELECT id, username, is_admin FROM users WHERE id>? ORDER BY id LIMIT ?"
+SQL_PAGE_PREFIX = ("SELECT id, username, is_admin FROM users "
+                   "WHERE id>? AND username>=? AND username<? ORDER BY id LIMIT ?")
 
 def hash_password(p): return hashlib.sha256(p.encode()).hexdigest()
 
+def _pool(): return get_pool(DB_PATH)
+
+class _UserCache:
+    """
+    LRU-кэш найденных строк пользователей по логину для verify_user.
+    Хранятся только существующие пользователи и не дольше ttl секунд:
+    отсутствующий логин всегда ищется в базе, а изменения таблицы в обход
+    этого модуля (другим процессом) видны не позже чем через ttl.
+    Сбрасывается при любом изменении таблицы через этот модуль.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: 'OrderedDict[Tuple[str, str], Tuple[float, tuple]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[tuple]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, row: tuple) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, row)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+_user_cache = _UserCache()
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("""CREATE TABLE IF NOT EXISTS users (
-                     id INTEGER PRIMARY KEY, username TEXT UNIQUE,
-                     password TEXT, is_admin INTEGER DEFAULT 0)""")
-    conn.commit()
-    cur.execute("SELECT COUNT(*) FROM users WHERE is_admin=1")
-    if cur.fetchone()[0]==0:
-        cur.execute("INSERT OR IGNORE INTO users (username,password,is_admin) VALUES (?,?,1)",
-                    (DEFAULT_ADMIN["username"], hash_password(DEFAULT_ADMIN["password"])))
-        conn.commit()
-    conn.close()
+    with _pool().connection() as conn:
+        conn.execute(SQL_CREATE_USERS)
+        if conn.execute(SQL_COUNT_ADMINS).fetchone()[0]==0:
+            conn.execute(SQL_INSERT_USER_IGNORE,
+                         (DEFAULT_ADMIN["username"], hash_password(DEFAULT_ADMIN["password"]), 1))
+    _user_cache.clear()
+
+def _find_user(username):
+    key = (os.path.abspath(DB_PATH), username)
+    row = _user_cache.get(key)
+    if row is None:
+        with _pool().connection() as conn:
+            row = conn.execute(SQL_FIND_USER, (username,)).fetchone()
+        if row is not None:
+            _user_cache.put(key, row)
+    return row
 
 def verify_user(username, password):
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("SELECT id, username, is_admin FROM users WHERE username=? AND password=?",
-                (username, hash_password(password)))
-    row = cur.fetchone(); conn.close()
-    return {"id":row[0],"username":row[1],"is_admin":bool(row[2])} if row else None
+    row = _find_user(username)
+    if row is None or row[2] != hash_password(password):
+        return None
+    return {"id":row[0],"username":row[1],"is_admin":bool(row[3])}
+
+def create_user(username: str, password: str, is_admin: bool = False) -> int:
+    """
+    Создаёт пользователя и возвращает его id.
+    При занятом логине — sqlite3.IntegrityError.
+    """
+    with _pool().connection() as conn:
+        user_id = conn.execute(SQL_INSERT_USER, (username, hash_password(password), int(is_admin))).lastrowid
+    _user_cache.clear()
+    return user_id
+
+def bulk_import_users(users: Iterable[Sequence], batch_size: int = IMPORT_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Массовое создание пользователей из (логин, пароль[, is_admin]).
+    Пишется пакетами по batch_size в одной транзакции; занятые логины
+    и строки без логина или пароля пропускаются. Возвращает (создано, пропущено).
+    """
+    created = skipped = 0
+    batch: List[tuple] = []
+
+    def flush():
+        nonlocal created, skipped
+        with _pool().connection() as conn:
+            before = conn.total_changes
+            conn.executemany(SQL_INSERT_USER_IGNORE, batch)
+            inserted = conn.total_changes - before
+        created += inserted
+        skipped += len(batch) - inserted
+        batch.clear()
+
+    for user in users:
+        username = str(user[0]).strip() if len(user) > 0 else ''
+        password = str(user[1]).strip() if len(user) > 1 else ''
+        if not username or not password:
+            skipped += 1
+            continue
+        is_admin = len(user) > 2 and str(user[2]).strip().lower() in ('1', 'true', 'yes', 'да')
+        batch.append((username, hash_password(password), int(is_admin)))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    _user_cache.clear()
+    return created, skipped
+
+def read_users_csv(path: str) -> Iterable[List[str]]:
+    """
+    Строки CSV вида логин,пароль[,is_admin]; строка заголовка «username,...» пропускается.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i == 0 and row and row[0].strip().lower() in ('username', 'login', 'логин'):
+                continue
+            if row:
+                yield row
+
+def count_users(prefix: str = '') -> int:
+    """
+    Число пользователей (с логином, начинающимся с prefix — по индексу логина).
+    """
+    with _pool().connection() as conn:
+        if prefix:
+            return conn.execute(SQL_COUNT_PREFIX, (prefix, prefix + '\uffff')).fetchone()[0]
+        return conn.execute(SQL_COUNT_USERS).fetchone()[0]
+
+def list_users(after_id: int = 0, limit: int = 200, prefix: str = '') -> List[Dict]:
+    """
+    Страница пользователей по возрастанию id, начиная после after_id
+    (постраничный проход по ключу, без OFFSET). prefix — фильтр по началу логина.
+    """
+    with _pool().connection() as conn:
+        if prefix:
+            rows = conn.execute(SQL_PAGE_PREFIX, (after_id, prefix, prefix + '\uffff', limit)).fetchall()
+        else:
+            rows = conn.execute(SQL_PAGE, (after_id, limit)).fetchall()
+    return [{"id":r[0],"username":r[1],"is_admin":bool(r[2])} for r in rows]
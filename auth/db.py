@@ -0,0 +1,129 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Прагмы выставляются один раз при создании соединения пула
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Читатели не ждут писателя
+    "PRAGMA synchronous=NORMAL",  # В WAL достаточно для целостности
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+)
+# Подготовленные выражения кэшируются в каждом соединении; соединения пула
+# живут долго, поэтому частые запросы компилируются один раз
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений SQLite. Соединения создаются по мере
+    надобности (не больше size), настраиваются один раз и возвращаются в
+    пул после использования. connection() — контекст с транзакцией:
+    фиксация при успехе, откат при исключении.
+    """
+    def __init__(self, path: str, size: int = 4, timeout: float = 5.0):
+        self.path = path
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Свободное соединение; если все заняты и пул полон — ждёт не дольше timeout.
+        """
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Нет свободного соединения с {self.path}") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            with conn:  # Транзакция: commit или rollback
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """
+        Закрывает свободные соединения; занятые закроются при возврате.
+        """
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str, size: int = 4) -> ConnectionPool:
+    """
+    Общий пул процесса для файла базы (один на путь).
+    """
+    key = os.path.abspath(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(path, size)
+        return pool
+
+
+def close_pools(path: Optional[str] = None) -> None:
+    """
+    Закрывает пул для path или все пулы процесса.
+    """
+    with _pools_lock:
+        keys = [os.path.abspath(path)] if path is not None else list(_pools)
+        for key in keys:
+            pool = _pools.pop(key, None)
+            if pool is not None:
+                pool.close()
@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from auth.auth import init_db, verify_user
-from ui.vision_ui import VisionEdgeUI
+from models.model_cache import ModelLoader
 
 class LoginWindow(tk.Tk):
     def __init__(self):
@@ -9,6 +9,8 @@ class LoginWindow(tk.Tk):
         self.title("Авторизация VisionEdge")
         self.geometry("300x180")
         self.resizable(False, False)
+        # Пока пользователь вводит пароль, веса модели загружаются в фоне в кэш процесса
+        self.model_loader = ModelLoader().start()
 
         # Логин
         ttk.Label(self, text="Логин:").pack(pady=(20, 5))
@@ -30,6 +32,8 @@ class LoginWindow(tk.Tk):
         user = verify_user(username, password)
         if user:
             self.destroy()
+            # Главное окно импортируется лениво, чтобы окно входа появлялось быстрее
+            from ui.vision_ui import VisionEdgeUI
             # Передаём user дальше (включая is_admin)
             app = VisionEdgeUI(user)
             app.protocol("WM_DELETE_WINDOW", app.on_closing)
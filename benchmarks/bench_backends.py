@@ -0,0 +1,52 @@
+"""
+Бенчмарк задержки инференса по бэкендам (torch / onnx / openvino) на CPU.
+Бэкенды без экспортированной модели или библиотеки пропускаются.
+
+Пример:
+    python -m benchmarks.bench_backends --model models/best.pt --runs 50 --threads 4
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.synthetic import noise_frames
+from models.yolo_model import (BACKEND_ONNX, BACKEND_OPENVINO, BACKEND_TORCH, YOLOModel)
+
+
+def measure(model: YOLOModel, frames, runs: int):
+    """
+    Возвращает задержки одного кадра в миллисекундах.
+    """
+    latencies = []
+    for i in range(runs):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        model.detect(frame, render=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка инференса по бэкендам")
+    parser.add_argument('--model', default='models/best.pt')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--backends', default=','.join([BACKEND_TORCH, BACKEND_ONNX, BACKEND_OPENVINO]))
+    args = parser.parse_args()
+
+    frames = noise_frames(4)
+
+    print(f"{'backend':<10} {'mean, мс':>10} {'p50, мс':>10} {'p95, мс':>10}")
+    for backend in args.backends.split(','):
+        try:
+            model = YOLOModel(args.model, backend=backend, threads=args.threads, warmup=args.warmup)
+        except (RuntimeError, ValueError) as e:
+            print(f"{backend:<10} пропущен: {e}")
+            continue
+        lat = measure(model, frames, args.runs)
+        print(f"{backend:<10} {lat.mean():>10.1f} {np.percentile(lat, 50):>10.1f} "
+              f"{np.percentile(lat, 95):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Бенчмарк базы детекций: скорость пакетной записи через фоновый поток и
+задержка индексных запросов вида «все person на камере 3 с 14:00 до 15:00».
+
+Пример:
+    python -m benchmarks.bench_detection_store --rows 10000000 --cameras 8
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from core.detection_store import DetectionStore
+
+CLASSES = {0: 'person', 1: 'car', 2: 'bicycle', 3: 'dog'}
+
+
+def fill(store: DetectionStore, rows: int, cameras: int, per_frame: int, fps: float) -> float:
+    """
+    Пишет rows детекций: у каждой камеры кадры идут с частотой fps от полуночи.
+    Возвращает время записи, с (включая дописывание очереди).
+    """
+    rng = np.random.default_rng(0)
+    session = store.start_session(note='benchmark')
+    frames = rows // per_frame
+    base = rng.random((per_frame, 7)) * 100
+    t0 = time.perf_counter()
+    for i in range(frames):
+        dets = base.copy()
+        dets[:, 5] = rng.integers(0, len(CLASSES), per_frame)
+        dets[:, 6] = -1
+        position = (i // cameras) / fps
+        store.append(session, f"cam{i % cameras}", position, dets, wall_time=position)
+    store.flush()
+    return time.perf_counter() - t0
+
+
+def timed_query(store: DetectionStore, runs: int, **filters) -> tuple:
+    """
+    Медианы задержек, мс: COUNT(*) по индексу и выборка строк целиком.
+    """
+    counts, selects = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        count = store.count(**filters)
+        t1 = time.perf_counter()
+        store.query(**filters)
+        counts.append((t1 - t0) * 1000)
+        selects.append((time.perf_counter() - t1) * 1000)
+    return count, float(np.median(counts)), float(np.median(selects))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запись и запросы к базе детекций")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cameras', type=int, default=8)
+    parser.add_argument('--per-frame', type=int, default=5, help="Детекций на кадр")
+    parser.add_argument('--fps', type=float, default=5.0, help="Кадров в секунду на камеру")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--db', help="Файл базы (по умолчанию — временный)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, 'detections.db')
+        store = DetectionStore(path, classes=CLASSES, batch_size=1024)
+        elapsed = fill(store, args.rows, args.cameras, args.per_frame, args.fps)
+        stats = store.stats()
+        print(f"Запись: {stats['detections_written']} детекций, {stats['frames_written']} кадров "
+              f"за {elapsed:.2f} с ({stats['detections_written'] / elapsed:,.0f} строк/с, "
+              f"{stats['batches_written']} транзакций)")
+
+        span = args.rows / args.per_frame / args.cameras / args.fps  # Длительность записи, с
+        hour_start = min(14 * 3600.0, max(0.0, span - 3600.0))
+        queries = {
+            'камера + класс + час': dict(source='cam3', class_name='person',
+                                         t0=hour_start, t1=hour_start + 3600),
+            'камера + минута': dict(source='cam3', t0=hour_start, t1=hour_start + 60),
+            'класс + минута': dict(class_name='dog', t0=hour_start, t1=hour_start + 60),
+        }
+        for name, filters in queries.items():
+            count, count_ms, select_ms = timed_query(store, args.runs, **filters)
+            print(f"  {name:<22} {count:>8} строк: COUNT {count_ms:8.2f} мс, выборка {select_ms:8.2f} мс")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
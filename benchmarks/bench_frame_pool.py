@@ -0,0 +1,122 @@
+"""
+Бенчмарк выделений памяти на кадр в цепочке захват -> показ.
+Сравниваются прежний путь (read, resize, копия при отрисовке, cvtColor,
+Image.fromarray) и буферы utils.frame_pool (read(image=...), letterbox в
+буфер кольца, двойной буфер отрисовки, постоянный RGBA-буфер показа), а
+также VideoProcessor.process_frame() целиком. Память считает tracemalloc:
+пик новых байт за кадр относительно начала кадра. Временные матрицы внутри
+OpenCV (не numpy-массивы) tracemalloc не видит.
+
+Пример:
+    python -m benchmarks.bench_frame_pool --width 1920 --height 1080 --frames 100
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from PIL import Image
+from benchmarks.synthetic import STAND_IN_CLASSES, StandInModel, make_video
+from core.video_processor import VideoProcessor
+from utils.frame_pool import DisplayBuffer, FramePool
+from utils.image import letterbox
+from utils.overlay import OverlayRenderer
+
+DETECTIONS = np.array([[40, 40, 200, 300, 0.9, 0], [300, 100, 420, 260, 0.6, 1]], dtype=np.float32)
+
+
+def legacy_step(state) -> None:
+    # Прежний путь: каждая стадия выделяет новый кадр
+    ret, frame = state['capture'].read()
+    frame = cv2.resize(frame, (640, 480))
+    frame = frame.copy()  # results.plot() рисовал на копии
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    Image.fromarray(frame)
+
+
+def pooled_step(state) -> None:
+    # Буферы кольца, двойной буфер отрисовки и постоянный буфер показа
+    ret, frame = state['decode'].read(state['capture'])
+    frame = letterbox(frame, (480, 640), dst=state['frames'].next((480, 640, 3)))[0]
+    frame = state['overlay'].draw(frame, DETECTIONS)
+    state['display'].update(frame)
+
+
+def processor_step(state) -> None:
+    frame = state['processor'].process_frame()
+    state['display'].update(frame)
+
+
+def open_state(name: str, path: str):
+    capture = cv2.VideoCapture(path)
+    if name == 'processor':
+        capture.release()
+        # Фиксированные детекции: замеряется конвейер, а не модель
+        processor = VideoProcessor(yolo=StandInModel(warmup=0, detections=DETECTIONS))
+        processor.start_stream(path)
+        return {'processor': processor, 'display': DisplayBuffer()}
+    return {'capture': capture, 'decode': FramePool(2), 'frames': FramePool(4),
+            'overlay': OverlayRenderer(STAND_IN_CLASSES), 'display': DisplayBuffer()}
+
+
+def close_state(state) -> None:
+    if 'processor' in state:
+        state['processor'].stop_stream()
+    else:
+        state['capture'].release()
+
+
+def run(name: str, step, path: str, frames: int, warmup: int) -> dict:
+    state = open_state(name, path)
+    for _ in range(warmup):  # Заполнение колец и буферов
+        step(state)
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        step(state)
+    elapsed = time.perf_counter() - t0
+    close_state(state)
+
+    state = open_state(name, path)
+    for _ in range(warmup):
+        step(state)
+    tracemalloc.start()
+    allocated = []
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        step(state)
+        allocated.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    close_state(state)
+    allocated = np.asarray(allocated, dtype=np.float64)
+    return {'path': name, 'ms_per_frame': elapsed / frames * 1000,
+            'kb_per_frame': allocated.mean() / 1024, 'kb_max': allocated.max() / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выделения памяти на кадр в цепочке захват -> показ")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=40,
+                        help="Кадры до замера: кольца и кэш кадров (32) заполняются")
+    parser.add_argument('--fps', type=float, default=25.0, help="Для пересчёта в МБ в минуту")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_video(os.path.join(tmp, 'bench.avi'), 2 * (args.frames + args.warmup),
+                          (args.width, args.height), args.fps)
+        print(f"Кадр {args.width}x{args.height}, {args.frames} кадров")
+        print(f"{'путь':<10} {'мс/кадр':>9} {'КБ/кадр':>10} {'макс КБ':>10} {'МБ/мин':>9}")
+        for name, step in (('legacy', legacy_step), ('pooled', pooled_step),
+                           ('processor', processor_step)):
+            r = run(name, step, path, args.frames, args.warmup)
+            per_minute = r['kb_per_frame'] * args.fps * 60 / 1024
+            print(f"{r['path']:<10} {r['ms_per_frame']:>9.2f} {r['kb_per_frame']:>10.1f} "
+                  f"{r['kb_max']:>10.1f} {per_minute:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк многопроцессного инференса: пропускная способность и задержка
+(подача кадра -> результат) в зависимости от числа процессов K.
+Строка K=0 — одна модель в текущем процессе, кадры подряд.
+По умолчанию ядра машины делятся между процессами поровну.
+
+Пример:
+    python -m benchmarks.bench_inference_pool --model models/best.pt --workers 0,1,2,4,8 --frames 200
+"""
+import argparse
+import os
+import time
+from collections import deque
+import numpy as np
+from benchmarks.synthetic import noise_frames
+from core.inference_pool import InferencePool
+from models.yolo_model import BACKEND_TORCH, YOLOModel
+
+
+def run_serial(model: YOLOModel, frames, count: int):
+    """
+    Кадры по одному в текущем процессе. Возвращает (кадров/с, задержки, мс).
+    """
+    latencies = []
+    t0 = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        model.extract_detections(model.predict(frames[i % len(frames)]))
+        latencies.append((time.perf_counter() - t) * 1000)
+    return count / (time.perf_counter() - t0), np.asarray(latencies)
+
+
+def run_pool(pool: InferencePool, frames, count: int, in_flight: int):
+    """
+    Поток кадров с не более чем in_flight кадрами в обработке; результаты
+    забираются по порядку. Возвращает (кадров/с, задержки, мс).
+    """
+    submitted: deque = deque()
+    latencies = []
+    t0 = time.perf_counter()
+    for i in range(count):
+        if len(submitted) >= in_flight:
+            pool.get()
+            latencies.append((time.perf_counter() - submitted.popleft()) * 1000)
+        submitted.append(time.perf_counter())
+        pool.submit(frames[i % len(frames)])
+    while submitted:
+        pool.get()
+        latencies.append((time.perf_counter() - submitted.popleft()) * 1000)
+    return count / (time.perf_counter() - t0), np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Инференс в K процессах: кадры/с и задержка")
+    parser.add_argument('--model', default='models/best.pt')
+    parser.add_argument('--backend', default=BACKEND_TORCH)
+    parser.add_argument('--workers', default='0,1,2,4', help="Список K через запятую (0 — без пула)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Потоков torch на процесс (по умолчанию ядра / K)")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=4, help="Кадров на прогрев перед замером")
+    parser.add_argument('--in-flight', type=int, default=None,
+                        help="Кадров в обработке одновременно (по умолчанию 2·K)")
+    parser.add_argument('--size', default='640x480', help="Размер синтетического кадра ШxВ")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    frames = noise_frames(8, (width, height))
+    cores = os.cpu_count() or 1
+
+    print(f"Ядер: {cores}, кадров: {args.frames}, кадр {width}x{height}")
+    print(f"{'K':>3} {'потоков':>8} {'кадров/с':>10} {'p50, мс':>10} {'p95, мс':>10} {'старт, с':>9}")
+    for workers in (int(k) for k in args.workers.split(',')):
+        threads = args.threads or max(1, cores // max(1, workers))
+        t0 = time.perf_counter()
+        if workers == 0:
+            model = YOLOModel(args.model, backend=args.backend, threads=threads, warmup=args.warmup)
+            startup = time.perf_counter() - t0
+            fps, lat = run_serial(model, frames, args.frames)
+        else:
+            with InferencePool(workers, args.model, args.backend, threads=threads,
+                               slot_bytes=frames[0].nbytes) as pool:
+                startup = time.perf_counter() - t0
+                in_flight = args.in_flight or 2 * workers
+                run_pool(pool, frames, args.warmup * workers, in_flight)
+                fps, lat = run_pool(pool, frames, args.frames, in_flight)
+        print(f"{workers:>3} {threads:>8} {fps:>10.1f} {np.percentile(lat, 50):>10.1f} "
+              f"{np.percentile(lat, 95):>10.1f} {startup:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
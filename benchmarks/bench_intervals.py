@@ -0,0 +1,111 @@
+"""
+Бенчмарк расчёта интервалов присутствия на синтетическом журнале.
+
+Пример:
+    python -m benchmarks.bench_intervals --frames 1000000 --classes 10
+"""
+import argparse
+import time
+import numpy as np
+from utils.detection_log import DetectionLog
+from utils.intervals import PresenceIntervals, compute_intervals, intervals_from_log
+
+
+def legacy_intervals(detection_log, min_duration=2):
+    """
+    Прежний алгоритм utils.report.generate_report — базовая линия.
+    """
+    intervals, seen, prev_time = {}, {}, {}
+    for time_sec, classes in detection_log:
+        for cls in classes:
+            if cls not in seen:
+                seen[cls] = time_sec
+        for cls in list(seen.keys()):
+            if cls not in classes:
+                start = seen.pop(cls)
+                end = prev_time.get(cls, time_sec)
+                if end - start >= min_duration:
+                    intervals.setdefault(cls, []).append((start, end))
+        prev_time = {cls: time_sec for cls in classes}
+    for cls, start in seen.items():
+        end = prev_time.get(cls, start)
+        if end - start >= min_duration:
+            intervals.setdefault(cls, []).append((start, end))
+    return intervals
+
+
+def synthetic_presence(frames: int, classes: int, fps: float = 25.0, switch_prob: float = 0.002,
+                       seed: int = 0):
+    """
+    Маска присутствия (frames x classes): у каждого класса марковская
+    цепочка «есть/нет» с редкими переключениями и одиночными пропусками.
+    """
+    rng = np.random.default_rng(seed)
+    switches = rng.random((frames, classes)) < switch_prob
+    presence = (np.cumsum(switches, axis=0) % 2).astype(bool)
+    presence &= rng.random((frames, classes)) > 0.01  # Случайные пропуски детекций
+    times = np.arange(frames) / fps
+    return times, presence
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def run(frames: int, classes: int, skip_legacy: bool = False) -> dict:
+    times, presence = synthetic_presence(frames, classes)
+    det_frames, det_keys = np.nonzero(presence)
+    names = [f"class{i}" for i in range(classes)]
+    results = {'frames': frames, 'detections': int(len(det_frames))}
+
+    (_, starts, _), results['vectorized_s'] = _timed(
+        lambda: compute_intervals(times, det_frames, det_keys))
+    results['intervals'] = int(len(starts))
+
+    log = DetectionLog(classes=dict(enumerate(names)), max_memory_mb=256)
+    for i in range(frames):
+        row = np.flatnonzero(presence[i])
+        dets = np.zeros((len(row), 6), dtype=np.float32)
+        dets[:, 4] = 0.9
+        dets[:, 5] = row
+        log.append(float(times[i]), dets)
+    _, results['detection_log_s'] = _timed(lambda: intervals_from_log(log))
+    log.close()
+
+    pairs = [(float(t), [names[c] for c in np.flatnonzero(p)]) for t, p in zip(times, presence)]
+
+    def incremental():
+        tracker = PresenceIntervals()
+        for time_sec, labels in pairs:
+            tracker.update(time_sec, labels)
+        return tracker.finalize()
+
+    _, results['incremental_s'] = _timed(incremental)
+    results['incremental_per_frame_us'] = results['incremental_s'] / frames * 1e6
+    if not skip_legacy:
+        _, results['legacy_s'] = _timed(lambda: legacy_intervals(pairs))
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк расчёта интервалов присутствия")
+    parser.add_argument('--frames', type=int, default=1_000_000)
+    parser.add_argument('--classes', type=int, default=10)
+    parser.add_argument('--skip-legacy', action='store_true', help="Не запускать прежний алгоритм")
+    args = parser.parse_args(argv)
+
+    results = run(args.frames, args.classes, args.skip_legacy)
+    print(f"Кадров: {results['frames']}, детекций: {results['detections']}, "
+          f"интервалов: {results['intervals']}")
+    print(f"  векторизованный (массивы):   {results['vectorized_s']:.3f} с")
+    print(f"  векторизованный (DetectionLog): {results['detection_log_s']:.3f} с")
+    print(f"  инкрементальный:             {results['incremental_s']:.3f} с "
+          f"({results['incremental_per_frame_us']:.2f} мкс/кадр)")
+    if 'legacy_s' in results:
+        print(f"  прежний алгоритм:            {results['legacy_s']:.3f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Бенчмарк PDF-отчёта на синтетическом журнале за сутки: прежний отчёт
+(шрифт регистрируется заново, строка на интервал) против нового
+(сводка, временная шкала и постраничный перечень интервалов).
+
+Пример:
+    python -m benchmarks.bench_report --hours 24 --fps 5 --classes 10 --tracks
+"""
+import argparse
+import os
+import tempfile
+import time
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from utils.intervals import intervals_from_log
+from utils.report import FONT_PATH, generate_report
+from benchmarks.synthetic import synthetic_log
+
+
+def legacy_report(detection_log, output_path, min_duration=2.0):
+    """
+    Прежний utils.report.generate_report — базовая линия.
+    """
+    pdfmetrics.registerFont(TTFont('DejaVuSans', FONT_PATH))
+    intervals = intervals_from_log(detection_log, min_duration)
+    c = canvas.Canvas(output_path, pagesize=letter)
+    width, height = letter
+    y = height - 50
+    c.setFont('DejaVuSans', 16)
+    c.drawString(50, y, "Отчет по детекции объектов")
+    y -= 30
+    c.setFont('DejaVuSans', 12)
+    for cls, ivs in intervals.items():
+        c.drawString(50, y, f"Объект: {cls}")
+        y -= 20
+        for start, end in ivs:
+            c.drawString(70, y, f"С {start:.2f}s до {end:.2f}s")
+            y -= 15
+        y -= 10
+        if y < 100:
+            c.showPage()
+            y = height - 50
+            c.setFont('DejaVuSans', 12)
+    c.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время построения PDF-отчёта")
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--fps', type=float, default=2.0, help="Кадров журнала в секунду")
+    parser.add_argument('--classes', type=int, default=10)
+    parser.add_argument('--objects', type=int, default=20, help="Одновременно возможных объектов")
+    parser.add_argument('--tracks', action='store_true', help="Метки с ID трека («class1 #5»)")
+    parser.add_argument('--legacy', action='store_true', help="Замерить и прежний отчёт")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    log = synthetic_log(args.hours, args.fps, args.classes, args.objects, args.tracks)
+    print(f"Журнал: {len(log)} кадров, {log.num_detections} детекций "
+          f"(построен за {time.perf_counter() - t0:.1f} с)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for details in (False, True):
+            path = os.path.join(tmp, 'report.pdf')
+            t0 = time.perf_counter()
+            summary = generate_report(log, path, details=details)
+            elapsed = time.perf_counter() - t0
+            print(f"Новый отчёт{' с перечнем' if details else ' без перечня'}: {elapsed:.2f} с, "
+                  f"{len(summary.keys)} интервалов, {os.path.getsize(path) / 1e6:.1f} МБ")
+        if args.legacy:
+            path = os.path.join(tmp, 'legacy.pdf')
+            t0 = time.perf_counter()
+            legacy_report(log, path)
+            print(f"Прежний отчёт: {time.perf_counter() - t0:.2f} с, "
+                  f"{os.path.getsize(path) / 1e6:.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк запуска приложения: время импорта модулей интерфейса,
+время до первого окна и загрузка модели (холодная и из кэша).
+Каждый замер импорта выполняется в отдельном процессе, чтобы кэш
+модулей Python не искажал результат. Для замера окна нужен дисплей.
+
+Пример:
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import subprocess
+import sys
+import time
+import numpy as np
+
+IMPORT_CODE = """
+import time
+t0 = time.perf_counter()
+import {module}
+print(time.perf_counter() - t0)
+"""
+
+WINDOW_CODE = """
+import time
+t0 = time.perf_counter()
+from ui.vision_ui import VisionEdgeUI
+app = VisionEdgeUI({'username': 'bench', 'is_admin': False})
+app.update()
+print(time.perf_counter() - t0)
+app.model_loader.wait()
+app.on_closing()
+"""
+
+
+def run_child(code: str) -> float:
+    """
+    Выполняет код в новом интерпретаторе и возвращает напечатанное время, с.
+    """
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else 'ошибка процесса')
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def report(name: str, samples) -> None:
+    samples = np.asarray(samples) * 1000
+    print(f"{name:<28} {samples.mean():>10.1f} {np.percentile(samples, 50):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска приложения")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--model', default='models/best.pt')
+    args = parser.parse_args()
+
+    print(f"{'этап':<28} {'mean, мс':>10} {'p50, мс':>10}")
+    for module in ('auth.login_window', 'ui.vision_ui', 'models.yolo_model'):
+        report(f"import {module}", [run_child(IMPORT_CODE.format(module=module))
+                                    for _ in range(args.runs)])
+    try:
+        report("первое окно VisionEdgeUI", [run_child(WINDOW_CODE) for _ in range(args.runs)])
+    except RuntimeError as e:
+        print(f"{'первое окно VisionEdgeUI':<28} пропущено: {e}")
+
+    from models.model_cache import get_model
+    t0 = time.perf_counter()
+    get_model(args.model)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    get_model(args.model)
+    cached = time.perf_counter() - t0
+    report("get_model (холодная)", [cold])
+    report("get_model (из кэша)", [cached])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Воспроизводимый набор бенчмарков конвейера детекции на CPU, без сети и
+весов: синтетическое видео (benchmarks.synthetic.make_video) и
+модель-заменитель (StandInModel) либо, с --model, настоящие веса.
+
+Стадии: декодирование, вписывание кадра (letterbox), YOLOModel.detect,
+отрисовка рамок, VideoProcessor.process_frame целиком, расчёт интервалов
+присутствия и PDF-отчёт. Результаты пишутся в JSON; с --baseline каждая
+стадия сравнивается с прежним прогоном, а замедление больше --threshold
+даёт код возврата 1.
+
+Пример:
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --baseline bench.json --out bench_new.json
+    python -m benchmarks.suite --quick --only decode,detect
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+import cv2
+import numpy as np
+from benchmarks.synthetic import StandInModel, make_video, synthetic_log
+
+SCHEMA_VERSION = 1
+DEFAULT_THRESHOLD = 0.10  # Допустимое замедление относительно базового прогона
+# Объёмы по умолчанию: полный прогон и --quick; явно заданные параметры важнее
+DEFAULTS = {'runs': 200, 'video_frames': 300, 'log_hours': 24.0}
+QUICK_DEFAULTS = {'runs': 20, 'video_frames': 60, 'log_hours': 0.5}
+
+
+def time_calls(fn: Callable[[], Any], runs: int, warmup: int = 2) -> Dict[str, float]:
+    """
+    Вызывает fn runs раз (после warmup прогревочных) и возвращает
+    статистику времени одного вызова, мс.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(runs)
+    for i in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    samples *= 1000
+    return {
+        'runs': runs,
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'min_ms': float(samples.min()),
+    }
+
+
+def read_frames(path: str, count: int) -> List[np.ndarray]:
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+class _Cycle:
+    # Бесконечный перебор кадров по кругу
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.index = 0
+
+    def next(self) -> Any:
+        item = self.items[self.index % len(self.items)]
+        self.index += 1
+        return item
+
+
+def bench_decode(ctx: Dict[str, Any]) -> Dict[str, float]:
+    capture = cv2.VideoCapture(ctx['video'])
+
+    def step():
+        ok, _ = capture.read()
+        if not ok:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            capture.read()
+    try:
+        return time_calls(step, ctx['runs'])
+    finally:
+        capture.release()
+
+
+def bench_resize(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils.image import letterbox
+    frames = _Cycle(ctx['frames'])
+    width, height = ctx['frame_size']
+    dst = np.empty((height, width, 3), dtype=np.uint8)
+    return time_calls(lambda: letterbox(frames.next(), (height, width), dst=dst), ctx['runs'])
+
+
+def bench_detect(ctx: Dict[str, Any]) -> Dict[str, float]:
+    model, frames = ctx['model'], _Cycle(ctx['frames'])
+    return time_calls(lambda: model.detect(frames.next(), render=False), ctx['runs'])
+
+
+def bench_plot(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils.overlay import OverlayRenderer
+    model = ctx['model']
+    renderer = OverlayRenderer(model.classes)
+    pairs = _Cycle([(f, model.detect(f, render=False)['detections']) for f in ctx['frames'][:16]])
+
+    def step():
+        frame, dets = pairs.next()
+        renderer.draw(frame, dets)
+    return time_calls(step, ctx['runs'])
+
+
+def bench_process_frame(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from core.video_processor import VideoProcessor
+    processor = VideoProcessor(yolo=ctx['model'], frame_size=ctx['frame_size'])
+    if not processor.start_stream(ctx['video']):
+        raise RuntimeError("Не удалось открыть синтетическое видео")
+
+    def step():
+        if processor.process_frame() is None:  # Конец файла: начинаем сначала
+            processor.start_stream(ctx['video'])
+            processor.process_frame()
+    try:
+        return time_calls(step, ctx['runs'])
+    finally:
+        processor.stop_stream()
+
+
+def bench_intervals(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils.intervals import intervals_from_log
+    log = ctx['log']
+    result = time_calls(lambda: intervals_from_log(log), ctx['heavy_runs'], warmup=1)
+    result['frames'] = len(log)
+    return result
+
+
+def bench_report(ctx: Dict[str, Any]) -> Dict[str, float]:
+    from utils.report import generate_report
+    path = os.path.join(ctx['tmp'], 'report.pdf')
+    result = time_calls(lambda: generate_report(ctx['log'], path), ctx['heavy_runs'], warmup=1)
+    result['frames'] = len(ctx['log'])
+    return result
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], Dict[str, float]]] = {
+    'decode': bench_decode,
+    'resize': bench_resize,
+    'detect': bench_detect,
+    'plot': bench_plot,
+    'process_frame': bench_process_frame,
+    'intervals': bench_intervals,
+    'report': bench_report,
+}
+
+
+def environment(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Условия прогона: без них результаты разных машин сравнивать нельзя.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'cv2_threads': cv2.getNumThreads(),
+        'model': args.model or 'stand-in',
+        'params': {k: getattr(args, k) for k in ('runs', 'video_frames', 'video_size', 'frame_size',
+                                                  'log_hours', 'seed')},
+    }
+
+
+def run_suite(args: argparse.Namespace, names: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix='visionedge_bench_') as tmp:
+        width, height = (int(v) for v in args.video_size.split('x'))
+        frame_w, frame_h = (int(v) for v in args.frame_size.split('x'))
+        video = make_video(os.path.join(tmp, 'synthetic.avi'), args.video_frames, (width, height),
+                           seed=args.seed)
+        ctx: Dict[str, Any] = {
+            'tmp': tmp,
+            'video': video,
+            'frames': read_frames(video, 64),
+            'frame_size': (frame_w, frame_h),
+            'runs': args.runs,
+            'heavy_runs': max(1, args.runs // 50),
+        }
+        if {'detect', 'plot', 'process_frame'} & set(names):
+            if args.model:
+                from models.yolo_model import YOLOModel
+                ctx['model'] = YOLOModel(args.model, backend=args.backend, warmup=2)
+            else:
+                ctx['model'] = StandInModel(warmup=2)
+        if {'intervals', 'report'} & set(names):
+            ctx['log'] = synthetic_log(args.log_hours, 2.0, 10, 20, tracks=True, seed=args.seed)
+        for name in names:
+            print(f"{name} ...", end=' ', flush=True, file=sys.stderr)
+            results[name] = BENCHMARKS[name](ctx)
+            print(f"{results[name]['p50_ms']:.2f} мс", file=sys.stderr)
+        if 'log' in ctx:
+            ctx['log'].close()
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD, metric: str = 'p50_ms') -> List[Dict[str, Any]]:
+    """
+    Сравнивает стадии, замеренные в обоих прогонах. Для каждой —
+    относительное изменение metric (положительное — медленнее) и
+    признак регрессии (замедление больше threshold).
+    """
+    rows = []
+    for name, stats in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None or not base.get(metric):
+            continue
+        change = stats[metric] / base[metric] - 1.0
+        rows.append({'name': name, 'baseline': base[metric], 'current': stats[metric],
+                     'change': change, 'regression': change > threshold})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite',
+                                     description="Бенчмарки конвейера детекции с JSON-отчётом")
+    parser.add_argument('--out', help="Записать результаты в JSON")
+    parser.add_argument('--baseline', help="JSON прежнего прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимое замедление p50, доля (по умолчанию 0.10)")
+    parser.add_argument('--only', help=f"Стадии через запятую: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--runs', type=int, help="Замеров на стадию (по умолчанию 200, с --quick 20)")
+    parser.add_argument('--model', help="Веса YOLO вместо модели-заменителя")
+    parser.add_argument('--backend', default='torch', help="Бэкенд для --model")
+    parser.add_argument('--video-frames', type=int, help="Кадров синтетического видео (300, с --quick 60)")
+    parser.add_argument('--video-size', default='1280x720', help="Размер синтетического видео ШxВ")
+    parser.add_argument('--frame-size', default='640x480', help="Размер кадра конвейера ШxВ")
+    parser.add_argument('--log-hours', type=float, help="Длительность журнала для отчёта, ч (24, с --quick 0.5)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help="Малые объёмы для проверки набора")
+    args = parser.parse_args(argv)
+    for key, value in (QUICK_DEFAULTS if args.quick else DEFAULTS).items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"неизвестные стадии: {', '.join(unknown)}")
+    cv2.setRNGSeed(args.seed)
+
+    current = {'environment': environment(args), 'results': run_suite(args, names)}
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    print(f"{'стадия':<15} {'p50, мс':>10} {'p95, мс':>10} {'mean, мс':>10}")
+    for name, stats in current['results'].items():
+        print(f"{name:<15} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['mean_ms']:>10.3f}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    base_env = baseline.get('environment', {})
+    for key in ('model', 'cpu_count', 'params'):
+        if base_env.get(key) != current['environment'][key]:
+            print(f"Внимание: отличается {key}: {base_env.get(key)} -> {current['environment'][key]}")
+    rows = compare(current, baseline, args.threshold)
+    print(f"\nСравнение с {args.baseline} ({base_env.get('commit') or 'без коммита'}), p50:")
+    for row in rows:
+        mark = '  РЕГРЕССИЯ' if row['regression'] else ''
+        print(f"{row['name']:<15} {row['baseline']:>10.3f} -> {row['current']:>10.3f} мс "
+              f"{row['change']:>+8.1%}{mark}")
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Синтетические данные для бенчмарков: видео с движущимися объектами,
+кадры-шум, модель-заменитель без весов и журнал детекций. Всё
+детерминировано (фиксированный seed) и не требует сети, GPU и файла весов.
+Общий источник данных для всех скриптов benchmarks/.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from models.yolo_model import YOLOModel
+from utils.detection_log import DetectionLog
+from utils.overlay import OverlayRenderer
+
+STAND_IN_CLASSES = {0: 'person', 1: 'car', 2: 'bicycle', 3: 'dog'}
+
+
+def make_video(path: str, frames: int = 300, size: Tuple[int, int] = (1280, 720), fps: float = 25.0,
+               objects: int = 4, seed: int = 0) -> str:
+    """
+    Пишет MJPG-видео (ширина, высота) = size: на тёмном градиентном фоне
+    objects ярких прямоугольников движутся с отражением от краёв.
+    Яркость прямоугольника кодирует его класс для модели-заменителя.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Не удалось создать видео {path}")
+    background = np.tile(np.linspace(20, 70, width, dtype=np.uint8), (height, 1))
+    background = cv2.merge([background, background, background])
+    sizes = rng.integers(height // 10, height // 4, (objects, 2))
+    pos = rng.random((objects, 2)) * ([width, height] - sizes)
+    vel = (rng.random((objects, 2)) - 0.5) * [width, height] / fps / 2
+    shades = [int(140 + 100 * (i % len(STAND_IN_CLASSES)) / len(STAND_IN_CLASSES)) for i in range(objects)]
+    frame = np.empty_like(background)
+    for _ in range(frames):
+        np.copyto(frame, background)
+        for i in range(objects):
+            x, y = pos[i].astype(int)
+            w, h = sizes[i]
+            frame[y:y + h, x:x + w] = shades[i]
+        writer.write(frame)
+        pos += vel
+        bounce = (pos < 0) | (pos > [width, height] - sizes)
+        vel[bounce] *= -1
+        pos = np.clip(pos, 0, [width, height] - sizes)
+    writer.release()
+    return path
+
+
+def noise_frames(count: int, size: Tuple[int, int] = (640, 480), seed: int = 0) -> List[np.ndarray]:
+    """
+    count BGR-кадров (ширина, высота) = size из равномерного шума.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+class StandInBackend:
+    """
+    Бэкенд-заменитель YOLO: на уменьшенном кадре ищет яркие связные
+    области и возвращает их рамки в формате [x1, y1, x2, y2, conf, cls].
+    Стоимость прохода мала и стабильна, поэтому замеры конвейера
+    отражают накладные расходы кода, а не скорость нейросети.
+    С detections на каждый кадр возвращаются эти детекции без всякой
+    обработки — для замеров, где и проход заменителя был бы лишним.
+    """
+    name = 'stand-in'
+
+    def __init__(self, input_size: Tuple[int, int] = (160, 120), threshold: int = 120,
+                 detections: Optional[np.ndarray] = None):
+        self.names: Dict[int, str] = dict(STAND_IN_CLASSES)
+        self.input_size = input_size
+        self.threshold = threshold
+        self.detections = detections
+
+    def predict(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        if self.detections is not None:
+            return [self.detections for _ in frames]
+        return [self._detect(frame) for frame in frames]
+
+    def _detect(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.input_size, interpolation=cv2.INTER_AREA)
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        sx = frame.shape[1] / self.input_size[0]
+        sy = frame.shape[0] / self.input_size[1]
+        out = np.empty((count - 1, 6), dtype=np.float32)
+        for i in range(1, count):
+            x, y, w, h, _ = stats[i]
+            shade = float(gray[y + h // 2, x + w // 2])
+            out[i - 1] = (x * sx, y * sy, (x + w) * sx, (y + h) * sy, 0.9,
+                          min(len(self.names) - 1, int((shade - 140) * len(self.names) / 100)))
+        return out
+
+
+class StandInModel(YOLOModel):
+    """
+    YOLOModel с бэкендом-заменителем: detect, predict_batch, отрисовка
+    и извлечение детекций идут по коду YOLOModel, но без весов и torch.
+    """
+    def __init__(self, warmup: int = 1, detections: Optional[np.ndarray] = None):
+        self.device = 'cpu'
+        self.backend = StandInBackend(detections=detections)
+        self.model = None
+        self.classes = self.backend.names
+        self.overlay = OverlayRenderer(self.classes)
+        self.warmup(warmup)
+
+
+def synthetic_log(hours: float, fps: float, classes: int, objects: int, tracks: bool,
+                  seed: int = 0) -> DetectionLog:
+    """
+    Журнал с марковским присутствием objects объектов classes классов.
+    С tracks у каждого появления объекта свой ID трека.
+    """
+    rng = np.random.default_rng(seed)
+    frames = int(hours * 3600 * fps)
+    log = DetectionLog(classes={i: f"class{i}" for i in range(classes)})
+    object_class = rng.integers(0, classes, objects)
+    present = np.zeros(objects, dtype=bool)
+    track_ids = np.arange(objects)
+    next_track = objects
+    base = np.zeros((objects, 7), dtype=np.float32)
+    base[:, 5] = object_class
+    for i in range(frames):
+        flips = rng.random(objects) < 2.0 / (fps * 60)  # Появление/уход в среднем раз в 30 с
+        appear = flips & ~present
+        if tracks and appear.any():
+            track_ids[appear] = np.arange(next_track, next_track + appear.sum())
+            next_track += int(appear.sum())
+        present ^= flips
+        dets = base[present]
+        dets[:, 6] = track_ids[present] if tracks else -1
+        log.append(i / fps, dets)
+    return log
@@ -0,0 +1,292 @@
+"""
+Офлайн-анализ видеофайлов без графического интерфейса.
+
+Пример:
+    python -m core.analyze video.mp4 --out detections.parquet --report report.pdf
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from models.yolo_model import YOLOModel
+from models.model_cache import get_model
+from core.scheduler import InferenceScheduler, MotionGate
+from core.tracker import Tracker
+from utils.detection_log import DetectionLog
+from core.detection_store import DETECTIONS_DB_PATH, DetectionStore
+from core.metrics import MetricsDumper, MetricsServer, PipelineMetrics
+from utils.image import letterbox
+from utils.frame_pool import FramePool
+
+# Колонки таблицы детекций
+DETECTION_COLUMNS = ['frame', 'time', 'class_id', 'class', 'confidence', 'x1', 'y1', 'x2', 'y2', 'track_id']
+
+
+def analyze_video(path: str, yolo: Optional[YOLOModel] = None, stride: int = 1,
+                  start: Optional[float] = None, end: Optional[float] = None,
+                  max_frames: Optional[int] = None, batch_size: int = 1,
+                  frame_size: Tuple[int, int] = (640, 480), progress=None,
+                  scheduler: Optional[InferenceScheduler] = None,
+                  tracker: Optional[Tracker] = None,
+                  metrics: Optional[PipelineMetrics] = None,
+                  store: Optional[DetectionStore] = None, session: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Прогоняет видеофайл через детектор с максимальной скоростью декодирования.
+    stride — обрабатывать каждый N-й кадр (пропущенные кадры только grab()),
+    start/end — интервал анализа в секундах, max_frames — предел числа
+    обработанных кадров. scheduler позволяет пропускать инференс на
+    статичных кадрах (используются последние детекции), tracker присваивает
+    детекциям ID треков (track_id = -1 без трекера). metrics — внешний
+    объект метрик (например, для выгрузки по ходу анализа). store — база
+    детекций: кадры пишутся в сессию session (без неё открывается новая
+    сессия, её ID будет в результате под ключом 'session'). Возвращает словарь с detection_log (формат
+    utils.report.generate_report, utils.detection_log.DetectionLog), строками
+    детекций и статистикой.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Видеофайл не найден: {path}")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть видеофайл: {path}")
+
+    yolo = yolo if yolo is not None else get_model()
+    stride = max(1, int(stride))
+    batch_size = max(1, int(batch_size))
+    total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if start:
+        capture.set(cv2.CAP_PROP_POS_MSEC, start * 1000.0)
+    index = int(capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1  # Номер последнего прочитанного кадра
+
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    detection_log = DetectionLog(classes=yolo.classes)
+    if store is not None and session is None:
+        session = store.start_session(note=path)
+    rows: List[list] = []
+    processed = 0
+    batch: List[Tuple[int, float, np.ndarray, bool]] = []
+    last_dets = np.zeros((0, 6), dtype=np.float32)
+    # Кадр декодируется и вписывается в переиспользуемые буферы; вписанные
+    # кадры живут до конца пакета
+    decode_pool, frame_pool = FramePool(1), FramePool(batch_size + 1)
+    started = time.perf_counter()
+    last_progress = started
+
+    def flush(batch):
+        nonlocal last_dets
+        frames = [frame for _, _, frame, infer in batch if infer]
+        t0 = time.perf_counter()
+        results = iter(yolo.predict_batch(frames) if frames else [])
+        if frames:
+            metrics.observe('inference', time.perf_counter() - t0, len(frames))
+        t0 = time.perf_counter()
+        for index, timestamp, _, infer in batch:
+            dets = yolo.extract_detections(next(results)) if infer else None
+            if tracker is not None:
+                last_dets = tracker.update(dets) if infer else tracker.predict()
+            elif infer:
+                last_dets = dets
+            for det in last_dets:
+                x1, y1, x2, y2, conf, cls_id = det[:6]
+                track_id = int(det[6]) if len(det) > 6 else -1
+                rows.append([index, timestamp, int(cls_id), yolo.classes[int(cls_id)], float(conf),
+                             float(x1), float(y1), float(x2), float(y2), track_id])
+            detection_log.append(timestamp, last_dets)
+            if store is not None:
+                store.append(session, path, timestamp, last_dets)
+        metrics.observe('postprocess', time.perf_counter() - t0, len(batch))
+        metrics.tick_frame(len(batch))
+
+    try:
+        while max_frames is None or processed < max_frames:
+            # Пропуск кадров: grab() без преобразования в BGR заметно дешевле read()
+            t0 = time.perf_counter()
+            ok = True
+            if processed > 0:
+                for _ in range(stride - 1):
+                    ok = capture.grab()
+                    if not ok:
+                        break
+                    index += 1
+            ret, frame = decode_pool.read(capture) if ok else (False, None)
+            metrics.observe('decode', time.perf_counter() - t0)
+            if not ret:
+                break
+            index += 1
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if end is not None and timestamp > end:
+                break
+
+            t0 = time.perf_counter()
+            shape = (frame_size[1], frame_size[0])
+            frame = letterbox(frame, shape, dst=frame_pool.next(shape + frame.shape[2:], frame.dtype))[0]
+            metrics.observe('resize', time.perf_counter() - t0)
+
+            infer = scheduler is None or scheduler.should_infer(frame)
+            batch.append((index, timestamp, frame, infer))
+            processed += 1
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+
+            now = time.perf_counter()
+            if progress is not None and now - last_progress >= 1.0:
+                progress(index + 1, total_frames, processed / (now - started))
+                last_progress = now
+        if batch:
+            flush(batch)
+    finally:
+        capture.release()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'detection_log': detection_log,
+        'detections': rows,
+        'frames': processed,
+        'elapsed': elapsed,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'timings': metrics.stage_summary(),
+        'session': session,
+    }
+
+
+def save_detections(rows: List[list], path: str) -> None:
+    """
+    Сохраняет таблицу детекций. Формат определяется по расширению:
+    .parquet (нужен pandas + pyarrow), .csv, .json или .npz.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise RuntimeError("Для сохранения в Parquet установите pandas и pyarrow") from e
+        pd.DataFrame(rows, columns=DETECTION_COLUMNS).to_parquet(path, index=False)
+    elif ext == '.csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(DETECTION_COLUMNS)
+            writer.writerows(rows)
+    elif ext == '.json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([dict(zip(DETECTION_COLUMNS, row)) for row in rows], f, ensure_ascii=False)
+    elif ext == '.npz':
+        columns = list(zip(*rows)) if rows else [[] for _ in DETECTION_COLUMNS]
+        np.savez_compressed(path, **{name: np.asarray(col) for name, col in zip(DETECTION_COLUMNS, columns)})
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла детекций: {ext}")
+
+
+def _print_progress(done: int, total: int, fps: float) -> None:
+    if total > 0:
+        print(f"\r{done}/{total} кадров ({done / total:.0%}), {fps:.1f} к/с", end='', file=sys.stderr)
+    else:
+        print(f"\r{done} кадров, {fps:.1f} к/с", end='', file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m core.analyze',
+        description="Офлайн-анализ видео без GUI: детекция объектов, таблица детекций и PDF-отчёт.")
+    parser.add_argument('video', help="Путь к видеофайлу")
+    parser.add_argument('--out', help="Файл детекций (.parquet, .csv, .json, .npz)")
+    parser.add_argument('--report', help="Путь для PDF-отчёта")
+    parser.add_argument('--model', default='models/best.pt', help="Путь к весам модели")
+    parser.add_argument('--stride', type=int, default=1, help="Обрабатывать каждый N-й кадр")
+    parser.add_argument('--start', type=float, help="Начало анализа, с")
+    parser.add_argument('--end', type=float, help="Конец анализа, с")
+    parser.add_argument('--max-frames', type=int, help="Максимум обрабатываемых кадров")
+    parser.add_argument('--batch-size', type=int, default=1, help="Кадров на один прямой проход")
+    parser.add_argument('--every-n', type=int, default=1,
+                        help="Запускать детекцию не чаще чем на каждом N-м обработанном кадре")
+    parser.add_argument('--motion', action='store_true',
+                        help="Пропускать детекцию на кадрах без движения")
+    parser.add_argument('--track', action='store_true',
+                        help="Присваивать объектам ID треков; отчёт строится по трекам")
+    parser.add_argument('--metrics-out',
+                        help="Файл для периодической выгрузки метрик (.jsonl или .csv)")
+    parser.add_argument('--metrics-interval', type=float, default=5.0,
+                        help="Период выгрузки метрик, с")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Порт локального эндпоинта /metrics в формате Prometheus")
+    parser.add_argument('--db', nargs='?', const=DETECTIONS_DB_PATH,
+                        help=f"Сохранить детекции в базу SQLite (по умолчанию {DETECTIONS_DB_PATH}); "
+                             "отчёт тогда строится по сохранённой сессии")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Инференс в N процессах (CPU); пакет кадров делится между ними")
+    parser.add_argument('--worker-threads', type=int,
+                        help="Потоков torch на процесс при --workers (по умолчанию ядра / N)")
+    parser.add_argument('--quiet', action='store_true', help="Не печатать прогресс и журнал детекций")
+    args = parser.parse_args(argv)
+
+    pool = None
+    batch_size = args.batch_size
+    if args.workers > 0:
+        from core.inference_pool import InferencePool
+        yolo = pool = InferencePool(args.workers, args.model, threads=args.worker_threads)
+        batch_size = max(batch_size, args.workers)  # Иначе процессы простаивают
+    else:
+        yolo = get_model(args.model)
+    scheduler = None
+    if args.every_n > 1 or args.motion:
+        scheduler = InferenceScheduler(every_n=args.every_n,
+                                       motion_gate=MotionGate() if args.motion else None)
+    metrics = PipelineMetrics()
+    if scheduler is not None:
+        metrics.register_gauge('scheduler', scheduler.stats)
+    dumper = None
+    if args.metrics_out:
+        dumper = MetricsDumper(metrics, args.metrics_out, args.metrics_interval).start()
+    server = MetricsServer(metrics, port=args.metrics_port).start() if args.metrics_port else None
+    store = DetectionStore(args.db, classes=yolo.classes) if args.db else None
+    try:
+        result = analyze_video(args.video, yolo=yolo, stride=args.stride, start=args.start,
+                               end=args.end, max_frames=args.max_frames, batch_size=batch_size,
+                               progress=None if args.quiet else _print_progress, scheduler=scheduler,
+                               tracker=Tracker() if args.track else None, metrics=metrics,
+                               store=store)
+        if store is not None:
+            store.end_session(result['session'])
+    finally:
+        if pool is not None:
+            pool.close()
+        if dumper is not None:
+            dumper.stop()
+        if server is not None:
+            server.stop()
+    if not args.quiet:
+        print(file=sys.stderr)
+
+    if args.out:
+        save_detections(result['detections'], args.out)
+    if args.report:
+        from utils.report import generate_report
+        generate_report(store.log(result['session']) if store is not None else result['detection_log'],
+                        args.report)
+    if store is not None:
+        store.close()
+        print(f"Детекции сохранены в {args.db}, сессия {result['session']}")
+
+    print(f"Кадров обработано: {result['frames']} за {result['elapsed']:.2f} с "
+          f"({result['fps']:.1f} к/с)")
+    if scheduler is not None:
+        stats = scheduler.stats()
+        print(f"Инференс: {stats['frames_inferred']} кадров, пропущено {stats['frames_skipped']} "
+              f"({stats['skip_ratio']:.0%})")
+    for stage, stats in result['timings'].items():
+        print(f"  {stage:<12} всего {stats['total_ms']:10.1f} мс, в среднем {stats['mean_ms']:8.2f} мс, "
+              f"p95 {stats['p95_ms']:8.2f} мс")
+    if not args.quiet:
+        print("Журнал детекций:")
+        for time_sec, classes in result['detection_log']:
+            if classes:
+                print(f"  {time_sec:8.2f}s: {', '.join(classes)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,477 @@
+# core/detection_store.py
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.frame_queue import FrameQueue, BLOCK
+from utils.detection_log import DETECTION_DTYPE, FRAME_DTYPE
+
+# База детекций (рядом с базой пользователей auth.auth.DB_PATH, но отдельным
+# файлом: частая запись детекций не блокирует вход пользователей)
+DETECTIONS_DB_PATH = os.path.join('data', 'detections.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    user TEXT,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    time REAL NOT NULL,
+    position REAL NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    frame_id INTEGER NOT NULL,
+    session INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    time REAL NOT NULL,
+    position REAL NOT NULL,
+    class_id INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    track_id INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS idx_detections_source_time ON detections (source, time);
+CREATE INDEX IF NOT EXISTS idx_detections_class_time ON detections (class_id, time);
+-- Основной отчётный запрос «класс на камере за интервал» целиком по одному индексу
+CREATE INDEX IF NOT EXISTS idx_detections_source_class_time ON detections (source, class_id, time);
+CREATE INDEX IF NOT EXISTS idx_detections_frame ON detections (frame_id);
+CREATE INDEX IF NOT EXISTS idx_frames_session ON frames (session, source, id);
+"""
+
+_FRAME_SQL = "INSERT INTO frames (session, source, time, position, count) VALUES (?, ?, ?, ?, ?)"
+_DETECTION_SQL = ("INSERT INTO detections (frame_id, session, source, time, position, class_id, "
+                  "confidence, x1, y1, x2, y2, track_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+_CLASS_SQL = "INSERT OR IGNORE INTO classes (id, name) VALUES (?, ?)"
+
+FLUSH_TIMEOUT = 5.0  # Сколько ждать дописывания очереди по умолчанию, с
+
+
+def connect(path: str = DETECTIONS_DB_PATH, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Соединение с базой детекций в режиме WAL: читатели не ждут писателя.
+    synchronous=NORMAL в WAL не теряет целостность, только последние
+    транзакции при отключении питания.
+    """
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def connect_readonly(path: str = DETECTIONS_DB_PATH, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Соединение только для чтения: файл базы не создаётся и не меняется.
+    Если файла нет — FileNotFoundError.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"База детекций не найдена: {path}")
+    return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, timeout=timeout)
+
+
+class DetectionReader:
+    """
+    Чтение базы детекций: запросы по индексам, сессии и журналы сессий
+    для отчётов. Сам по себе открывает файл только для чтения (mode=ro):
+    без схемы, потока записи и блокировок писателя, поэтому подходит для
+    процессов отчётов. Если файла нет — FileNotFoundError. Соединение с
+    базой у каждого потока своё.
+    """
+    def __init__(self, path: str = DETECTIONS_DB_PATH, classes: Optional[Dict[int, str]] = None):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"База детекций не найдена: {path}")
+        self.path = path
+        self.classes = dict(classes or {})
+        self._local = threading.local()  # Соединения читателей по потокам
+
+    def close(self) -> None:
+        """
+        Закрывает соединение читателя в вызывающем потоке.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Чтение --------------------------------------------------------------
+
+    def class_id(self, name: Union[int, str]) -> Optional[int]:
+        """
+        ID класса по имени (или сам ID); None, если класс неизвестен.
+        """
+        if isinstance(name, (int, np.integer)):
+            return int(name)
+        for cls_id, cls_name in self.class_names().items():
+            if cls_name == name:
+                return cls_id
+        return None
+
+    def class_names(self) -> Dict[int, str]:
+        names = dict(self._reader().execute("SELECT id, name FROM classes").fetchall())
+        names.update(self.classes)
+        return names
+
+    def query(self, source: Any = None, class_name: Union[int, str, None] = None,
+              t0: Optional[float] = None, t1: Optional[float] = None,
+              session: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Детекции по источнику и/или классу за интервал времени записи
+        [t0, t1] (Unix time). Фильтры по источнику и классу идут по индексам.
+        """
+        where, params = self._filters(source, class_name, t0, t1, session)
+        if where is None:
+            return []
+        sql = ("SELECT session, source, time, position, class_id, confidence, x1, y1, x2, y2, track_id "
+               f"FROM detections{where} ORDER BY time")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        names = self.class_names()
+        result = []
+        for row in self._reader().execute(sql, params):
+            item = {
+                'session': row[0], 'source': row[1], 'time': row[2], 'position': row[3],
+                'class': names.get(row[4], str(row[4])), 'confidence': row[5],
+                'bbox': [row[6], row[7], row[8], row[9]],
+            }
+            if row[10] >= 0:
+                item['track_id'] = row[10]
+            result.append(item)
+        return result
+
+    def count(self, source: Any = None, class_name: Union[int, str, None] = None,
+              t0: Optional[float] = None, t1: Optional[float] = None,
+              session: Optional[int] = None) -> int:
+        where, params = self._filters(source, class_name, t0, t1, session)
+        if where is None:
+            return 0
+        return self._reader().execute(f"SELECT COUNT(*) FROM detections{where}", params).fetchone()[0]
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        rows = self._reader().execute("SELECT id, started, ended, user, note FROM sessions ORDER BY id")
+        return [dict(zip(('id', 'started', 'ended', 'user', 'note'), row)) for row in rows]
+
+    def log(self, session: int, source: Any = None) -> 'StoredLog':
+        """
+        Журнал сессии в формате utils.detection_log.DetectionLog: по нему
+        строятся интервалы присутствия и отчёт (utils.report.generate_report).
+        """
+        return StoredLog(self, session, None if source is None else str(source))
+
+    # --- Внутреннее ----------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect_readonly(self.path)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _filters(self, source, class_name, t0, t1, session) -> Tuple[Optional[str], list]:
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(str(source))
+        if class_name is not None:
+            cls_id = self.class_id(class_name)
+            if cls_id is None:
+                return None, []
+            clauses.append("class_id = ?")
+            params.append(cls_id)
+        if t0 is not None:
+            clauses.append("time >= ?")
+            params.append(t0)
+        if t1 is not None:
+            clauses.append("time <= ?")
+            params.append(t1)
+        if session is not None:
+            clauses.append("session = ?")
+            params.append(session)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class DetectionStore(DetectionReader):
+    """
+    Хранилище детекций в SQLite (чтение — как у DetectionReader, но
+    соединением на запись). append() только кладёт кадр в очередь,
+    а фоновый поток пишет накопленные кадры пакетами по batch_size в одной
+    транзакции (не реже раза в flush_interval секунд). С block=True очередь
+    блокирующая: если диск не успевает, тормозит производитель, а детекции
+    не теряются. С block=False (для потока интерфейса) кадр при полной
+    очереди отбрасывается и учитывается в frames_dropped. Сбой записи
+    кадра (ошибка SQLite или неверная строка) теряет только этот кадр.
+    Время каждой строки хранится дважды: time — момент записи (Unix time,
+    для запросов «person на камере 3 с 14:00 до 15:00» по индексам
+    (source, time), (class_id, time) и (source, class_id, time)) и
+    position — время кадра в источнике, с (для отчётов).
+    """
+    def __init__(self, path: str = DETECTIONS_DB_PATH, classes: Optional[Dict[int, str]] = None,
+                 batch_size: int = 512, flush_interval: float = 0.5, queue_size: int = 4096,
+                 block: bool = True):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.block = block
+        self.frames_written = 0
+        self.detections_written = 0
+        self.batches_written = 0
+        self.frames_dropped = 0  # Не поместились в очередь при block=False
+        self.errors = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = connect(path)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                conn.executemany(_CLASS_SQL, sorted((classes or {}).items()))
+        finally:
+            conn.close()
+        super().__init__(path, classes)
+        self._known_classes = set(self.classes)
+        self._queue = FrameQueue(queue_size, BLOCK)
+        self._thread = threading.Thread(target=self._write_loop, name="ve-detection-store", daemon=True)
+        self._thread.start()
+
+    # --- Запись --------------------------------------------------------------
+
+    def start_session(self, user: Optional[str] = None, note: str = '') -> int:
+        """
+        Открывает сессию (один запуск потока или анализа) и возвращает её ID.
+        """
+        return self._execute("INSERT INTO sessions (started, user, note) VALUES (?, ?, ?)",
+                             (time.time(), user, note))
+
+    def end_session(self, session: int, timeout: Optional[float] = FLUSH_TIMEOUT) -> None:
+        """
+        Закрывает сессию, дождавшись записи её кадров (не дольше timeout).
+        """
+        self.flush(timeout)
+        self._execute("UPDATE sessions SET ended = ? WHERE id = ?", (time.time(), session))
+
+    def append(self, session: int, source: Any, position: float,
+               detections: Optional[np.ndarray], wall_time: Optional[float] = None) -> bool:
+        """
+        Ставит в очередь кадр с детекциями [x1, y1, x2, y2, conf, cls(, track_id)].
+        Пустые кадры тоже пишутся — по ним закрываются интервалы присутствия.
+        Возвращает False, если кадр отброшен (block=False и очередь полна).
+        """
+        rows = None
+        if detections is not None and len(detections):
+            rows = np.asarray(detections, dtype=np.float64)[:, :7].tolist()
+        item = (session, str(source), time.time() if wall_time is None else wall_time,
+                float(position), rows)
+        if self._queue.put(item, timeout=None if self.block else 0):
+            return True
+        if not self._queue.closed:
+            self.frames_dropped += 1
+        return False
+
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        """
+        Ждёт, пока всё поставленное в очередь будет записано, но не дольше
+        timeout (None — без ограничения). False — не дождались.
+        """
+        if self._queue.closed:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        if not self._queue.put(done, timeout):
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Дописывает очередь и останавливает поток записи.
+        """
+        self._queue.close()
+        self._thread.join(timeout=timeout)
+        super().close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'frames_written': self.frames_written,
+            'detections_written': self.detections_written,
+            'batches_written': self.batches_written,
+            'frames_dropped': self.frames_dropped,
+            'queue_depth': len(self._queue),
+            'errors': self.errors,
+        }
+
+    def log(self, session: int, source: Any = None) -> 'StoredLog':
+        # Журнал читается после дописывания очереди: в него попадут все кадры сессии
+        self.flush()
+        return super().log(session, source)
+
+    # --- Внутреннее ----------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.path)
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        # Короткая запись вне потока записи; WAL и busy timeout разводят её с пакетами
+        conn = connect(self.path)
+        try:
+            with conn:
+                return conn.execute(sql, params).lastrowid
+        finally:
+            conn.close()
+
+    def _write_loop(self) -> None:
+        conn = connect(self.path)
+        while True:
+            items = self._queue.get_batch(self.batch_size, self.flush_interval, timeout=0.5)
+            if not items:
+                if self._queue.closed:
+                    break
+                continue
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            frames = [item for item in items if not isinstance(item, threading.Event)]
+            try:
+                if frames:
+                    self._write_batch(conn, frames)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, frames: List[tuple]) -> None:
+        # Одна транзакция на пакет. Если пакет не записался, кадры пишутся по
+        # одному, чтобы один неверный кадр не потянул за собой остальные.
+        # Любой сбой только считается: поток записи не должен умирать, иначе
+        # flush() и блокирующий append() ждали бы его вечно
+        try:
+            with conn:
+                self._write_frames(conn, frames)
+            self.batches_written += 1
+            return
+        except Exception as e:
+            if len(frames) == 1:
+                self.errors += 1
+                print(f"Ошибка записи детекций: {e}")
+                return
+        for frame in frames:
+            self._write_batch(conn, [frame])
+
+    def _write_frames(self, conn: sqlite3.Connection, frames: List[tuple]) -> None:
+        detections = []
+        for session, source, wall_time, position, rows in frames:
+            frame_id = conn.execute(_FRAME_SQL, (session, source, wall_time, position,
+                                                 len(rows) if rows else 0)).lastrowid
+            for row in rows or ():
+                detections.append((frame_id, session, source, wall_time, position, int(row[5]), row[4],
+                                   row[0], row[1], row[2], row[3], int(row[6]) if len(row) > 6 else -1))
+        conn.executemany(_DETECTION_SQL, detections)
+        new_classes = {d[5] for d in detections} - self._known_classes
+        if new_classes:
+            conn.executemany(_CLASS_SQL, [(c, self.classes.get(c, str(c))) for c in sorted(new_classes)])
+            self._known_classes |= new_classes
+        self.frames_written += len(frames)
+        self.detections_written += len(detections)
+
+
+class StoredLog:
+    """
+    Журнал одной сессии (и источника) из DetectionReader/DetectionStore с тем же
+    интерфейсом, что у utils.detection_log.DetectionLog: query(), frames(),
+    label(), monotonic и итерация (time_sec, [labels]). Время — позиция
+    кадра в источнике. Таблица кадров читается при создании, детекции — по
+    запросу, а итерация идёт окнами по window кадров.
+    """
+    def __init__(self, store: DetectionReader, session: int, source: Optional[str] = None,
+                 window: int = 65536):
+        self.store = store
+        self.session = session
+        self.source = source
+        self.window = window
+        self.classes = store.class_names()
+        sql = "SELECT id, position, count FROM frames WHERE session = ?"
+        params: list = [session]
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        rows = np.array(store._reader().execute(sql + " ORDER BY id", params).fetchall(),
+                        dtype=np.float64).reshape(-1, 3)
+        self._frame_ids = rows[:, 0].astype(np.int64)
+        self._frames = np.empty(len(rows), dtype=FRAME_DTYPE)
+        self._frames['time'] = rows[:, 1]
+        self._frames['count'] = rows[:, 2]
+        self.monotonic = bool(np.all(np.diff(self._frames['time']) >= 0))
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def frames(self, t0: Optional[float] = None, t1: Optional[float] = None) -> np.ndarray:
+        return self._frames[self._time_mask(self._frames['time'], t0, t1)]
+
+    def query(self, t0: Optional[float] = None, t1: Optional[float] = None) -> np.ndarray:
+        """
+        Детекции сессии в формате DETECTION_DTYPE; 'frame' — номер строки в frames().
+        """
+        if not len(self._frame_ids):
+            return np.empty(0, dtype=DETECTION_DTYPE)
+        return self._detections(0, len(self._frame_ids) - 1, t0, t1)
+
+    def label(self, class_id: int, track_id: int) -> str:
+        name = self.classes.get(int(class_id), str(int(class_id)))
+        return f"{name} #{int(track_id)}" if track_id >= 0 else name
+
+    def iter_frames(self, t0: Optional[float] = None,
+                    t1: Optional[float] = None) -> Iterator[Tuple[float, List[str]]]:
+        for first in range(0, len(self._frame_ids), self.window):
+            last = min(first + self.window, len(self._frame_ids)) - 1
+            dets = self._detections(first, last)
+            times = self._frames['time'][first:last + 1]
+            frame_ids = np.flatnonzero(self._time_mask(times, t0, t1)) + first
+            starts = np.searchsorted(dets['frame'], frame_ids, side='left')
+            ends = np.searchsorted(dets['frame'], frame_ids, side='right')
+            for frame_id, start, end in zip(frame_ids, starts, ends):
+                chunk = dets[start:end]
+                labels = [self.label(c, t) for c, t in zip(chunk['class_id'], chunk['track_id'])]
+                yield float(self._frames['time'][frame_id]), labels
+
+    def __iter__(self) -> Iterator[Tuple[float, List[str]]]:
+        return self.iter_frames()
+
+    def _detections(self, first: int, last: int, t0: Optional[float] = None,
+                    t1: Optional[float] = None) -> np.ndarray:
+        # Детекции кадров с номерами строк first..last; диапазон ID кадров идёт по индексу
+        sql = ("SELECT frame_id, class_id, confidence, x1, y1, x2, y2, track_id FROM detections "
+               "WHERE frame_id BETWEEN ? AND ? AND session = ?")
+        params: list = [int(self._frame_ids[first]), int(self._frame_ids[last]), self.session]
+        if self.source is not None:
+            sql += " AND source = ?"
+            params.append(self.source)
+        rows = np.array(self.store._reader().execute(sql + " ORDER BY frame_id, id", params).fetchall(),
+                        dtype=np.float64).reshape(-1, 8)
+        dets = np.empty(len(rows), dtype=DETECTION_DTYPE)
+        dets['frame'] = np.searchsorted(self._frame_ids, rows[:, 0].astype(np.int64))
+        dets['time'] = self._frames['time'][dets['frame']]
+        dets['class_id'] = rows[:, 1]
+        dets['confidence'] = rows[:, 2]
+        dets['box'] = rows[:, 3:7]
+        dets['track_id'] = rows[:, 7]
+        return dets[self._time_mask(dets['time'], t0, t1)]
+
+    @staticmethod
+    def _time_mask(values: np.ndarray, t0: Optional[float], t1: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(values), dtype=bool)
+        if t0 is not None:
+            mask &= values >= t0
+        if t1 is not None:
+            mask &= values <= t1
+        return mask
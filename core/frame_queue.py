@@ -0,0 +1,121 @@
+# core/frame_queue.py
+import threading
+import time
+from collections import deque
+from typing import Any, List, Optional
+
+# Политики переполнения очередей конвейера
+DROP_OLDEST = 'drop_oldest'  # Вытеснять самый старый кадр
+BLOCK = 'block'  # Блокировать производителя до освобождения места
+
+
+class FrameQueue:
+    """
+    Ограниченная потокобезопасная очередь между стадиями конвейера.
+    При переполнении либо вытесняет самый старый элемент (drop_oldest),
+    либо блокирует производителя (block).
+    """
+    def __init__(self, maxsize: int = 2, policy: str = DROP_OLDEST):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Неизвестная политика очереди: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.dropped = 0  # Сколько элементов было вытеснено
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """
+        Добавляет элемент в очередь.
+        Возвращает False, если очередь закрыта или истёк таймаут ожидания.
+        """
+        with self._cond:
+            if self.policy == BLOCK:
+                ready = self._cond.wait_for(
+                    lambda: self._closed or len(self._items) < self.maxsize, timeout)
+                if not ready:
+                    return False
+            elif len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Извлекает самый старый элемент.
+        Возвращает None, если очередь пуста и закрыта или истёк таймаут.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_latest(self, timeout: Optional[float] = None) -> Any:
+        """
+        Извлекает самый свежий элемент, отбрасывая более старые.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+            return item
+
+    def get_batch(self, max_items: int, wait: float = 0.0,
+                  timeout: Optional[float] = None) -> List[Any]:
+        """
+        Извлекает до max_items элементов.
+        Ждёт первый элемент не дольше timeout, а затем добирает остальные
+        не дольше wait секунд. Возвращает пустой список, если ничего нет.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return []
+            deadline = time.monotonic() + wait
+            while len(self._items) < max_items and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._items and len(batch) < max_items:
+                batch.append(self._items.popleft())
+            self._cond.notify_all()
+            return batch
+
+    def clear(self) -> None:
+        """
+        Удаляет все накопленные элементы (например, после перемотки).
+        """
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """
+        Закрывает очередь и будит все ожидающие потоки.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,309 @@
+# core/inference_pool.py
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models.yolo_model import BACKEND_TORCH
+from core.metrics import LatencyHistogram
+
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3  # Слот вмещает кадр Full HD BGR
+START_TIMEOUT = 120.0  # Загрузка модели в каждом процессе, с
+
+
+def _worker_main(worker_id: int, slot_names: List[str], tasks, results,
+                 model_path: str, backend: str, threads: Optional[int],
+                 model_factory: Optional[Callable[[], Any]]) -> None:
+    """
+    Цикл процесса-обработчика: модель загружается один раз, затем кадры
+    читаются из слотов общей памяти по заданиям (слот, форма, тип).
+    В ответ уходят только детекции [x1, y1, x2, y2, conf, cls].
+    """
+    if threads:
+        # До импорта torch: число потоков OpenMP/MKL на процесс
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+        os.environ['MKL_NUM_THREADS'] = str(threads)
+    # Подключение к сегментам пула: дочерний процесс делит трекер ресурсов
+    # с родителем, сегменты удаляет только пул при закрытии
+    slots = [SharedMemory(name=name) for name in slot_names]
+    try:
+        if model_factory is not None:
+            model = model_factory()
+        else:
+            from models.yolo_model import YOLOModel
+            model = YOLOModel(model_path, backend=backend, threads=threads)
+    except Exception as e:
+        results.put(('error', worker_id, f"{type(e).__name__}: {e}"))
+        for shm in slots:
+            shm.close()
+        return
+    results.put(('ready', worker_id, dict(model.classes)))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        frame_id, slot, shape, dtype = task
+        frame = np.ndarray(shape, dtype=dtype, buffer=slots[slot].buf)
+        t0 = time.perf_counter()
+        try:
+            dets = np.asarray(model.extract_detections(model.predict(frame)))
+            error = None
+        except Exception as e:
+            dets, error = None, f"{type(e).__name__}: {e}"
+        del frame  # Представление не должно держать буфер слота
+        results.put(('result', frame_id, slot, dets, error, time.perf_counter() - t0))
+    for shm in slots:
+        shm.close()
+
+
+class InferencePool:
+    """
+    Инференс в K процессах для CPU: каждый процесс один раз загружает
+    YOLOModel с собственным числом потоков torch, поэтому прямые проходы
+    идут параллельно, без GIL и без борьбы потоков одного процесса.
+
+    Кадры передаются через кольцо слотов multiprocessing.shared_memory:
+    копия в слот и короткое задание в очереди вместо сериализации массива.
+    Номер кадра (frame_id) выдаёт submit(); get() возвращает результаты
+    строго в порядке подачи. Пул повторяет интерфейс YOLOModel (classes,
+    predict, predict_batch, extract_detections) и подставляется в
+    VideoProcessor, StreamManager и analyze_video через yolo=; пакет
+    из batch_size кадров при этом расходится по процессам.
+    """
+    def __init__(self, workers: int = 2, model_path: str = 'models/best.pt',
+                 backend: str = BACKEND_TORCH, threads: Optional[int] = None,
+                 slots: Optional[int] = None, slot_bytes: int = DEFAULT_SLOT_BYTES,
+                 model_factory: Optional[Callable[[], Any]] = None,
+                 start_timeout: float = START_TIMEOUT):
+        self.workers = max(1, int(workers))
+        # Потоков torch на процесс; по умолчанию ядра делятся поровну
+        self.threads = threads if threads else max(1, (os.cpu_count() or 1) // self.workers)
+        self.slot_bytes = int(slot_bytes)
+        self.classes: Dict[int, str] = {}
+        # Кадров в обработке одновременно: по два на процесс, чтобы
+        # следующий кадр ждал в очереди, пока текущий считается
+        slot_count = max(self.workers, int(slots) if slots else 2 * self.workers)
+        self._slots = [SharedMemory(create=True, size=self.slot_bytes) for _ in range(slot_count)]
+        self._free: 'queue.Queue[int]' = queue.Queue()
+        for i in range(slot_count):
+            self._free.put(i)
+
+        # spawn: дочерний процесс не наследует состояние потоков torch и OpenMP родителя
+        ctx = mp.get_context('spawn')
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._next_id = 0  # Номер следующего поданного кадра
+        self._next_out = 0  # Номер следующего кадра для get()
+        self._done: Dict[int, Tuple[Optional[np.ndarray], Optional[str], float]] = {}
+        self._closed = False
+        self._failure: Optional[str] = None
+        # Время прямого прохода в процессах: последние замеры и счётчик всех кадров
+        self._latency = LatencyHistogram()
+
+        names = [shm.name for shm in self._slots]
+        self._processes = [
+            ctx.Process(target=_worker_main, name=f'inference-{i}', daemon=True,
+                        args=(i, names, self._tasks, self._results, model_path, backend,
+                              self.threads, model_factory))
+            for i in range(self.workers)]
+        try:
+            for process in self._processes:
+                process.start()
+            self._wait_ready(start_timeout)
+        except BaseException:
+            self.close()
+            raise
+        self._collector = threading.Thread(target=self._collect_loop, name='inference-results',
+                                           daemon=True)
+        self._collector.start()
+
+    def _wait_ready(self, timeout: float) -> None:
+        # Ждёт загрузки модели во всех процессах
+        deadline = time.monotonic() + timeout
+        ready = 0
+        while ready < self.workers:
+            try:
+                message = self._results.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError("Процессы инференса не загрузили модель вовремя") from None
+            if message[0] == 'error':
+                raise RuntimeError(f"Ошибка загрузки модели в процессе {message[1]}: {message[2]}")
+            self.classes = message[2]
+            ready += 1
+
+    def _collect_loop(self) -> None:
+        # Принимает результаты процессов и освобождает слоты
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                if not all(p.is_alive() for p in self._processes):
+                    with self._cond:
+                        self._failure = "Процесс инференса неожиданно завершился"
+                        self._cond.notify_all()
+                    return
+                continue
+            if message is None:
+                return
+            _, frame_id, slot, dets, error, elapsed = message
+            self._free.put(slot)
+            with self._cond:
+                self._done[frame_id] = (dets, error, elapsed)
+                self._latency.observe(elapsed)
+                self._cond.notify_all()
+
+    def submit(self, frame: np.ndarray, timeout: Optional[float] = None) -> int:
+        """
+        Копирует кадр в свободный слот и ставит его в очередь процессов.
+        Возвращает frame_id. Если все слоты заняты — ждёт освобождения.
+        """
+        if self._closed:
+            raise RuntimeError("Пул инференса закрыт")
+        frame = np.asarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Кадр {frame.shape} больше слота общей памяти ({self.slot_bytes} байт)")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._raise_failure()
+            wait = 0.1 if deadline is None else min(0.1, max(0.0, deadline - time.monotonic()))
+            try:
+                slot = self._free.get(timeout=wait)
+                break
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("Нет свободного слота общей памяти") from None
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._slots[slot].buf)
+        np.copyto(view, frame)
+        del view
+        with self._lock:
+            frame_id = self._next_id
+            self._next_id += 1
+            self._tasks.put((frame_id, slot, frame.shape, frame.dtype.str))
+        return frame_id
+
+    def result(self, frame_id: int, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Детекции кадра frame_id (ждёт не дольше timeout).
+        Ошибка прямого прохода в процессе поднимается как RuntimeError.
+        """
+        with self._cond:
+            ok = self._cond.wait_for(lambda: frame_id in self._done or self._failure is not None,
+                                     timeout)
+            if frame_id not in self._done:
+                self._raise_failure()
+                if not ok:
+                    raise TimeoutError(f"Нет результата для кадра {frame_id}")
+            dets, error, _ = self._done.pop(frame_id)
+        if error is not None:
+            raise RuntimeError(f"Ошибка инференса кадра {frame_id}: {error}")
+        return dets
+
+    def get(self, timeout: Optional[float] = None) -> Tuple[int, np.ndarray]:
+        """
+        Следующий результат в порядке подачи: (frame_id, детекции).
+        Не смешивается с predict/predict_batch, которые забирают свои кадры сами.
+        """
+        with self._lock:
+            frame_id = self._next_out
+        dets = self.result(frame_id, timeout)
+        with self._lock:
+            self._next_out = frame_id + 1
+        return frame_id, dets
+
+    def pending(self) -> int:
+        """
+        Число поданных кадров, чей результат ещё не забран через get().
+        """
+        with self._lock:
+            return self._next_id - self._next_out
+
+    def predict(self, frame: np.ndarray) -> np.ndarray:
+        return self.result(self.submit(frame))
+
+    def predict_batch(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Кадры пакета обрабатываются разными процессами параллельно;
+        результаты — в порядке кадров.
+        """
+        ids = [self.submit(frame) for frame in frames]
+        results, error = [], None
+        for frame_id in ids:
+            try:  # Результаты забираются все, даже после ошибки, чтобы не копились
+                results.append(self.result(frame_id))
+            except RuntimeError as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def detect_batch(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        return self.predict_batch(frames)
+
+    @staticmethod
+    def extract_detections(results: Any) -> np.ndarray:
+        # Процессы уже вернули массивы [x1, y1, x2, y2, conf, cls]
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Сводка по прямым проходам в процессах: число кадров, среднее по
+        всем кадрам и p95 по последним замерам, мс.
+        """
+        with self._lock:
+            latency = self._latency.summary()
+        return {
+            'workers': self.workers,
+            'threads_per_worker': self.threads,
+            'frames': latency['count'],
+            'mean_ms': latency['mean_ms'],
+            'p95_ms': latency['p95_ms'],
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Останавливает процессы и удаляет сегменты общей памяти.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for process in self._processes:
+            if process.is_alive():
+                self._tasks.put(None)
+        for process in self._processes:
+            if process.pid is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+        collector = getattr(self, '_collector', None)
+        if collector is not None:
+            self._results.put(None)
+            collector.join(timeout)
+        with self._cond:
+            if self._failure is None:
+                self._failure = "Пул инференса закрыт"
+            self._cond.notify_all()
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._tasks.close()
+        self._results.close()
+
+    def _raise_failure(self) -> None:
+        if self._failure is not None:
+            raise RuntimeError(self._failure)
+
+    def __enter__(self) -> 'InferencePool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
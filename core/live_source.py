@@ -0,0 +1,352 @@
+# core/live_source.py
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+# Режимы буферизации живого источника
+FRESHEST = 'freshest'  # Хранится только самый свежий кадр: минимальная задержка
+SMOOTH = 'smooth'  # Короткая очередь кадров по порядку: плавнее, но с запаздыванием
+
+# Состояния подключения
+STATE_CONNECTING = 'connecting'
+STATE_STREAMING = 'streaming'
+STATE_RECONNECTING = 'reconnecting'
+STATE_FAILED = 'failed'  # Исчерпан лимит переподключений
+STATE_CLOSED = 'closed'
+
+NETWORK_SCHEMES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+
+def is_network_source(source: Any) -> bool:
+    """
+    URL сетевого потока (RTSP, HTTP и т.п.), а не индекс камеры или файл.
+    """
+    return isinstance(source, str) and source.strip().lower().startswith(NETWORK_SCHEMES)
+
+
+def open_capture(source: Any, open_timeout: float = 5.0, read_timeout: float = 5.0) -> cv2.VideoCapture:
+    """
+    cv2.VideoCapture с ограниченным временем открытия и чтения (иначе
+    FFmpeg ждёт пропавший поток десятки секунд) и минимальным внутренним
+    буфером там, где бэкенд его поддерживает.
+    """
+    params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+              cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000)]
+    capture = cv2.VideoCapture(source, cv2.CAP_ANY, params)
+    capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return capture
+
+
+class LiveSource:
+    """
+    Чтение живого источника в отдельном потоке захвата с интерфейсом
+    cv2.VideoCapture (isOpened, read, grab/retrieve, get, set, release),
+    поэтому подставляется вместо capture в VideoProcessor и StreamManager.
+
+    Поток захвата читает кадры сразу по мере поступления, не давая им
+    копиться во внутреннем буфере декодера. В режиме FRESHEST потребитель
+    всегда получает самый свежий кадр, а непрочитанные вытесняются; в
+    режиме SMOOTH кадры идут по порядку через очередь из buffer_size
+    кадров (при переполнении вытесняется самый старый).
+
+    Сбой чтения или открытия ведёт к переподключению с экспоненциальной
+    задержкой от backoff_min до backoff_max секунд. isOpened() остаётся
+    True, пока источник не закрыт и не исчерпан лимит max_reconnects;
+    во время переподключения read() сразу возвращает (False, None).
+    Статистика здоровья — в stats().
+
+    capture_factory(source) открывает источник (по умолчанию open_capture);
+    для проверки без сети подойдёт файл: с pace=True он отдаётся в темпе
+    своего FPS, а конец файла воспринимается как обрыв потока.
+    """
+    live = True  # Признак для циклов чтения: неудачный read() — не конец источника
+
+    def __init__(self, source: Any, mode: str = FRESHEST, buffer_size: int = 4,
+                 read_timeout: float = 1.0, open_timeout: float = 5.0,
+                 backoff_min: float = 0.5, backoff_max: float = 10.0,
+                 max_reconnects: Optional[int] = None, failures_to_reconnect: int = 3,
+                 pace: bool = False,
+                 capture_factory: Optional[Callable[[Any], Any]] = None):
+        if mode not in (FRESHEST, SMOOTH):
+            raise ValueError(f"Неизвестный режим буферизации: {mode}")
+        self.source = source
+        self.mode = mode
+        self.read_timeout = read_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.max_reconnects = max_reconnects
+        self.failures_to_reconnect = max(1, int(failures_to_reconnect))
+        self.pace = pace
+        self._factory = capture_factory or (lambda src: open_capture(src, open_timeout, read_timeout))
+
+        depth = 1 if mode == FRESHEST else max(1, int(buffer_size))
+        # Свободные буферы кадров. Буфер занят, пока кадр в очереди, в декодере
+        # или взят grab(), и возвращается сюда только после копирования в
+        # retrieve() или вытеснения из очереди: декодер пишет лишь в свободный
+        self._free: list = []
+        self._free_limit = depth + 2  # Очередь, кадр в декодере и взятый grab()
+        self._frames: deque = deque()  # (кадр, seq, pts_ms, captured_at), не длиннее depth
+        self._depth = depth
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._capture = None
+        self._grabbed: Optional[tuple] = None  # Кадр, взятый grab() до retrieve()
+        self._delivered: Optional[Tuple[int, float]] = None  # (seq, pts_ms) последнего отданного кадра
+        self._seq = 0  # Номер принятого кадра (сквозной через переподключения)
+
+        # Статистика
+        self.state = STATE_CONNECTING
+        self.fps = 0.0  # FPS источника по данным декодера
+        self.width = 0
+        self.height = 0
+        self.frames_received = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0  # Вытеснены, не дойдя до потребителя
+        self.decode_errors = 0
+        self.reconnects = 0  # Успешные переподключения после первого открытия
+        self.reconnect_attempts = 0
+        self.last_error: Optional[str] = None
+        self._last_frame_at = 0.0
+        self._delivery_lag = deque(maxlen=100)  # Возраст кадра при выдаче, с
+        self._source_lag = 0.0  # Отставание приёма от часов источника, с
+        self._clock: Optional[Tuple[float, float]] = None  # (время приёма, PTS) первого кадра
+
+        self._thread = threading.Thread(target=self._grab_loop, name=f"ve-live-{source}", daemon=True)
+        self._thread.start()
+
+    # --- Интерфейс cv2.VideoCapture ------------------------------------------
+
+    def isOpened(self) -> bool:
+        return self.state not in (STATE_FAILED, STATE_CLOSED)
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Следующий кадр (в FRESHEST — самый свежий из ещё не отданных).
+        Ждёт не дольше read_timeout, в том числе пока идёт переподключение;
+        после release() или исчерпания переподключений не ждёт вовсе.
+        Если передан image подходящей формы, кадр копируется в него.
+        """
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def grab(self) -> bool:
+        deadline = time.monotonic() + self.read_timeout
+        with self._cond:
+            while not self._frames:
+                if self.state in (STATE_FAILED, STATE_CLOSED) or self._stop.is_set():
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            if self._grabbed is not None:  # grab() без retrieve(): прежний кадр пропадает
+                self._release_buffer(self._grabbed[0])
+            self._grabbed = self._frames.popleft()
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        with self._cond:
+            item, self._grabbed = self._grabbed, None
+            if item is None:
+                return False, None
+        # Буфер занят до конца копирования, так что копировать можно без блокировки
+        buffer, seq, pts_ms, captured_at = item
+        if image is not None and image.shape == buffer.shape and image.dtype == buffer.dtype:
+            np.copyto(image, buffer)
+            frame = image
+        else:
+            frame = buffer.copy()
+        with self._cond:
+            self._release_buffer(buffer)
+            self._delivered = (seq, pts_ms)
+            self.frames_delivered += 1
+            self._delivery_lag.append(time.monotonic() - captured_at)
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self._delivered[1] if self._delivered else 0.0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._delivered[0]) if self._delivered else 0.0
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0  # В том числе CAP_PROP_FRAME_COUNT: у живого источника нет длины
+
+    def set(self, prop: int, value: float) -> bool:
+        return False  # Живой источник не перематывается
+
+    def release(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self.state = STATE_CLOSED
+            self._cond.notify_all()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.read_timeout + 2.0)
+        self._close_capture()
+        with self._cond:
+            self._frames.clear()
+            self._free.clear()
+            self._grabbed = None
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждёт первого успешного подключения (или отказа). True — источник
+        отдаёт кадры или в буфере уже есть кадры для чтения.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.state not in (STATE_CONNECTING, STATE_RECONNECTING)
+                                or self.frames_received > 0, timeout)
+            return self.state == STATE_STREAMING or bool(self._frames)
+
+    # --- Статистика -----------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Здоровье источника: состояние, счётчики кадров, ошибок декодирования
+        и переподключений, возраст последнего кадра, задержка выдачи
+        (сколько кадр ждал потребителя, среднее по последним 100) и
+        отставание приёма от часов источника (растёт, если кадры копятся
+        в буферах до нас).
+        """
+        now = time.monotonic()
+        lag = list(self._delivery_lag)
+        return {
+            'source': str(self.source),
+            'mode': self.mode,
+            'state': self.state,
+            'fps': self.fps,
+            'frames_received': self.frames_received,
+            'frames_delivered': self.frames_delivered,
+            'frames_dropped': self.frames_dropped,
+            'decode_errors': self.decode_errors,
+            'reconnects': self.reconnects,
+            'reconnect_attempts': self.reconnect_attempts,
+            'last_frame_age_s': now - self._last_frame_at if self._last_frame_at else None,
+            'delivery_lag_ms': float(np.mean(lag)) * 1000 if lag else 0.0,
+            'source_lag_ms': self._source_lag * 1000,
+            'last_error': self.last_error,
+        }
+
+    # --- Поток захвата ----------------------------------------------------------
+
+    def _grab_loop(self) -> None:
+        attempt = 0  # Неудачных попыток подряд (для задержки)
+        opened_once = False
+        while not self._stop.is_set():
+            if self._capture is None:
+                if opened_once or attempt:
+                    if self.max_reconnects is not None and self.reconnect_attempts >= self.max_reconnects:
+                        self._set_state(STATE_FAILED)
+                        return
+                    delay = min(self.backoff_max, self.backoff_min * (2 ** max(0, attempt - 1)))
+                    if attempt and self._stop.wait(delay):
+                        break
+                    self.reconnect_attempts += 1
+                if not self._open():
+                    attempt += 1
+                    continue
+                if opened_once:
+                    self.reconnects += 1
+                opened_once = True
+                attempt = 0
+                self._set_state(STATE_STREAMING)
+            self._read_frames()
+            if not self._stop.is_set():
+                # Чтение сорвалось: закрываем и переподключаемся
+                self._close_capture()
+                self._set_state(STATE_RECONNECTING)
+                attempt = 1
+        self._close_capture()
+
+    def _open(self) -> bool:
+        try:
+            capture = self._factory(self.source)
+            opened = capture is not None and capture.isOpened()
+        except Exception as e:  # Фабрика может бросить, например, при неверном URL
+            capture, opened = None, False
+            self.last_error = f"{type(e).__name__}: {e}"
+        if not opened:
+            if capture is not None:
+                capture.release()
+            self.last_error = self.last_error or f"Не удалось открыть {self.source}"
+            self._set_state(STATE_RECONNECTING)
+            return False
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self._capture = capture
+        self._clock = None
+        self.last_error = None
+        return True
+
+    def _read_frames(self) -> None:
+        # Чтение до сбоя: failures_to_reconnect неудачных read() подряд
+        capture = self._capture
+        interval = 1.0 / self.fps if self.pace and self.fps > 0 else 0.0
+        next_time = time.monotonic()
+        failures = 0
+        while not self._stop.is_set():
+            with self._cond:
+                buffer = self._free.pop() if self._free else None
+            ret, frame = capture.read(image=buffer) if buffer is not None else capture.read()
+            if not ret:
+                with self._cond:
+                    self._release_buffer(buffer)
+                self.decode_errors += 1
+                failures += 1
+                if failures >= self.failures_to_reconnect:
+                    self.last_error = "Сбой чтения кадра"
+                    return
+                continue
+            failures = 0
+            now = time.monotonic()
+            self._seq += 1
+            pts_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+            self._track_clock(now, pts_ms)
+            self.height, self.width = frame.shape[:2]
+            self._last_frame_at = now
+            self.frames_received += 1
+            with self._cond:
+                if len(self._frames) >= self._depth:
+                    self._release_buffer(self._frames.popleft()[0])
+                    self.frames_dropped += 1
+                self._frames.append((frame, self._seq, pts_ms, now))
+                self._cond.notify_all()
+            if interval:
+                next_time += interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_time = time.monotonic()
+
+    def _track_clock(self, now: float, pts_ms: float) -> None:
+        # Отставание = прошло времени по нашим часам - прошло по PTS источника
+        if pts_ms <= 0:
+            return
+        if self._clock is None:
+            self._clock = (now, pts_ms)
+            return
+        self._source_lag = (now - self._clock[0]) - (pts_ms - self._clock[1]) / 1000.0
+
+    def _release_buffer(self, buffer: Optional[np.ndarray]) -> None:
+        # Вызывается под self._cond; лишние буферы (после смены размера кадра) отпускаются
+        if buffer is not None and len(self._free) < self._free_limit:
+            self._free.append(buffer)
+
+    def _set_state(self, state: str) -> None:
+        with self._cond:
+            if self.state != STATE_CLOSED:
+                self.state = state
+            self._cond.notify_all()
+
+    def _close_capture(self) -> None:
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.release()
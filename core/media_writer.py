@@ -0,0 +1,272 @@
+# core/media_writer.py
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.frame_queue import FrameQueue, DROP_OLDEST
+from utils.overlay import OverlayRenderer
+
+# Режимы записи клипов
+RECORD_OFF = 'off'  # Запись выключена (снимки работают всегда)
+RECORD_CONTINUOUS = 'continuous'  # Непрерывная запись до stop_recording()
+RECORD_EVENTS = 'events'  # Клип на каждое событие (кадр с детекциями или trigger_event())
+
+_CLOSE = 'close'  # Служебный элемент очереди записи: закрыть клип
+
+
+class MediaWriter:
+    """
+    Фоновая запись снимков и видеоклипов.
+    Обрабатывающий цикл только кладёт кадр в ограниченную очередь
+    (write() не ждёт диск), а кодирование и запись идут в отдельных
+    потоках. При переполнении очереди отбрасываются самые старые кадры,
+    а не тормозится захват. Для клипов по событию последние pre_roll
+    секунд кадров хранятся в кольцевом буфере и попадают в начало клипа;
+    клип закрывается через post_roll секунд после последнего события —
+    потоком записи по сроку, даже если новые кадры не приходят.
+    """
+    def __init__(self, output_dir: str = 'recordings', fps: float = 25.0, fourcc: str = 'mp4v',
+                 extension: str = '.mp4', pre_roll: float = 3.0, post_roll: float = 2.0,
+                 annotate: bool = True, classes: Optional[Dict[int, str]] = None,
+                 queue_size: int = 64, snapshot_queue_size: int = 16):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.fourcc = fourcc
+        self.extension = extension
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.annotate = annotate  # Рисовать рамки на кадрах клипа (в потоке записи)
+        self.mode = RECORD_OFF
+        self.frames_dropped = 0  # Кадры, не попавшие в клип из-за переполнения
+        self.frames_written = 0
+        self.snapshots_written = 0
+        self.clips: List[str] = []  # Пути закрытых клипов
+        self._overlay = OverlayRenderer(classes)
+        self._pre_roll = deque()  # (время, кадр, детекции) за последние pre_roll секунд
+        self._clip_path: Optional[str] = None  # Клип, в который сейчас идут кадры
+        self._clip_until = 0.0  # Момент окончания клипа по событию (time.monotonic)
+        self._lock = threading.Lock()
+        self._frames = FrameQueue(queue_size, DROP_OLDEST)
+        self._snapshots = FrameQueue(snapshot_queue_size, DROP_OLDEST)
+        self._completed = deque()  # (путь снимка, успех) для опроса интерфейсом
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._writer_path: Optional[str] = None
+        self._writer_size: Optional[Tuple[int, int]] = None
+        self._threads = [
+            threading.Thread(target=self._record_loop, name="ve-recorder", daemon=True),
+            threading.Thread(target=self._snapshot_loop, name="ve-snapshots", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def recording(self) -> bool:
+        return self._clip_path is not None
+
+    def snapshot(self, frame: np.ndarray, path: str, params: Optional[List[int]] = None) -> str:
+        """
+        Ставит снимок в очередь записи (формат — по расширению path,
+        например .jpg или .png) и сразу возвращает путь. Кадр копируется.
+        Результат можно забрать через pop_completed().
+        """
+        self._snapshots.put((path, frame.copy(), params or []))
+        return path
+
+    def pop_completed(self) -> List[Tuple[str, bool]]:
+        """
+        Возвращает записанные с прошлого вызова снимки: [(путь, успех)].
+        """
+        done = []
+        while self._completed:
+            done.append(self._completed.popleft())
+        return done
+
+    def start_recording(self, mode: str = RECORD_CONTINUOUS) -> None:
+        """
+        Включает запись: непрерывную (клип открывается сразу) или по событиям.
+        """
+        if mode not in (RECORD_CONTINUOUS, RECORD_EVENTS):
+            raise ValueError(f"Неизвестный режим записи: {mode}")
+        with self._lock:
+            self._close_clip()
+            self.mode = mode
+            if mode == RECORD_CONTINUOUS:
+                self._clip_path = self._new_clip_path()
+
+    def stop_recording(self) -> None:
+        """
+        Выключает запись и закрывает текущий клип.
+        """
+        with self._lock:
+            self.mode = RECORD_OFF
+            self._close_clip()
+            self._pre_roll.clear()
+
+    def trigger_event(self) -> None:
+        """
+        Отмечает событие вручную: в режиме событий открывает клип с
+        предзаписью или продлевает текущий.
+        """
+        with self._lock:
+            if self.mode == RECORD_EVENTS:
+                self._on_event(time.monotonic())
+
+    def write(self, frame: np.ndarray, detections: Optional[np.ndarray] = None) -> None:
+        """
+        Передаёт кадр обрабатывающего цикла. Никогда не блокируется:
+        кадр копируется (буферы конвейера переиспользуются) и кладётся в
+        кольцевой буфер предзаписи и/или в очередь записи. В режиме событий
+        кадр с детекциями считается событием.
+        """
+        if self.mode == RECORD_OFF:
+            return
+        now = time.monotonic()
+        dets = None if detections is None else np.array(detections, copy=True)
+        item = (frame.copy(), dets)
+        with self._lock:
+            if self.mode == RECORD_EVENTS:
+                if dets is not None and len(dets):
+                    self._on_event(now)
+                elif self._clip_path is not None and now > self._clip_until:
+                    self._close_clip()
+                if self._clip_path is None:
+                    self._pre_roll.append((now, item))
+                    while self._pre_roll and now - self._pre_roll[0][0] > self.pre_roll:
+                        self._pre_roll.popleft()
+                    return
+            if self._clip_path is not None:
+                self._enqueue(self._clip_path, item)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Счётчики записи: кадры записанные и отброшенные, снимки, клипы.
+        """
+        return {
+            'mode': self.mode,
+            'recording': self.recording,
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped + self._frames.dropped,
+            'snapshots_written': self.snapshots_written,
+            'snapshots_dropped': self._snapshots.dropped,
+            'clips': len(self.clips),
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Закрывает текущий клип, дописывает очереди и останавливает потоки.
+        """
+        self.stop_recording()
+        self._frames.close()
+        self._snapshots.close()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    # --- Внутреннее ----------------------------------------------------------
+
+    def _new_clip_path(self) -> str:
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"clip_{stamp}")
+        path, n = base + self.extension, 1
+        while path in self.clips or path == self._writer_path or os.path.exists(path):
+            path, n = f"{base}_{n}{self.extension}", n + 1
+        return path
+
+    def _on_event(self, now: float) -> None:
+        # Вызывается под self._lock
+        self._clip_until = now + self.post_roll
+        if self._clip_path is None:
+            self._clip_path = self._new_clip_path()
+            for _, item in self._pre_roll:
+                self._enqueue(self._clip_path, item)
+            self._pre_roll.clear()
+
+    def _close_clip(self) -> None:
+        # Вызывается под self._lock
+        if self._clip_path is not None:
+            # Служебный элемент может быть вытеснен при переполнении —
+            # тогда клип закроется на первом кадре следующего клипа или при close()
+            self._frames.put((_CLOSE, self._clip_path))
+            self._clip_path = None
+
+    def _enqueue(self, clip_path: str, item) -> None:
+        self._frames.put((clip_path, item))
+
+    def _record_timeout(self) -> float:
+        # Пока открыт клип по событию, поток записи просыпается к его сроку
+        if self.mode == RECORD_EVENTS and self._clip_path is not None:
+            return min(0.5, max(self._clip_until - time.monotonic(), 0.0) + 0.01)
+        return 0.5
+
+    def _expire_clip(self) -> None:
+        # Кадры перестали приходить (поток остановлен или источник молчит) —
+        # клип по событию закрывается по сроку, а не на следующем write()
+        with self._lock:
+            if (self.mode == RECORD_EVENTS and self._clip_path is not None
+                    and time.monotonic() > self._clip_until):
+                self._close_clip()
+
+    def _record_loop(self) -> None:
+        while True:
+            entry = self._frames.get(timeout=self._record_timeout())
+            if entry is None:
+                if self._frames.closed:
+                    break
+                self._expire_clip()
+                continue
+            clip_path, payload = entry
+            if clip_path == _CLOSE:
+                if payload == self._writer_path:
+                    self._release_writer()
+                continue
+            frame, dets = payload
+            if clip_path != self._writer_path:
+                self._release_writer()
+                if not self._open_writer(clip_path, frame):
+                    self.frames_dropped += 1
+                    continue
+            if self.annotate and dets is not None and len(dets):
+                frame = self._overlay.draw(frame, dets)
+            if (frame.shape[1], frame.shape[0]) != self._writer_size:
+                frame = cv2.resize(frame, self._writer_size)
+            self._writer.write(frame)
+            self.frames_written += 1
+        self._release_writer()
+
+    def _open_writer(self, path: str, frame: np.ndarray) -> bool:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        size = (frame.shape[1], frame.shape[0])
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps or 25.0, size)
+        if not writer.isOpened():
+            print(f"Не удалось открыть файл записи: {path}")
+            return False
+        self._writer, self._writer_path, self._writer_size = writer, path, size
+        return True
+
+    def _release_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self.clips.append(self._writer_path)
+        self._writer, self._writer_path, self._writer_size = None, None, None
+
+    def _snapshot_loop(self) -> None:
+        while True:
+            entry = self._snapshots.get(timeout=0.5)
+            if entry is None:
+                if self._snapshots.closed:
+                    break
+                continue
+            path, frame, params = entry
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                ok = cv2.imwrite(path, frame, params)
+            except cv2.error as e:
+                print(f"Ошибка записи снимка {path}: {e}")
+                ok = False
+            if ok:
+                self.snapshots_written += 1
+            self._completed.append((path, ok))
@@ -0,0 +1,398 @@
+# core/metrics.py
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# Квантили, которые выдаются в снимке и в формате Prometheus
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Задержки одной стадии: кольцевой буфер последних window замеров
+    (по нему считаются p50/p95/p99) и накопленные сумма, число и максимум.
+    """
+    def __init__(self, window: int = 1024):
+        self._samples = np.zeros(window, dtype=np.float64)
+        self._next = 0
+        self._filled = 0
+        self.count = 0  # Число обработанных элементов (кадров)
+        self.total = 0.0  # Суммарное время, с
+        self.max = 0.0
+
+    def observe(self, seconds: float, count: int = 1) -> None:
+        # Для пакета в буфер пишется время на один элемент
+        per_item = seconds / count if count > 1 else seconds
+        self._samples[self._next] = per_item
+        self._next = (self._next + 1) % len(self._samples)
+        self._filled = min(self._filled + 1, len(self._samples))
+        self.count += count
+        self.total += seconds
+        if per_item > self.max:
+            self.max = per_item
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self._filled:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.quantile(self._samples[:self._filled], QUANTILES)
+        return dict(zip(QUANTILES, values.tolist()))
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Сводка в миллисекундах: всего, среднее на элемент, квантили, максимум.
+        """
+        quantiles = self.quantiles()
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000.0,
+            'mean_ms': self.total * 1000.0 / max(1, self.count),
+            'p50_ms': quantiles[0.5] * 1000.0,
+            'p95_ms': quantiles[0.95] * 1000.0,
+            'p99_ms': quantiles[0.99] * 1000.0,
+            'max_ms': self.max * 1000.0,
+        }
+
+
+class RollingFps:
+    """
+    Частота кадров за последние window секунд (а не с момента запуска),
+    поэтому подвисания сразу видны в показаниях.
+    """
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self._ticks = deque()
+
+    def tick(self, count: int = 1, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._ticks.append((now, count))
+        self._trim(now)
+
+    def value(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        if len(self._ticks) < 2:
+            return 0.0
+        span = now - self._ticks[0][0]
+        # Первый отсчёт открывает окно, поэтому его кадры не учитываются
+        frames = sum(count for _, count in self._ticks) - self._ticks[0][1]
+        return frames / span if span > 0 else 0.0
+
+    def reset(self) -> None:
+        self._ticks.clear()
+
+    def _trim(self, now: float) -> None:
+        while self._ticks and now - self._ticks[0][0] > self.window:
+            self._ticks.popleft()
+
+
+class _StageTimer:
+    # Контекстный менеджер замера одной стадии
+    __slots__ = ('_metrics', '_stage', '_count', '_t0')
+
+    def __init__(self, metrics: 'PipelineMetrics', stage: str, count: int):
+        self._metrics = metrics
+        self._stage = stage
+        self._count = count
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._stage, time.perf_counter() - self._t0, self._count)
+        return False
+
+
+class _NullTimer:
+    # Пустой замер для выключенных метрик: не обращается к часам
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PipelineMetrics:
+    """
+    Метрики конвейера видео: задержки стадий (декодирование, ресайз,
+    инференс, постобработка, отрисовка, вывод в Tk), скользящий FPS,
+    счётчики и датчики (глубина очередей, отброшенные кадры).
+    Выключенный объект (enabled=False) ничего не хранит, и каждый вызов
+    сводится к проверке флага. Датчики-функции опрашиваются только при
+    снятии снимка, поэтому не стоят ничего в горячем цикле.
+    """
+    def __init__(self, enabled: bool = True, window: int = 1024, fps_window: float = 2.0):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_fns: Dict[str, Callable[[], Any]] = {}
+        self._fps = RollingFps(fps_window)
+        self._started = time.monotonic()
+
+    def time(self, stage: str, count: int = 1):
+        """
+        Замер стадии: with metrics.time('inference', len(batch)): ...
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage, count)
+
+    def observe(self, stage: str, seconds: float, count: int = 1) -> None:
+        """
+        Добавляет замер длительности стадии (для пакета — на count элементов).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = LatencyHistogram(self.window)
+            hist.observe(seconds, count)
+
+    def inc(self, name: str, value: int = 1) -> None:
+        """
+        Увеличивает счётчик.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        Записывает текущее значение датчика.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_gauge(self, name: str, fn: Callable[[], Any]) -> None:
+        """
+        Регистрирует датчик-функцию. Она должна вернуть число или словарь
+        {имя: число}; в снимке ключи словаря получают префикс name_.
+        """
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def tick_frame(self, count: int = 1) -> None:
+        """
+        Отмечает выданные кадры для скользящего FPS.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._fps.tick(count)
+            self._counters['frames'] = self._counters.get('frames', 0) + count
+
+    def fps(self) -> float:
+        with self._lock:
+            return self._fps.value()
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Сводка задержек по стадиям в миллисекундах.
+        """
+        with self._lock:
+            return {stage: hist.summary() for stage, hist in self._stages.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Снимок всех метрик: время, FPS, стадии, счётчики, датчики.
+        """
+        with self._lock:
+            gauge_fns = list(self._gauge_fns.items())
+            gauges = dict(self._gauges)
+            result = {
+                'timestamp': time.time(),
+                'uptime': time.monotonic() - self._started,
+                'fps': self._fps.value(),
+                'stages': {stage: hist.summary() for stage, hist in self._stages.items()},
+                'counters': dict(self._counters),
+            }
+        for name, fn in gauge_fns:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                gauges.update({f"{name}_{key}": val for key, val in value.items()})
+            else:
+                gauges[name] = value
+        result['gauges'] = gauges
+        return result
+
+    def reset(self) -> None:
+        """
+        Сбрасывает накопленные замеры и счётчики (датчики-функции остаются).
+        """
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._fps.reset()
+            self._started = time.monotonic()
+
+    def to_prometheus(self, prefix: str = 'visionedge') -> str:
+        """
+        Текстовый формат экспозиции Prometheus (summary по стадиям,
+        счётчики и датчики).
+        """
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_fps gauge", f"{prefix}_fps {snap['fps']:.6g}"]
+        if snap['stages']:
+            name = f"{prefix}_stage_latency_seconds"
+            lines.append(f"# TYPE {name} summary")
+            for stage, stats in snap['stages'].items():
+                for q in QUANTILES:
+                    value = stats[f"p{int(q * 100)}_ms"] / 1000.0
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {value:.6g}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {stats["total_ms"] / 1000.0:.6g}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+        for counter, value in snap['counters'].items():
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            lines.append(f"{prefix}_{counter}_total {value}")
+        for gauge, value in snap['gauges'].items():
+            lines.append(f"# TYPE {prefix}_{gauge} gauge")
+            lines.append(f"{prefix}_{gauge} {float(value):.6g}")
+        return "\n".join(lines) + "\n"
+
+
+def flatten_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Превращает снимок в плоскую строку для CSV: stage_inference_p95_ms, ...
+    """
+    row = {'timestamp': snapshot['timestamp'], 'uptime': snapshot['uptime'], 'fps': snapshot['fps']}
+    for stage, stats in snapshot['stages'].items():
+        for key, value in stats.items():
+            row[f"stage_{stage}_{key}"] = value
+    for name, value in snapshot['counters'].items():
+        row[f"counter_{name}"] = value
+    for name, value in snapshot['gauges'].items():
+        row[f"gauge_{name}"] = value
+    return row
+
+
+def dump_metrics(metrics: PipelineMetrics, path: str) -> None:
+    """
+    Дописывает снимок метрик в файл: .csv — строка таблицы, иначе — строка JSON.
+    """
+    snapshot = metrics.snapshot()
+    if path.lower().endswith('.csv'):
+        row = flatten_snapshot(snapshot)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        fieldnames = list(row)
+        if not new_file:
+            # Заголовок файла уже записан; новые стадии в существующий файл не добавляются
+            with open(path, newline='', encoding='utf-8') as f:
+                fieldnames = next(csv.reader(f), fieldnames)
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+    else:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+
+
+class MetricsDumper:
+    """
+    Фоновый поток, раз в interval секунд дописывающий снимок метрик
+    в JSON Lines или CSV. При остановке записывает последний снимок.
+    """
+    def __init__(self, metrics: PipelineMetrics, path: str, interval: float = 5.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetricsDumper':
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ve-metrics-dump", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        dump_metrics(self.metrics, self.path)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                dump_metrics(self.metrics, self.path)
+            except OSError as e:
+                print(f"Ошибка записи метрик: {e}")
+
+
+class MetricsServer:
+    """
+    Локальный HTTP-эндпоинт /metrics в текстовом формате Prometheus
+    (и /metrics.json со снимком). port=0 выбирает свободный порт.
+    """
+    def __init__(self, metrics: PipelineMetrics, host: str = '127.0.0.1', port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetricsServer':
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = metrics.to_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Не засоряем консоль запросами сборщика
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ve-metrics-http",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=2.0)
+        self._server = None
+        self._thread = None
@@ -0,0 +1,257 @@
+# core/roi.py
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Файл с областями интереса по источникам (рядом с базой пользователей)
+ROI_CONFIG_PATH = os.path.join('data', 'rois.json')
+
+# Метрики перекрытия для NMS между тайлами
+OVERLAP_IOU = 'iou'  # Пересечение к объединению
+OVERLAP_IOS = 'ios'  # Пересечение к меньшей рамке: склеивает обрезанные краем тайла рамки
+
+
+class Region:
+    """
+    Область интереса: прямоугольник (x1, y1, x2, y2) или многоугольник
+    [(x, y), ...]. При normalized=True координаты заданы в долях кадра
+    (0..1) и не зависят от разрешения источника.
+    """
+    def __init__(self, rect: Optional[Sequence[float]] = None,
+                 polygon: Optional[Sequence[Sequence[float]]] = None,
+                 normalized: bool = False, name: str = ''):
+        if (rect is None) == (polygon is None):
+            raise ValueError("Область задаётся либо прямоугольником, либо многоугольником")
+        if polygon is not None and len(polygon) < 3:
+            raise ValueError("Многоугольник должен содержать не меньше трёх точек")
+        self.rect = None if rect is None else [float(v) for v in rect]
+        self.polygon = None if polygon is None else [[float(x), float(y)] for x, y in polygon]
+        self.normalized = normalized
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Region':
+        return cls(rect=data.get('rect'), polygon=data.get('polygon'),
+                   normalized=bool(data.get('normalized', False)), name=data.get('name', ''))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {'name': self.name, 'normalized': self.normalized}
+        if self.rect is not None:
+            data['rect'] = self.rect
+        else:
+            data['polygon'] = self.polygon
+        return data
+
+    def points(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Вершины области в пикселях кадра формы shape = (высота, ширина, ...).
+        """
+        if self.rect is not None:
+            x1, y1, x2, y2 = self.rect
+            pts = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float64)
+        else:
+            pts = np.array(self.polygon, dtype=np.float64)
+        if self.normalized:
+            pts = pts * [shape[1], shape[0]]
+        return pts
+
+    def bounds(self, shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """
+        Описанный прямоугольник области, обрезанный по кадру.
+        """
+        pts = self.points(shape)
+        x1, y1 = np.floor(pts.min(axis=0)).astype(int)
+        x2, y2 = np.ceil(pts.max(axis=0)).astype(int)
+        return (max(0, x1), max(0, y1), min(shape[1], x2), min(shape[0], y2))
+
+    def contains(self, xy: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Маска точек (N, 2), лежащих внутри области (граница включается).
+        """
+        if self.rect is not None:
+            x1, y1, x2, y2 = self.bounds(shape)
+            return (xy[:, 0] >= x1) & (xy[:, 0] <= x2) & (xy[:, 1] >= y1) & (xy[:, 1] <= y2)
+        contour = self.points(shape).astype(np.float32).reshape(-1, 1, 2)
+        return np.array([cv2.pointPolygonTest(contour, (float(x), float(y)), False) >= 0
+                         for x, y in xy], dtype=bool)
+
+
+def load_regions(path: str = ROI_CONFIG_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Читает настройки областей по источникам:
+    {"источник": {"regions": [{"rect": [...]} | {"polygon": [[x, y], ...]}],
+                  "tile_size": 640, "overlap": 0.2}}.
+    Отсутствующий файл означает, что областей нет.
+    """
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return {
+        str(source): {
+            'regions': [Region.from_dict(r) for r in entry.get('regions', [])],
+            'tile_size': entry.get('tile_size'),
+            'overlap': entry.get('overlap', 0.2),
+        }
+        for source, entry in config.items()
+    }
+
+
+def save_regions(config: Dict[str, Dict[str, Any]], path: str = ROI_CONFIG_PATH) -> None:
+    """
+    Сохраняет настройки областей в формате load_regions().
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = {
+        str(source): {
+            'regions': [r.to_dict() for r in entry.get('regions', [])],
+            'tile_size': entry.get('tile_size'),
+            'overlap': entry.get('overlap', 0.2),
+        }
+        for source, entry in config.items()
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def tile_grid(bounds: Tuple[int, int, int, int], tile_size: int,
+              overlap: float = 0.2) -> List[Tuple[int, int, int, int]]:
+    """
+    Разбивает прямоугольник на квадратные тайлы tile_size с перекрытием
+    overlap (доля стороны). Последний тайл ряда прижимается к краю, чтобы
+    все тайлы были одного размера; область меньше тайла даёт один тайл.
+    """
+    x1, y1, x2, y2 = bounds
+    step = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(lo: int, hi: int) -> List[int]:
+        if hi - lo <= tile_size:
+            return [lo]
+        result = list(range(lo, hi - tile_size, step))
+        result.append(hi - tile_size)
+        return result
+
+    return [(x, y, min(x + tile_size, x2), min(y + tile_size, y2))
+            for y in starts(y1, y2) for x in starts(x1, x2)]
+
+
+def overlap_matrix(boxes: np.ndarray, metric: str = OVERLAP_IOU) -> np.ndarray:
+    """
+    Попарное перекрытие рамок [x1, y1, x2, y2]: IoU или IoS.
+    """
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if metric == OVERLAP_IOS:
+        denom = np.minimum(areas[:, None], areas[None, :])
+    else:
+        denom = areas[:, None] + areas[None, :] - inter
+    return inter / np.maximum(denom, 1e-9)
+
+
+def nms(detections: np.ndarray, threshold: float = 0.5, metric: str = OVERLAP_IOU) -> np.ndarray:
+    """
+    Жадное подавление пересекающихся рамок одного класса для детекций
+    [x1, y1, x2, y2, conf, cls]. Возвращает оставшиеся по убыванию уверенности.
+    """
+    if len(detections) < 2:
+        return detections
+    detections = detections[np.argsort(-detections[:, 4], kind='stable')]
+    overlaps = overlap_matrix(detections[:, :4], metric)
+    overlaps[detections[:, None, 5] != detections[None, :, 5]] = 0.0
+    keep = np.ones(len(detections), dtype=bool)
+    for i in range(len(detections)):
+        if keep[i]:
+            keep[i + 1:] &= overlaps[i, i + 1:] <= threshold
+    return detections[keep]
+
+
+class RegionDetector:
+    """
+    Детекция только внутри областей интереса. Кропы областей (или тайлы
+    tile_size внутри них, в стиле SAHI) берутся из кадра в исходном
+    разрешении и уходят в модель одним пакетом; рамки переводятся в
+    координаты кадра, склеиваются NMS между тайлами и фильтруются по
+    многоугольнику (центр рамки должен лежать внутри области). Без
+    областей весь кадр считается одной областью — так работает чистый
+    тайлинг для камер высокого разрешения.
+    """
+    def __init__(self, yolo, regions: Optional[List[Region]] = None, tile_size: Optional[int] = None,
+                 overlap: float = 0.2, full_region: bool = True, nms_threshold: float = 0.5,
+                 nms_metric: str = OVERLAP_IOS):
+        self.yolo = yolo
+        self.regions = list(regions or [])
+        self.tile_size = tile_size
+        self.overlap = overlap
+        # Вместе с тайлами прогонять и всю область целиком: крупные объекты
+        # не помещаются в тайл и иначе распадаются на части
+        self.full_region = full_region
+        self.nms_threshold = nms_threshold
+        self.nms_metric = nms_metric
+
+    def prepare(self, frame: np.ndarray) -> Tuple[List[np.ndarray], List[Tuple[int, int]]]:
+        """
+        Кропы для модели и смещения (x, y) их левых верхних углов.
+        """
+        shape = frame.shape
+        bounds = [r.bounds(shape) for r in self.regions] or [(0, 0, shape[1], shape[0])]
+        rects = []
+        for b in bounds:
+            if b[2] <= b[0] or b[3] <= b[1]:
+                continue
+            tiles = tile_grid(b, self.tile_size, self.overlap) if self.tile_size else [b]
+            if len(tiles) > 1 and self.full_region:
+                tiles.append(b)
+            rects.extend(tiles)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+        return crops, [(x1, y1) for x1, y1, _, _ in rects]
+
+    def merge(self, shape: Tuple[int, ...], offsets: List[Tuple[int, int]],
+              detections: List[np.ndarray]) -> np.ndarray:
+        """
+        Склеивает детекции кропов в координатах полного кадра.
+        """
+        parts = []
+        for (dx, dy), dets in zip(offsets, detections):
+            if len(dets):
+                dets = np.array(dets[:, :6], dtype=np.float32)
+                dets[:, [0, 2]] += dx
+                dets[:, [1, 3]] += dy
+                parts.append(dets)
+        if not parts:
+            return np.zeros((0, 6), dtype=np.float32)
+        merged = np.concatenate(parts)
+        if len(offsets) > 1:
+            merged = nms(merged, self.nms_threshold, self.nms_metric)
+        polygons = [r for r in self.regions if r.polygon is not None]
+        if polygons:
+            centers = (merged[:, :2] + merged[:, 2:4]) / 2
+            inside = np.zeros(len(merged), dtype=bool)
+            for region in self.regions:
+                inside |= region.contains(centers, shape)
+            merged = merged[inside]
+        return merged
+
+    def detect_batch(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Детекции для нескольких кадров за один прямой проход по всем кропам.
+        """
+        plans = [self.prepare(f) for f in frames]
+        crops = [crop for c, _ in plans for crop in c]
+        results = self.yolo.predict_batch(crops) if crops else []
+        dets = [self.yolo.extract_detections(r) for r in results]
+        output, start = [], 0
+        for frame, (c, offsets) in zip(frames, plans):
+            output.append(self.merge(frame.shape, offsets, dets[start:start + len(c)]))
+            start += len(c)
+        return output
+
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        return self.detect_batch([frame])[0]
+
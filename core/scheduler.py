@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Методы обнаружения движения
+MOTION_DIFF = 'diff'  # Разность с опорным кадром
+MOTION_MOG2 = 'mog2'  # Вычитание фона MOG2
+
+
+class MotionGate:
+    """
+    Дешёвый детектор движения на уменьшенном полутоновом кадре.
+    Решает, изменилась ли сцена настолько, что стоит запускать YOLO.
+    """
+    def __init__(self, method: str = MOTION_DIFF, threshold: float = 0.005,
+                 pixel_threshold: int = 25, size: Tuple[int, int] = (160, 120)):
+        if method not in (MOTION_DIFF, MOTION_MOG2):
+            raise ValueError(f"Неизвестный метод детекции движения: {method}")
+        self.method = method
+        self.threshold = threshold  # Доля изменившихся пикселей для срабатывания
+        self.pixel_threshold = pixel_threshold  # Порог яркости для разности кадров
+        self.size = size
+        self.motion_ratio = 0.0  # Доля изменившихся пикселей на последнем кадре
+        self._reference = None
+        self._last = None  # Последний проверенный кадр (кандидат в опорные)
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) \
+            if method == MOTION_MOG2 else None
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Возвращает True, если в кадре есть движение относительно опорного.
+        """
+        small = self._prepare(frame)
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(small)
+        else:
+            if self._reference is None:
+                self._reference = small
+                self.motion_ratio = 1.0
+                return True
+            diff = cv2.absdiff(small, self._reference)
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        self.motion_ratio = cv2.countNonZero(mask) / float(mask.size)
+        self._last = small
+        return self.motion_ratio >= self.threshold
+
+    def accept(self) -> None:
+        """
+        Делает последний проверенный кадр опорным (вызывается после инференса).
+        Так медленное накопление изменений тоже со временем даёт срабатывание.
+        """
+        if self._subtractor is None and self._last is not None:
+            self._reference = self._last
+
+    def reset(self) -> None:
+        self._reference = None
+        self._last = None
+        if self._subtractor is not None:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+
+
+class InferenceScheduler:
+    """
+    Адаптивное расписание инференса.
+    Детекция запускается не чаще чем на каждом every_n-м кадре и, если
+    задан motion_gate, только при движении в кадре. На статичной сцене
+    детекции всё равно обновляются не реже чем раз в max_skip кадров.
+    Для пропущенных кадров используются последние детекции.
+    """
+    def __init__(self, every_n: int = 1, motion_gate: Optional[MotionGate] = None, max_skip: int = 30):
+        self.every_n = max(1, int(every_n))
+        self.motion_gate = motion_gate
+        self.max_skip = max(self.every_n, int(max_skip))
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+        self._since_last = None  # Кадров с последнего инференса (None — ещё не было)
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """
+        Решает, запускать ли детекцию на кадре, и обновляет счётчики.
+        """
+        if self._since_last is None:
+            infer = True
+            if self.motion_gate is not None:
+                self.motion_gate.check(frame)
+        else:
+            self._since_last += 1
+            infer = self._since_last >= self.every_n
+            if infer and self.motion_gate is not None:
+                moving = self.motion_gate.check(frame)
+                infer = moving or self._since_last >= self.max_skip
+
+        if infer:
+            self._since_last = 0
+            self.frames_inferred += 1
+            if self.motion_gate is not None:
+                self.motion_gate.accept()
+        else:
+            self.frames_skipped += 1
+        return infer
+
+    def reset(self) -> None:
+        """
+        Сбрасывает состояние (например, после перемотки): следующий кадр
+        будет обработан обязательно.
+        """
+        self._since_last = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Счётчики обработанных и пропущенных кадров.
+        """
+        total = self.frames_inferred + self.frames_skipped
+        return {
+            'frames_inferred': self.frames_inferred,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': self.frames_skipped / total if total else 0.0,
+        }
@@ -0,0 +1,289 @@
+# core/seek.py
+import bisect
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Каталог кэша индексов ключевых кадров (рядом с базой пользователей)
+KEYFRAME_CACHE_DIR = os.path.join('data', 'cache', 'keyframes')
+# Без PyAV ключевые кадры неизвестны: опорные точки ставятся через равный шаг
+DEFAULT_ANCHOR_STEP = 50
+# Не дальше этого числа кадров вперёд позиция догоняется grab(), а не перемоткой
+MAX_FORWARD_GRAB = 50
+
+
+def _scan_keyframes_pyav(path: str) -> Optional[Tuple[List[int], float]]:
+    """
+    Номера ключевых кадров по пакетам контейнера (без декодирования).
+    Возвращает None, если PyAV не установлен или файл не читается.
+    """
+    try:
+        import av
+    except ImportError:
+        return None
+    try:
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            rate = stream.average_rate or stream.guessed_rate
+            if not rate:
+                return None
+            fps = float(rate)
+            time_base = float(stream.time_base)
+            start = stream.start_time or 0
+            keyframes = set()
+            for packet in container.demux(stream):
+                if packet.pts is not None and packet.is_keyframe:
+                    keyframes.add(int(round((packet.pts - start) * time_base * fps)))
+            return sorted(keyframes), fps
+    except Exception as e:
+        print(f"Не удалось построить индекс ключевых кадров: {e}")
+        return None
+
+
+class KeyframeIndex:
+    """
+    Индекс опорных кадров файла. Перемотка идёт на ближайший опорный
+    кадр не позже цели, дальше позиция догоняется grab() без конвертации
+    кадров. С PyAV опорные кадры — настоящие ключевые кадры (exact=True),
+    без него — равномерная сетка, с которой cv2 перематывает сам.
+    """
+    def __init__(self, frames: List[int], exact: bool):
+        self.frames = sorted(set(int(f) for f in frames) | {0})
+        self.exact = exact
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def anchor(self, frame_index: int) -> int:
+        """
+        Ближайший опорный кадр не позже frame_index.
+        """
+        pos = bisect.bisect_right(self.frames, max(0, frame_index)) - 1
+        return self.frames[max(0, pos)]
+
+    @classmethod
+    def build(cls, path: str, total_frames: int = 0,
+              anchor_step: int = DEFAULT_ANCHOR_STEP) -> 'KeyframeIndex':
+        """
+        Строит индекс: через PyAV, а без него — сеткой с шагом anchor_step.
+        """
+        scanned = _scan_keyframes_pyav(path)
+        if scanned is not None and scanned[0]:
+            return cls(scanned[0], exact=True)
+        if total_frames <= 0:
+            capture = cv2.VideoCapture(path)
+            total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) if capture.isOpened() else 0
+            capture.release()
+        return cls(list(range(0, max(1, total_frames), max(1, anchor_step))), exact=False)
+
+    @classmethod
+    def load(cls, path: str, total_frames: int = 0, cache_dir: Optional[str] = KEYFRAME_CACHE_DIR,
+             anchor_step: int = DEFAULT_ANCHOR_STEP) -> 'KeyframeIndex':
+        """
+        Индекс из дискового кэша; при промахе строится и сохраняется.
+        Ключ кэша — путь, размер и время изменения файла, поэтому
+        изменённый файл индексируется заново. cache_dir=None — без кэша.
+        """
+        cache_path = _cache_path(path, cache_dir) if cache_dir else None
+        if cache_path and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                return cls(data['frames'], data['exact'])
+            except (OSError, ValueError, KeyError):
+                pass
+        index = cls.build(path, total_frames, anchor_step)
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    json.dump({'path': os.path.abspath(path), 'exact': index.exact,
+                               'frames': index.frames}, f)
+            except OSError as e:
+                print(f"Не удалось сохранить индекс ключевых кадров: {e}")
+        return index
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+class FrameCache:
+    """
+    Небольшой LRU-кэш декодированных кадров вокруг текущей позиции.
+    Ключ — позиция кадра, значение — пакет конвейера (кадр, время, детекции).
+    При copy_frames=True кэш хранит собственные копии кадров: буферы
+    конвейера переиспользуются по кругу, а кадр в кэше может понадобиться
+    намного позже. Память вытесненных кадров идёт под следующие копии.
+    """
+    def __init__(self, capacity: int = 32, copy_frames: bool = False):
+        self.capacity = max(1, int(capacity))
+        self.copy_frames = copy_frames
+        self._items: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._spare: List[np.ndarray] = []  # Буферы вытесненных кадров
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key: int) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def get(self, key: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Кладёт пакет в кэш и возвращает сохранённый пакет (при
+        copy_frames=True — поверхностную копию с собственным кадром).
+        """
+        with self._lock:
+            if self.copy_frames and item.get('frame') is not None:
+                item = dict(item)
+                item['frame'] = self._copy(item['frame'])
+            self._recycle(self._items.pop(key, None))
+            self._items[key] = item
+            while len(self._items) > self.capacity:
+                self._recycle(self._items.popitem(last=False)[1])
+            return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._spare.clear()
+
+    def _copy(self, frame: np.ndarray) -> np.ndarray:
+        # Вызывается под self._lock
+        buf = self._spare.pop() if self._spare else None
+        if buf is None or buf.shape != frame.shape or buf.dtype != frame.dtype:
+            buf = np.empty_like(frame)
+        np.copyto(buf, frame)
+        return buf
+
+    def _recycle(self, item: Optional[Dict[str, Any]]) -> None:
+        # Вызывается под self._lock
+        if self.copy_frames and item is not None and item.get('frame') is not None:
+            self._spare.append(item['frame'])
+
+
+def seek_capture(capture: cv2.VideoCapture, frame_index: int,
+                 index: Optional[KeyframeIndex] = None,
+                 on_frame: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Ставит capture так, чтобы следующий read() вернул кадр frame_index.
+    Близкая цель впереди догоняется grab(), дальняя — перемоткой на
+    опорный кадр и grab() до цели. on_frame(i) вызывается после grab()
+    каждого пропускаемого кадра i и может забрать его через retrieve()
+    (так заполняется кэш при шаге назад). Возвращает итоговую позицию.
+    """
+    frame_index = max(0, int(frame_index))
+    position = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+    if not (position <= frame_index <= position + MAX_FORWARD_GRAB):
+        anchor = index.anchor(frame_index) if index is not None else frame_index
+        capture.set(cv2.CAP_PROP_POS_FRAMES, anchor)
+        position = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+        if position > frame_index:
+            # Декодер перемотался дальше цели — догоняем от начала файла
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = 0
+    while position < frame_index:
+        if not capture.grab():
+            break
+        if on_frame is not None:
+            on_frame(position)
+        position += 1
+    return position
+
+
+class PreviewDecoder:
+    """
+    Быстрый предпросмотр при перетаскивании слайдера: декодирует только
+    ближайший опорный кадр отдельным захватом и уменьшает его до size.
+    Результаты кэшируются по опорному кадру.
+    """
+    def __init__(self, path: str, index: Optional[KeyframeIndex] = None,
+                 size: Tuple[int, int] = (320, 240), cache_size: int = 64):
+        self.path = path
+        self.index = index
+        self.size = size
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._cache = FrameCache(cache_size)
+        self._lock = threading.Lock()
+
+    def preview(self, frame_index: int) -> Optional[np.ndarray]:
+        """
+        Уменьшенный кадр около frame_index (BGR) или None при ошибке чтения.
+        """
+        anchor = self.index.anchor(frame_index) if self.index is not None else frame_index
+        cached = self._cache.get(anchor)
+        if cached is not None:
+            return cached['frame']
+        with self._lock:
+            if self._capture is None:
+                self._capture = cv2.VideoCapture(self.path)
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, anchor)
+            ret, frame = self._capture.read()
+        if not ret:
+            return None
+        frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self._cache.put(anchor, {'frame': frame})
+        return frame
+
+    def close(self) -> None:
+        with self._lock:
+            if self._capture is not None:
+                self._capture.release()
+            self._capture = None
+        self._cache.clear()
+
+
+class Debouncer:
+    """
+    Откладывает вызов до паузы в событиях: каждый request() отменяет
+    предыдущий отложенный вызов. schedule(delay_ms, fn) и cancel(token) —
+    например, Tk after()/after_cancel().
+    """
+    def __init__(self, schedule: Callable[[int, Callable[[], None]], Any],
+                 cancel: Callable[[Any], None], delay_ms: int, callback: Callable[..., None]):
+        self._schedule = schedule
+        self._cancel = cancel
+        self.delay_ms = delay_ms
+        self.callback = callback
+        self._token = None
+        self._args: Tuple = ()
+
+    @property
+    def pending(self) -> bool:
+        return self._token is not None
+
+    def request(self, *args) -> None:
+        self._args = args
+        if self._token is not None:
+            self._cancel(self._token)
+        self._token = self._schedule(self.delay_ms, self._fire)
+
+    def flush(self) -> None:
+        """
+        Немедленно выполняет отложенный вызов, если он есть.
+        """
+        if self._token is not None:
+            self._cancel(self._token)
+            self._fire()
+
+    def _fire(self) -> None:
+        self._token = None
+        self.callback(*self._args)
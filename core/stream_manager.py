@@ -0,0 +1,349 @@
+import time
+import threading
+from collections import deque
+import cv2
+import numpy as np
+from typing import Any, Optional, List, Dict
+from models.yolo_model import YOLOModel
+from models.model_cache import get_model
+from core.frame_queue import FrameQueue, DROP_OLDEST
+from core.video_processor import StageErrors
+from utils.overlay import OverlayRenderer
+from utils.image import letterbox, project_boxes
+from utils.frame_pool import FramePool
+from core.roi import Region, RegionDetector
+from core.live_source import FRESHEST, LiveSource, is_network_source
+
+# Политики выбора потоков для очередного прямого прохода
+ROUND_ROBIN = 'round_robin'  # По кругу, по одному кадру с каждого потока
+FRESHNESS = 'freshness'  # В первую очередь потоки с самым устаревшим результатом
+
+
+def parse_source(source: Any) -> Any:
+    """
+    Приводит строковый индекс веб-камеры ("0") к int.
+    Пути к файлам и URL (rtsp://, http://) возвращаются без изменений.
+    """
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source.strip())
+    return source
+
+
+class _Stream:
+    """
+    Состояние одного источника: захват, очередь кадров и статистика.
+    """
+    def __init__(self, name: str, source: Any, queue_size: int, realtime: bool, loop: bool,
+                 region_detector: Optional[RegionDetector] = None, live_mode: str = FRESHEST):
+        self.name = name
+        self.source = parse_source(source)
+        self.live_mode = live_mode  # Режим буферизации сетевого потока (см. LiveSource)
+        self.realtime = realtime  # Выдерживать FPS файла (имитация камеры)
+        self.loop = loop  # Перематывать файл в начало по окончании
+        self.region_detector = region_detector  # Области интереса и тайлинг источника
+        self.capture = None
+        self.queue = FrameQueue(queue_size, DROP_OLDEST)
+        # Буферы кадров потока: очередь, захватываемый кадр, кадр в инференсе,
+        # последний обработанный и уже отданный потребителю
+        pool_size = queue_size + 4
+        self.frame_pool = FramePool(pool_size)
+        # Исходный кадр хранится в пакете только для детекции по областям
+        self.decode_pool = FramePool(pool_size if region_detector is not None else 2)
+        self.latest = None  # Последний обработанный пакет
+        self.overlay = None  # Отрисовщик рамок, создаётся при первом запросе кадра
+        self.thread = None
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.last_served = 0.0  # Когда поток последний раз попадал в инференс
+        self.finished = False
+        self.error: Optional[str] = None  # Почему захват остановлен из-за сбоев
+        self._processed_times = deque(maxlen=30)  # Для скользящего FPS
+        self._lock = threading.Lock()
+
+    def record_processed(self, packet: Dict[str, Any]) -> None:
+        with self._lock:
+            self.latest = packet
+            self.frames_processed += 1
+            self._processed_times.append(time.monotonic())
+
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._processed_times) < 2:
+                return 0.0
+            span = self._processed_times[-1] - self._processed_times[0]
+            return (len(self._processed_times) - 1) / span if span > 0 else 0.0
+
+
+class StreamManager:
+    """
+    Менеджер нескольких видеопотоков с одной общей моделью YOLO.
+    Каждый источник читается в своём потоке, а единственный поток
+    инференса собирает кадры со всех источников в один пакет.
+    """
+    def __init__(self, yolo: Optional[YOLOModel] = None, schedule: str = ROUND_ROBIN,
+                 batch_size: int = 4, queue_size: int = 2, frame_size: tuple = (640, 480),
+                 max_stage_errors: int = 10):
+        if schedule not in (ROUND_ROBIN, FRESHNESS):
+            raise ValueError(f"Неизвестная политика планирования: {schedule}")
+        self.yolo = yolo if yolo is not None else get_model()  # Одна модель на все потоки
+        self.schedule = schedule
+        self.batch_size = max(1, int(batch_size))
+        self.queue_size = queue_size
+        self.frame_size = frame_size
+        self.is_running = False
+        self._streams: Dict[str, _Stream] = {}
+        self._streams_lock = threading.Lock()
+        self._frame_ready = threading.Event()  # Сигнал о новом кадре в любом потоке
+        self._stop_event = threading.Event()
+        self._inference_thread = None
+        self._rr_offset = 0
+        # Сбои: кадр или пакет со сбоем пропускается. Серия сбоев захвата
+        # завершает один поток, серия сбоев инференса — все (errors.failed)
+        self.errors = StageErrors(max_stage_errors)
+
+    def add_stream(self, source: Any, name: Optional[str] = None,
+                   realtime: bool = False, loop: bool = False,
+                   regions: Optional[List[Region]] = None, tile_size: Optional[int] = None,
+                   overlap: float = 0.2, live_mode: str = FRESHEST) -> str:
+        """
+        Добавляет источник: индекс веб-камеры, путь к файлу или URL потока.
+        Один и тот же файл можно добавить несколько раз под разными именами.
+        URL (rtsp://, http://) читаются через LiveSource с переподключением;
+        live_mode — его режим буферизации (FRESHEST или SMOOTH).
+        regions и tile_size ограничивают детекцию областями интереса
+        источника и включают тайлинг (см. core.roi.RegionDetector); кропы
+        всех потоков идут в один прямой проход. Возвращает имя потока.
+        """
+        with self._streams_lock:
+            if name is None:
+                name = f"stream{len(self._streams)}"
+            if name in self._streams:
+                raise ValueError(f"Поток с именем '{name}' уже существует")
+            detector = None
+            if regions or tile_size:
+                detector = RegionDetector(self.yolo, regions, tile_size, overlap)
+            stream = _Stream(name, source, self.queue_size, realtime, loop, detector, live_mode)
+            self._streams[name] = stream
+        if self.is_running:
+            self._open_stream(stream)
+        return name
+
+    def remove_stream(self, name: str) -> None:
+        """
+        Останавливает и удаляет поток.
+        """
+        with self._streams_lock:
+            stream = self._streams.pop(name, None)
+        if stream is not None:
+            self._close_stream(stream)
+
+    def start(self) -> None:
+        """
+        Открывает все источники и запускает поток инференса.
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.errors.reset()
+        self.is_running = True
+        for stream in self._snapshot_streams():
+            self._open_stream(stream)
+        self._inference_thread = threading.Thread(
+            target=self._inference_loop, name="ve-streams-inference", daemon=True)
+        self._inference_thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает все потоки и освобождает источники.
+        """
+        self.is_running = False
+        self._stop_event.set()
+        self._frame_ready.set()
+        for stream in self._snapshot_streams():
+            self._close_stream(stream)
+        if self._inference_thread is not None:
+            self._inference_thread.join(timeout=2.0)
+        self._inference_thread = None
+
+    def get_latest(self, name: str, render: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает последний обработанный пакет потока: 'frame', 'detections',
+        'timestamp'. При render=True в 'frame' будет кадр с рамками.
+        Кадры потока лежат в переиспользуемых буферах: для долгого хранения
+        кадр нужно скопировать.
+        """
+        stream = self._streams.get(name)
+        if stream is None or stream.latest is None:
+            return None
+        packet = dict(stream.latest)
+        if render:
+            if stream.overlay is None:
+                stream.overlay = OverlayRenderer(self.yolo.classes)
+            packet['frame'] = stream.overlay.draw(packet['frame'], packet['detections'])
+        return packet
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Статистика по каждому потоку: FPS обработки, глубина очереди,
+        число захваченных, обработанных и отброшенных кадров; для сетевых
+        потоков в 'health' — здоровье источника (LiveSource.stats), в
+        'error' — причина остановки захвата из-за сбоев.
+        """
+        stats = {}
+        for stream in self._snapshot_streams():
+            stats[stream.name] = {
+                'source': stream.source,
+                'fps': stream.fps(),
+                'queue_depth': len(stream.queue),
+                'frames_captured': stream.frames_captured,
+                'frames_processed': stream.frames_processed,
+                'frames_dropped': stream.queue.dropped,
+                'finished': stream.finished,
+                'error': stream.error,
+                'health': stream.capture.stats() if isinstance(stream.capture, LiveSource) else None,
+            }
+        return stats
+
+    @property
+    def stream_names(self) -> List[str]:
+        return [s.name for s in self._snapshot_streams()]
+
+    def _snapshot_streams(self) -> List[_Stream]:
+        with self._streams_lock:
+            return list(self._streams.values())
+
+    def _open_stream(self, stream: _Stream) -> None:
+        if is_network_source(stream.source):
+            stream.capture = LiveSource(stream.source, mode=stream.live_mode)
+        else:
+            stream.capture = cv2.VideoCapture(stream.source)
+        if not stream.capture.isOpened():
+            stream.finished = True
+            print(f"Не удалось открыть источник {stream.source}")
+            return
+        stream.thread = threading.Thread(
+            target=self._capture_loop, args=(stream,), name=f"ve-capture-{stream.name}", daemon=True)
+        stream.thread.start()
+
+    def _close_stream(self, stream: _Stream) -> None:
+        stream.queue.close()
+        if stream.thread is not None:
+            stream.thread.join(timeout=2.0)
+            stream.thread = None
+        if stream.capture is not None:
+            stream.capture.release()
+            stream.capture = None
+
+    def _capture_loop(self, stream: _Stream) -> None:
+        # Чтение кадров одного источника в его собственную очередь
+        file_fps = stream.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_interval = 1.0 / file_fps if stream.realtime and file_fps > 0 else 0.0
+        next_time = time.monotonic()
+        stage = f"capture:{stream.name}"
+        while not self._stop_event.is_set() and not stream.queue.closed:
+            try:
+                ret, frame = stream.decode_pool.read(stream.capture)
+                if not ret:
+                    if isinstance(stream.capture, LiveSource) and stream.capture.isOpened():
+                        continue  # Нет нового кадра или идёт переподключение
+                    if stream.loop and stream.capture.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+                        stream.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    stream.finished = True
+                    break
+                # Вписывание с полями вместо искажающего ресайза
+                shape = (self.frame_size[1], self.frame_size[0])
+                resized, scale, pad = letterbox(
+                    frame, shape, dst=stream.frame_pool.next(shape + frame.shape[2:], frame.dtype))
+                packet = {
+                    'stream': stream.name,
+                    'timestamp': stream.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0,
+                    'captured_at': time.monotonic(),
+                    'frame': resized,
+                    'letterbox': (scale, pad),
+                }
+            except Exception as e:
+                # Сбойный кадр пропускается; серия сбоев завершает только этот поток
+                if self.errors.record(stage, e):
+                    stream.error = self.errors.last
+                    stream.finished = True
+                    break
+                continue
+            self.errors.ok(stage)
+            stream.frames_captured += 1
+            if stream.region_detector is not None:
+                packet['source'] = frame
+            stream.queue.put(packet)
+            self._frame_ready.set()
+            if frame_interval:
+                next_time += frame_interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_time = time.monotonic()
+
+    def _select_streams(self, streams: List[_Stream]) -> List[_Stream]:
+        # Выбирает до batch_size потоков с готовыми кадрами согласно политике
+        ready = [s for s in streams if len(s.queue) > 0]
+        if self.schedule == FRESHNESS:
+            ready.sort(key=lambda s: s.last_served)
+        elif ready:
+            offset = self._rr_offset % len(ready)
+            ready = ready[offset:] + ready[:offset]
+            self._rr_offset += 1
+        return ready[:self.batch_size]
+
+    def _inference_loop(self) -> None:
+        # Общий поток инференса: один прямой проход на пакет кадров разных потоков
+        while not self._stop_event.is_set():
+            self._frame_ready.wait(timeout=0.1)
+            self._frame_ready.clear()
+            while not self._stop_event.is_set():
+                selected = self._select_streams(self._snapshot_streams())
+                packets = []
+                for stream in selected:
+                    packet = stream.queue.get_latest(timeout=0)
+                    if packet is not None:
+                        packets.append((stream, packet))
+                if not packets:
+                    break
+                try:
+                    self._infer_packets(packets)
+                except Exception as e:
+                    # Пакет со сбоем пропускается; серия сбоев останавливает все потоки,
+                    # иначе они бы читали кадры, которые некому обработать
+                    if self.errors.record('inference', e):
+                        self.errors.failed = True
+                        print(f"Инференс остановлен после {self.errors.max_streak} сбоев подряд")
+                        self._stop_event.set()
+                        return
+                    continue
+                self.errors.ok('inference')
+
+    def _infer_packets(self, packets: List[tuple]) -> None:
+        # Один прямой проход по парам (поток, пакет) и разбор детекций: кадры
+        # потоков без областей и кропы областей идут в одном пакете
+        inputs, plans = [], []
+        for stream, packet in packets:
+            if stream.region_detector is not None:
+                crops, offsets = stream.region_detector.prepare(packet['source'])
+                plans.append((len(inputs), len(crops), offsets))
+                inputs.extend(crops)
+            else:
+                plans.append((len(inputs), 1, None))
+                inputs.append(packet['frame'])
+        results = self.yolo.predict_batch(inputs) if inputs else []
+        now = time.monotonic()
+        for (stream, packet), (start, count, offsets) in zip(packets, plans):
+            if offsets is None:
+                packet['detections'] = self.yolo.extract_detections(results[start])
+            else:
+                source = packet.pop('source')
+                dets = stream.region_detector.merge(
+                    source.shape, offsets,
+                    [self.yolo.extract_detections(r) for r in results[start:start + count]])
+                packet['detections'] = project_boxes(dets, *packet['letterbox'])
+            packet['latency'] = now - packet['captured_at']
+            stream.last_served = now
+            stream.record_processed(packet)
@@ -0,0 +1,196 @@
+import numpy as np
+from typing import Optional
+
+# Формат выхода трекера: [x1, y1, x2, y2, conf, cls, track_id]
+TRACK_COLUMNS = 7
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Векторизованная матрица IoU между двумя наборами рамок [x1, y1, x2, y2].
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :4]
+    b = boxes_b[None, :, :4]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def _greedy_match(iou: np.ndarray, threshold: float):
+    """
+    Жадное сопоставление по убыванию IoU. Возвращает пары (строка, столбец).
+    """
+    matches = []
+    if iou.size == 0:
+        return matches
+    iou = iou.copy()
+    for _ in range(min(iou.shape)):
+        row, col = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[row, col] < threshold:
+            break
+        matches.append((row, col))
+        iou[row, :] = -1
+        iou[:, col] = -1
+    return matches
+
+
+def _to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    out = np.empty((len(boxes), 4), dtype=np.float32)
+    out[:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2
+    out[:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2
+    out[:, 2] = boxes[:, 2] - boxes[:, 0]
+    out[:, 3] = boxes[:, 3] - boxes[:, 1]
+    return out
+
+
+def _to_xyxy(state: np.ndarray) -> np.ndarray:
+    out = np.empty((len(state), 4), dtype=np.float32)
+    half_w = np.maximum(state[:, 2], 1.0) / 2
+    half_h = np.maximum(state[:, 3], 1.0) / 2
+    out[:, 0] = state[:, 0] - half_w
+    out[:, 1] = state[:, 1] - half_h
+    out[:, 2] = state[:, 0] + half_w
+    out[:, 3] = state[:, 1] + half_h
+    return out
+
+
+class Tracker:
+    """
+    Лёгкий многообъектный трекер в духе SORT/ByteTrack.
+    Состояние всех треков хранится в массивах NumPy: центр и размер рамки,
+    их скорости (альфа-бета фильтр — упрощённый Калман с постоянной
+    скоростью). Сопоставление двухэтапное: сначала уверенные детекции,
+    затем слабые — только с оставшимися треками. Между кадрами с
+    детекцией треки продвигаются predict() без запуска модели.
+    """
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 1,
+                 high_conf: float = 0.5, low_conf: float = 0.1, match_class: bool = True,
+                 alpha: float = 0.6, beta: float = 0.2):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age  # Через сколько кадров без сопоставления трек удаляется
+        self.min_hits = min_hits  # Сколько сопоставлений нужно, чтобы трек выдавался
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.match_class = match_class  # Не сопоставлять детекции разных классов
+        self.alpha = alpha  # Вес поправки положения
+        self.beta = beta  # Вес поправки скорости
+        self._next_id = 1
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Удаляет все треки. Нумерация идентификаторов продолжается.
+        """
+        self.state = np.zeros((0, 4), dtype=np.float32)  # cx, cy, w, h
+        self.velocity = np.zeros((0, 4), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.cls = np.zeros(0, dtype=np.float32)
+        self.conf = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.since_update = np.zeros(0, dtype=np.int32)  # Кадров с последнего сопоставления
+        self.matched = np.zeros(0, dtype=bool)  # Сопоставлен ли трек на последней детекции
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def predict(self) -> np.ndarray:
+        """
+        Продвигает все треки на один кадр без новых детекций.
+        Возвращает треки, видимые на последней детекции.
+        """
+        self.state += self.velocity
+        self.since_update += 1
+        self._prune()
+        return self._output(self.matched & (self.hits >= self.min_hits))
+
+    def update(self, detections: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Продвигает треки на кадр и корректирует их по детекциям
+        [x1, y1, x2, y2, conf, cls]. Возвращает сопоставленные и новые
+        треки в формате [x1, y1, x2, y2, conf, cls, track_id].
+        """
+        if detections is None or len(detections) == 0:
+            detections = np.zeros((0, 6), dtype=np.float32)
+        detections = np.asarray(detections, dtype=np.float32)[:, :6]
+        detections = detections[detections[:, 4] >= self.low_conf]
+
+        self.state += self.velocity
+        self.since_update += 1
+        self.matched[:] = False
+
+        high = np.flatnonzero(detections[:, 4] >= self.high_conf)
+        low = np.flatnonzero(detections[:, 4] < self.high_conf)
+        free_tracks = np.arange(len(self.ids))
+
+        # Этап 1: уверенные детекции; этап 2: слабые — только с оставшимися треками
+        used_high = self._associate(detections, high, free_tracks)
+        free_tracks = np.flatnonzero(~self.matched)
+        self._associate(detections, low, free_tracks)
+
+        # Новые треки заводятся только из уверенных несопоставленных детекций
+        new = np.setdiff1d(high, used_high)
+        if len(new):
+            self._spawn(detections[new])
+
+        self._prune()
+        return self._output(self.matched & (self.hits >= self.min_hits))
+
+    def _associate(self, detections: np.ndarray, det_idx: np.ndarray, track_idx: np.ndarray) -> np.ndarray:
+        # Сопоставляет подмножество детекций с подмножеством треков, возвращает использованные детекции
+        if len(det_idx) == 0 or len(track_idx) == 0:
+            return np.zeros(0, dtype=np.int64)
+        dets = detections[det_idx]
+        iou = iou_matrix(_to_xyxy(self.state[track_idx]), dets)
+        if self.match_class:
+            iou[self.cls[track_idx][:, None] != dets[None, :, 5]] = 0
+        pairs = _greedy_match(iou, self.iou_threshold)
+        if not pairs:
+            return np.zeros(0, dtype=np.int64)
+        rows, cols = map(np.asarray, zip(*pairs))
+        tracks = track_idx[rows]
+        matched_dets = dets[cols]
+
+        # Альфа-бета коррекция: поправка положения и скорости по невязке
+        measured = _to_cxcywh(matched_dets)
+        residual = measured - self.state[tracks]
+        frames = np.maximum(self.since_update[tracks], 1)[:, None]
+        self.state[tracks] += self.alpha * residual
+        self.velocity[tracks] += self.beta * residual / frames
+        self.conf[tracks] = matched_dets[:, 4]
+        self.cls[tracks] = matched_dets[:, 5]
+        self.hits[tracks] += 1
+        self.since_update[tracks] = 0
+        self.matched[tracks] = True
+        return det_idx[cols]
+
+    def _spawn(self, dets: np.ndarray) -> None:
+        count = len(dets)
+        self.state = np.vstack([self.state, _to_cxcywh(dets)])
+        self.velocity = np.vstack([self.velocity, np.zeros((count, 4), dtype=np.float32)])
+        self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + count)])
+        self._next_id += count
+        self.cls = np.concatenate([self.cls, dets[:, 5]])
+        self.conf = np.concatenate([self.conf, dets[:, 4]])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int32)])
+        self.since_update = np.concatenate([self.since_update, np.zeros(count, dtype=np.int32)])
+        self.matched = np.concatenate([self.matched, np.ones(count, dtype=bool)])
+
+    def _prune(self) -> None:
+        keep = self.since_update <= self.max_age
+        if keep.all():
+            return
+        for name in ('state', 'velocity', 'ids', 'cls', 'conf', 'hits', 'since_update', 'matched'):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def _output(self, mask: np.ndarray) -> np.ndarray:
+        out = np.empty((int(mask.sum()), TRACK_COLUMNS), dtype=np.float32)
+        out[:, :4] = _to_xyxy(self.state[mask])
+        out[:, 4] = self.conf[mask]
+        out[:, 5] = self.cls[mask]
+        out[:, 6] = self.ids[mask]
+        return out
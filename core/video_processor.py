@@ -1,33 +1,193 @@
+import os
 import time
+import threading
+from collections import deque
+from contextlib import nullcontext
 import cv2
 import numpy as np
-from typing import Any, Optional, List, Dict
-from models.yolo_model import YOLOModel  
+from typing import TYPE_CHECKING, Any, Callable, Optional, List, Dict
+from models.yolo_model import YOLOModel
+from models.model_cache import get_model
+from utils.overlay import OverlayRenderer
+from core.scheduler import InferenceScheduler
+from core.tracker import Tracker
+from core.metrics import PipelineMetrics, RollingFps
+from core.seek import FrameCache, KeyframeIndex, PreviewDecoder, seek_capture
+from core.roi import Region, RegionDetector
+from utils.image import letterbox, project_boxes
+from utils.frame_pool import FramePool
+from core.live_source import FRESHEST, LiveSource, is_network_source
+from core.frame_queue import FrameQueue, DROP_OLDEST, BLOCK
+
+if TYPE_CHECKING:
+    from core.media_writer import MediaWriter
+
+
+class StageErrors:
+    """
+    Учёт сбоев стадий конвейера. Сбой на одном кадре не останавливает
+    стадию: кадр пропускается, а ошибка запоминается для интерфейса.
+    Серия из max_streak сбоев подряд на одной стадии (например, упал
+    бэкенд модели) означает, что продолжать бессмысленно, — record()
+    вернёт True, и владелец останавливает конвейер, выставив failed.
+    """
+    def __init__(self, max_streak: int = 10):
+        self.max_streak = max(1, int(max_streak))
+        self.count = 0  # Всего сбоев
+        self.last: Optional[str] = None  # Последний сбой: «стадия: тип: сообщение»
+        self.failed = False  # Конвейер остановлен из-за сбоев
+        self._streaks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, error: Exception) -> bool:
+        """
+        Учитывает сбой стадии. True — серия сбоев подряд достигла max_streak.
+        """
+        with self._lock:
+            self.count += 1
+            self.last = f"{stage}: {type(error).__name__}: {error}"
+            streak = self._streaks[stage] = self._streaks.get(stage, 0) + 1
+        print(f"Ошибка стадии {self.last}")
+        return streak >= self.max_streak
+
+    def ok(self, stage: str) -> None:
+        # Кадр прошёл стадию успешно: серия сбоев прервана.
+        # Под блокировкой — record() другой стадии меняет тот же словарь
+        with self._lock:
+            self._streaks[stage] = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.count = 0
+            self.last = None
+            self.failed = False
+            self._streaks.clear()
+
 
 class VideoProcessor:
-    def __init__(self):
+    def __init__(self, pipeline: bool = False, queue_size: int = 2, drop_policy: str = DROP_OLDEST,
+                 batch_size: int = 1, batch_timeout_ms: float = 0.0,
+                 yolo: Optional[YOLOModel] = None, render: bool = True,
+                 scheduler: Optional[InferenceScheduler] = None, tracker: Optional[Tracker] = None,
+                 metrics: Optional[PipelineMetrics] = None, frame_cache_size: int = 32,
+                 media_writer: Optional['MediaWriter'] = None, frame_size: tuple = (640, 480),
+                 live_mode: str = FRESHEST, max_stage_errors: int = 10):
         # Инициализация атрибутов класса
         self.capture = None  # Объект видеозахвата
         self.is_running = False  # Флаг состояния потока
-        self.yolo = YOLOModel()  # Инициализация модели YOLO
+        self.yolo = yolo if yolo is not None else get_model()  # Модель YOLO из кэша процесса (общая)
+        self.render = render  # Рисовать рамки на возвращаемых кадрах (False — только детекции)
+        self.overlay = OverlayRenderer(self.yolo.classes)  # Отрисовка в переиспользуемый буфер
         self.current_frame = None  # Последний обработанный кадр
         self.detections = []  # Детекции на текущем кадре
-        self.fps = 0  # Частота кадров
         self.frame_count = 0  # Счётчик обработанных кадров
         self.start_time = 0  # Время начала обработки
 
+        # Параметры конвейерного режима (захват -> инференс -> отрисовка)
+        self.pipeline = pipeline
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.capture_lock = threading.Lock()  # Защищает capture от одновременного доступа
+        self.current_timestamp = 0.0  # Время текущего кадра в источнике, с
+        self.current_position = 0  # Номер текущего кадра в источнике
+        self.total_frames = 0  # Число кадров в файле (0 для потоков)
+        self.source_fps = 0.0  # Частота кадров источника
+        # Размер кадров конвейера (ширина, высота); кадр вписывается с полями без искажений
+        self.frame_size = frame_size
+        # Сетевые потоки (RTSP/HTTP) читаются через LiveSource: свой поток захвата,
+        # переподключение и режим буферизации (FRESHEST — минимальная задержка, SMOOTH — плавность)
+        self.live_mode = live_mode
+        # Детекция только в областях интереса / тайлами по кадру исходного разрешения
+        self.region_detector: Optional[RegionDetector] = None
+        # Пакетный инференс: до batch_size кадров, ожидание не дольше batch_timeout_ms
+        self.batch_size = max(1, int(batch_size))
+        self.batch_timeout_ms = batch_timeout_ms
+        # Расписание инференса: пропуск кадров и детектор движения (None — каждый кадр)
+        self.scheduler = scheduler
+        # Трекер присваивает детекциям устойчивые ID и продвигает их на пропущенных кадрах
+        self.tracker = tracker
+        self._last_detections = np.zeros((0, 6), dtype=np.float32)  # Для пропущенных кадров
+        # Номер перемотки: пакет помечается им при захвате. Расписание и трекер
+        # сбрасывают те потоки, что их обновляют, увидев новый номер, — не поток интерфейса
+        self._seek_epoch = 0
+        self._scheduler_epoch = 0
+        self._detections_epoch = 0
+        # Кадр по запросу seek_preview на паузе: стадия захвата берёт ровно один
+        # кадр, а process_frame отдаёт кадры с номером перемотки _step_epoch
+        self._step_event = threading.Event()
+        self._step_epoch = -1
+        # Метрики стадий; по умолчанию выключены и почти ничего не стоят
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self.metrics.register_gauge('queue_depth', self.get_queue_depths)
+        self.metrics.register_gauge('queue_dropped', self.get_dropped_counts)
+        self.metrics.register_gauge('scheduler', self.get_inference_stats)
+        self.metrics.register_gauge('live_source', self._live_source_gauges)
+        # Скользящий FPS (см. свойство fps): кадры отмечает поток постобработки,
+        # а читает интерфейс, поэтому счётчик под своей блокировкой
+        self._fps_meter = RollingFps()
+        self._fps_lock = threading.Lock()
+        # Перемотка файлов: индекс опорных кадров строится в фоне при открытии файла,
+        # последние показанные кадры хранятся для мгновенного шага назад/вперёд
+        self.paused = False
+        self.keyframes: Optional[KeyframeIndex] = None
+        self.frame_cache = FrameCache(frame_cache_size, copy_frames=True)
+        self.preview_decoder: Optional[PreviewDecoder] = None
+        # Фоновая запись клипов: получает каждый обработанный кадр, диск не ждёт
+        self.media_writer = media_writer
+        # Кадры декодируются и вписываются в переиспользуемые буферы. Кольцо
+        # больше числа кадров, одновременно живущих в конвейере (очереди, пакет
+        # в инференсе, постобработка, выходной и показанный кадры); кэш кадров
+        # и запись клипов хранят собственные копии
+        self._pool_size = max(queue_size, self.batch_size) + 2 * self.batch_size + queue_size + 3
+        self._frame_pool = FramePool(self._pool_size)
+        # Исходный кадр нужен дольше только для детекции по областям (см. configure_regions)
+        self._decode_pool = FramePool(2)
+        self._stop_event = threading.Event()
+        self._threads = []
+        # Сбои стадий: кадр со сбоем пропускается, серия из max_stage_errors сбоев
+        # подряд останавливает конвейер (errors.failed, причина — errors.last)
+        self.errors = StageErrors(max_stage_errors)
+        self.metrics.register_gauge('stage_errors', lambda: self.errors.count)
+        self._capture_index = 0
+        self._capture_queue = None
+        self._inference_queue = None
+        self._output_queue = None
+
     def start_stream(self, source: Any = 0) -> bool:
         """
         Запускает видеопоток с заданного источника.
         По умолчанию используется веб-камера (source = 0).
+        В конвейерном режиме дополнительно запускает рабочие потоки.
+        Сетевой поток подключается в фоне, не задерживая вызов: состояние
+        подключения — в get_source_health().
         """
+        if self.is_running:
+            self.stop_stream()
         try:
-            self.capture = cv2.VideoCapture(source)
+            if is_network_source(source):
+                self.capture = LiveSource(source, mode=self.live_mode)
+            else:
+                self.capture = cv2.VideoCapture(source)
             if not self.capture.isOpened():
                 raise ValueError("Не удалось открыть видеопоток")
+            self.total_frames = max(0, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+            self.source_fps = 0.0
+            self._sync_source_fps(self.capture)
             self.is_running = True
+            self.errors.reset()
             self.frame_count = 0
             self.start_time = time.time()
+            with self._fps_lock:
+                self._fps_meter.reset()
+            self.paused = False
+            self.frame_cache.clear()
+            self.keyframes = None
+            if isinstance(source, str) and os.path.isfile(source):
+                self.preview_decoder = PreviewDecoder(source)
+                threading.Thread(target=self._load_keyframes, args=(source, self.total_frames),
+                                 name="ve-keyframes", daemon=True).start()
+            if self.pipeline:
+                self._start_pipeline()
             return True
         except Exception as e:
             print(f"Ошибка при запуске видеопотока: {e}")
@@ -37,46 +197,569 @@ class VideoProcessor:
         """
         Считывает и обрабатывает один кадр из видеопотока.
         Выполняет детекцию объектов и считает FPS.
+        В конвейерном режиме не блокируется: возвращает самый свежий
+        готовый кадр или None, если нового кадра ещё нет. На паузе
+        возвращает только кадр, запрошенный seek_preview.
+        Кадр лежит в переиспользуемом буфере: чтобы хранить его дольше
+        нескольких следующих кадров, сделайте копию.
         """
         if not self.is_running or self.capture is None:
             return None
+        if self.paused and not (self.pipeline and self._step_epoch == self._seek_epoch):
+            return None
+
+        if self.pipeline:
+            return self._take_latest()
 
-        ret, frame = self.capture.read()
+        metrics = self.metrics
+        with self.capture_lock, metrics.time('decode'):
+            ret, frame = self._decode_pool.read(self.capture)
+            position = self.capture.get(cv2.CAP_PROP_POS_FRAMES)
+            timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            epoch = self._seek_epoch
         if not ret:
             return None
+        if not self.source_fps:
+            self._sync_source_fps(self.capture)
+
+        packet = self._make_packet(frame, position, timestamp)  # Вписывание в размер конвейера
+        frame = packet['frame']
+        if self._should_infer(frame, epoch):
+            with metrics.time('inference'):
+                results = self._infer([packet])[0]  # Обнаружение объектов на кадре
+            with metrics.time('postprocess'):
+                self.detections = self._update_detections(self.yolo.extract_detections(results), epoch)
+        else:
+            self.detections = self._update_detections(None, epoch)
+        self.current_frame = self._render(frame, self.detections)  # Кадр с наложенными рамками
+        self.current_position = int(position)
+        self.current_timestamp = timestamp
+        if self.media_writer is not None:
+            self.media_writer.write(frame, self.detections)
+        self.frame_cache.put(self.current_position, {
+            'position': self.current_position, 'timestamp': timestamp,
+            'frame': frame, 'detections': self.detections,
+        })
+
+        self._count_frames(1)
+
+        return self.current_frame
+
+    def process_batch(self) -> List[Dict[str, Any]]:
+        """
+        Считывает до batch_size кадров и обрабатывает их одним прямым проходом.
+        Предназначен для офлайн-обработки файлов. Возвращает список словарей
+        с ключами 'frame' (без рамок), 'detections', 'position' и 'timestamp'.
+        Пустой список означает конец потока.
+        """
+        if not self.is_running or self.capture is None:
+            return []
+
+        metrics = self.metrics
+        packets = []
+        with self.capture_lock:
+            epoch = self._seek_epoch
+            for _ in range(self.batch_size):
+                with metrics.time('decode'):
+                    ret, frame = self._decode_pool.read(self.capture)
+                if not ret:
+                    break
+                packets.append(self._make_packet(frame, self.capture.get(cv2.CAP_PROP_POS_FRAMES),
+                                                 self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0))
+        if not packets:
+            return []
+
+        flags = [self._should_infer(p['frame'], epoch) for p in packets]
+        to_infer = [p for p, f in zip(packets, flags) if f]
+        with metrics.time('inference', max(1, len(to_infer))):
+            results = iter(self._infer(to_infer, batched=True) if to_infer else [])
+        with metrics.time('postprocess', len(packets)):
+            for packet, infer in zip(packets, flags):
+                dets = self.yolo.extract_detections(next(results)) if infer else None
+                packet['detections'] = self._update_detections(dets, epoch)
+                if self.media_writer is not None:
+                    self.media_writer.write(packet['frame'], packet['detections'])
+
+        # Отрисовывается только последний кадр пакета — он и будет показан
+        last = packets[-1]
+        self.detections = last['detections']
+        self.current_frame = self._render(last['frame'], self.detections)
+        self.current_position = last['position']
+        self.current_timestamp = last['timestamp']
+
+        self._count_frames(len(packets))
+        return packets
+
+    def seek(self, frame_index: int) -> None:
+        """
+        Перематывает файл к заданному кадру (следующим будет прочитан
+        кадр frame_index). Близкие кадры впереди догоняются grab(), дальние —
+        перемоткой на опорный кадр из индекса, поэтому позиция точная и на
+        файлах с длинной GOP. Кадры, уже находящиеся в конвейере, отбрасываются.
+        Расписание инференса и трекер сбрасываются не здесь, а на первом
+        кадре после перемотки в потоках, которые их обновляют.
+        """
+        if self.capture is None:
+            return
+        with self.capture_lock:
+            seek_capture(self.capture, frame_index, self.keyframes)
+            self._seek_epoch += 1
+            for queue in (self._capture_queue, self._inference_queue, self._output_queue):
+                if queue is not None:
+                    queue.clear()
+
+    def seek_preview(self, frame_index: int) -> Optional[np.ndarray]:
+        """
+        Перематывает к кадру frame_index (см. seek) и сразу возвращает кадр
+        для показа, не выполняя инференс в вызывающем потоке: кадр из кэша
+        с рамками, если он там есть, иначе уменьшенный опорный кадр
+        (preview) или None. Детекции точного кадра считает конвейер: на
+        паузе он обрабатывает ровно один кадр, и его вернёт process_frame().
+        Без конвейера на паузе кадр обрабатывается сразу, как в step_frame.
+        """
+        if self.capture is None:
+            return None
+        if self.paused and not self.pipeline:
+            return self.step_frame(frame_index + 1 - self.current_position)
+        self.seek(frame_index)
+        if self.paused:
+            self._step_epoch = self._seek_epoch
+            self._step_event.set()
+        self.current_position = frame_index + 1
+        cached = self.frame_cache.get(frame_index + 1)
+        if cached is not None and cached.get('detections') is not None:
+            return self._render(cached['frame'], cached['detections'])
+        return self.preview(frame_index)
 
-        frame = cv2.resize(frame, (640, 480))  # Приведение кадра к фиксированному размеру
-        results = self.yolo.detect(frame)  # Обнаружение объектов на кадре
+    def configure_regions(self, regions: Optional[List[Region]] = None, tile_size: Optional[int] = None,
+                          overlap: float = 0.2) -> None:
+        """
+        Включает детекцию только в областях интереса (прямоугольники или
+        многоугольники в координатах исходного кадра) и, при tile_size,
+        тайлинг внутри них. Без областей и тайлинга — обычная детекция
+        по кадру конвейера.
+        """
+        if not regions and not tile_size:
+            self.region_detector = None
+            self._decode_pool.resize(2)
+        else:
+            self.region_detector = RegionDetector(self.yolo, regions, tile_size, overlap)
+            # Исходный кадр живёт в пакете до инференса — кольцо как у кадров конвейера
+            self._decode_pool.resize(self._pool_size)
 
-        self.current_frame = results['frame']  # Кадр с наложенными рамками
-        self.detections = results['detections']  # Сырые результаты детекции
+    def pause(self) -> None:
+        """
+        Приостанавливает воспроизведение; кадры в конвейере отбрасываются.
+        """
+        self.paused = True
+        for queue in (self._capture_queue, self._inference_queue, self._output_queue):
+            if queue is not None:
+                queue.clear()
 
-        self.frame_count += 1
-        elapsed_time = time.time() - self.start_time
-        self.fps = self.frame_count / elapsed_time  # Расчет FPS
+    def resume(self) -> None:
+        """
+        Продолжает воспроизведение с кадра, следующего за показанным.
+        """
+        if not self.paused:
+            return
+        self.seek(self.current_position)
+        self.paused = False
 
+    def step_frame(self, delta: int = 1) -> Optional[np.ndarray]:
+        """
+        Ставит воспроизведение на паузу и показывает кадр на delta кадров
+        от текущего. Недавно показанные кадры берутся из LRU-кэша вместе с
+        детекциями; при промахе кадры декодируются от опорного кадра и
+        тоже попадают в кэш, так что следующие шаги назад мгновенны.
+        Возвращает кадр с рамками или None, если шагать некуда.
+        """
+        if self.capture is None or self.total_frames <= 0:
+            return None
+        self.pause()
+        target = min(max(self.current_position + delta, 1), self.total_frames)
+        packet = self.frame_cache.get(target)
+        if packet is None:
+            packet = self._decode_position(target)
+            if packet is None:
+                return None
+        if packet.get('detections') is None:
+            # Кадр декодирован при заполнении кэша — детектируем без трекера
+            packet['detections'] = self.yolo.extract_detections(self._infer([packet])[0])
+            packet.pop('source', None)
+        self.detections = packet['detections']
+        self.current_frame = self._render(packet['frame'], self.detections)
+        self.current_position = target
+        self.current_timestamp = packet['timestamp']
         return self.current_frame
 
+    def preview(self, frame_index: int) -> Optional[np.ndarray]:
+        """
+        Уменьшенный кадр около frame_index для перетаскивания слайдера.
+        Декодируется только ближайший опорный кадр, позиция основного
+        захвата не меняется.
+        """
+        if self.preview_decoder is None:
+            return None
+        self.preview_decoder.index = self.keyframes
+        return self.preview_decoder.preview(frame_index)
+
     def stop_stream(self) -> None:
         """
         Останавливает видеопоток и освобождает ресурсы.
         """
         self.is_running = False
-        if self.capture is not None:
-            self.capture.release()
-        self.capture = None
+        self._stop_pipeline()
+        with self.capture_lock:
+            if self.capture is not None:
+                self.capture.release()
+            self.capture = None
+        if self.preview_decoder is not None:
+            self.preview_decoder.close()
+            self.preview_decoder = None
+        self.frame_cache.clear()
+        self._frame_pool.clear()
+        self._decode_pool.clear()
 
     def get_detections_info(self) -> List[Dict]:
         """
         Возвращает информацию о текущих детекциях в виде списка словарей.
-        Каждый словарь содержит класс, уверенность и координаты рамки.
+        Каждый словарь содержит класс, уверенность и координаты рамки,
+        а при включённом трекере — ещё и идентификатор трека. Поле 'label'
+        («person #3» или просто «person») служит ключом журнала и отчёта.
         """
         info = []
         for det in self.detections:
             x1, y1, x2, y2, conf, cls_id = det[:6]
-            info.append({
-                'class': self.yolo.classes[int(cls_id)],
+            name = self.yolo.classes[int(cls_id)]
+            item = {
+                'class': name,
                 'confidence': float(conf),
-                'bbox': [float(x1), float(y1), float(x2), float(y2)]
-            })
+                'bbox': [float(x1), float(y1), float(x2), float(y2)],
+                'label': name,
+            }
+            if len(det) > 6:
+                item['track_id'] = int(det[6])
+                item['label'] = f"{name} #{int(det[6])}"
+            info.append(item)
         return info
+
+    @property
+    def fps(self) -> float:
+        """
+        Частота кадров за последние секунды. Считается при чтении, поэтому
+        при подвисании конвейера падает до нуля, а не замирает на значении
+        последнего кадра; средний с момента запуска скрывал бы подвисания.
+        """
+        with self._fps_lock:
+            return self._fps_meter.value()
+
+    def get_inference_stats(self) -> Dict[str, float]:
+        """
+        Счётчики кадров, прошедших через детектор и пропущенных расписанием.
+        """
+        if self.scheduler is None:
+            return {'frames_inferred': self.frame_count, 'frames_skipped': 0, 'skip_ratio': 0.0}
+        return self.scheduler.stats()
+
+    def get_queue_depths(self) -> Dict[str, int]:
+        """
+        Возвращает текущую заполненность очередей конвейера.
+        """
+        return {
+            'capture': len(self._capture_queue) if self._capture_queue else 0,
+            'inference': len(self._inference_queue) if self._inference_queue else 0,
+            'output': len(self._output_queue) if self._output_queue else 0,
+        }
+
+    def get_dropped_counts(self) -> Dict[str, int]:
+        """
+        Возвращает число кадров, вытесненных из каждой очереди конвейера.
+        """
+        return {
+            'capture': self._capture_queue.dropped if self._capture_queue else 0,
+            'inference': self._inference_queue.dropped if self._inference_queue else 0,
+            'output': self._output_queue.dropped if self._output_queue else 0,
+        }
+
+    def get_source_health(self) -> Dict[str, Any]:
+        """
+        Здоровье сетевого источника (см. LiveSource.stats): состояние,
+        задержка, переподключения, ошибки декодирования. Для файлов и
+        камер — пустой словарь.
+        """
+        capture = self.capture
+        return capture.stats() if isinstance(capture, LiveSource) else {}
+
+    def _live_source_gauges(self) -> Dict[str, float]:
+        # Числовая часть здоровья источника для метрик
+        return {k: v for k, v in self.get_source_health().items()
+                if isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Снимок метрик конвейера: задержки стадий (p50/p95/p99), скользящий
+        FPS, счётчики кадров, глубина очередей и отброшенные кадры.
+        Задержки стадий собираются, только если метрики включены.
+        """
+        snapshot = self.metrics.snapshot()
+        snapshot['fps'] = self.fps
+        return snapshot
+
+    # --- Конвейерный режим ---------------------------------------------------
+
+    def _start_pipeline(self) -> None:
+        """
+        Создаёт очереди и запускает потоки захвата, инференса и отрисовки.
+        """
+        self._stop_event.clear()
+        self._capture_index = 0
+        # Очередь захвата должна вмещать целый пакет, иначе он никогда не наберётся
+        self._capture_queue = FrameQueue(max(self.queue_size, self.batch_size), self.drop_policy)
+        self._inference_queue = FrameQueue(self.queue_size, self.drop_policy)
+        # Интерфейсу нужен только самый свежий кадр, поэтому выход всегда вытесняющий
+        self._output_queue = FrameQueue(1, DROP_OLDEST)
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=('capture', self._capture_step),
+                             name="ve-capture", daemon=True),
+            threading.Thread(target=self._run_stage, args=('inference', self._inference_step),
+                             name="ve-inference", daemon=True),
+            threading.Thread(target=self._run_stage, args=('postprocess', self._postprocess_step),
+                             name="ve-postprocess", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _stop_pipeline(self) -> None:
+        """
+        Останавливает рабочие потоки и закрывает очереди.
+        """
+        self._halt_pipeline()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+        self._threads = []
+
+    def _halt_pipeline(self) -> None:
+        # Будит и останавливает все стадии; безопасно вызывать из самих стадий
+        self._stop_event.set()
+        for queue in (self._capture_queue, self._inference_queue, self._output_queue):
+            if queue is not None:
+                queue.close()
+
+    def _run_stage(self, stage: str, step: Callable[[], Optional[bool]]) -> None:
+        # Цикл стадии. step() возвращает True за обработанный кадр, None — если
+        # кадра не было, False — чтобы завершить стадию. Исключение пропускает
+        # кадр; серия сбоев подряд останавливает весь конвейер, иначе остальные
+        # стадии ждали бы кадров от погибшего потока, а интерфейс — зависал бы
+        while not self._stop_event.is_set():
+            try:
+                result = step()
+            except Exception as e:
+                if self.errors.record(stage, e):
+                    self.errors.failed = True
+                    print(f"Конвейер остановлен после {self.errors.max_streak} сбоев подряд")
+                    self._halt_pipeline()
+                    return
+                continue
+            if result is False:
+                return
+            if result:
+                self.errors.ok(stage)
+
+    def _capture_step(self) -> Optional[bool]:
+        # Стадия захвата: чтение и масштабирование кадров. На паузе читается
+        # только кадр, запрошенный seek_preview
+        if self.paused and not self._step_event.is_set():
+            self._stop_event.wait(0.01)
+            return None
+        capture = self.capture
+        # Живой источник потокобезопасен и не перематывается, а его read() ждёт
+        # кадра до read_timeout: под capture_lock это ожидание задерживало бы
+        # seek() и stop_stream(). Файлы и камеры читаются под блокировкой
+        with nullcontext() if isinstance(capture, LiveSource) else self.capture_lock:
+            if self.capture is None:
+                return False
+            t0 = time.perf_counter()
+            ret, frame = self._decode_pool.read(capture)
+            position = capture.get(cv2.CAP_PROP_POS_FRAMES)
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            epoch = self._seek_epoch
+            # Под блокировкой: новый запрос после следующей перемотки не потеряется
+            self._step_event.clear()
+        if not ret:
+            # Конец файла или сбой чтения: ждём, вдруг пользователь перемотает назад
+            self._stop_event.wait(0.01)
+            return None
+        self.metrics.observe('decode', time.perf_counter() - t0)
+        if not self.source_fps:
+            self._sync_source_fps(capture)
+        packet = self._make_packet(frame, position, timestamp)
+        packet['index'] = self._capture_index
+        packet['epoch'] = epoch
+        packet['captured_at'] = t0  # Для сквозной задержки захват -> показ
+        self._capture_queue.put(packet)
+        self._capture_index += 1
+        return True
+
+    def _inference_step(self) -> Optional[bool]:
+        # Стадия инференса: прямой проход модели без отрисовки
+        if self.batch_size > 1:
+            packets = self._capture_queue.get_batch(
+                self.batch_size, self.batch_timeout_ms / 1000.0, timeout=0.1)
+        else:
+            packet = self._capture_queue.get(timeout=0.1)
+            packets = [packet] if packet is not None else []
+        # Кадры, захваченные до перемотки, не стоят прямого прохода
+        packets = [p for p in packets if p['epoch'] == self._seek_epoch]
+        if not packets:
+            return None
+        # Кадры, пропущенные расписанием, получат последние детекции на постобработке
+        to_infer = [p for p in packets if self._should_infer(p['frame'], p['epoch'])]
+        with self.metrics.time('inference', max(1, len(to_infer))):
+            results = self._infer(to_infer) if to_infer else []
+        for packet, result in zip(to_infer, results):
+            packet['results'] = result
+        for packet in packets:
+            packet.pop('source', None)  # Кадр исходного разрешения больше не нужен
+            self._inference_queue.put(packet)
+        return True
+
+    def _postprocess_step(self) -> Optional[bool]:
+        # Стадия постобработки: перенос детекций в NumPy. Рамки рисуются
+        # позже, в _take_latest, и только для действительно показанных кадров
+        packet = self._inference_queue.get(timeout=0.1)
+        if packet is None or packet['epoch'] != self._seek_epoch:
+            return None  # Нет кадра или он захвачен до перемотки
+        with self.metrics.time('postprocess'):
+            results = packet.pop('results', None)
+            dets = self.yolo.extract_detections(results) if results is not None else None
+            packet['detections'] = self._update_detections(dets, packet['epoch'])
+        if self.media_writer is not None:
+            self.media_writer.write(packet['frame'], packet['detections'])
+        self._count_frames(1)
+        self.frame_cache.put(packet['position'], packet)
+        self._output_queue.put(packet)
+        return True
+
+    def _should_infer(self, frame: np.ndarray, epoch: int) -> bool:
+        # Без расписания детекция выполняется на каждом кадре. После перемотки
+        # расписание сбрасывается, и первый кадр обрабатывается обязательно
+        if self.scheduler is None:
+            return True
+        if epoch != self._scheduler_epoch:
+            self._scheduler_epoch = epoch
+            self.scheduler.reset()
+        return self.scheduler.should_infer(frame)
+
+    def _update_detections(self, detections: Optional[np.ndarray], epoch: int) -> np.ndarray:
+        # detections=None означает, что кадр пропущен расписанием. Первый кадр
+        # после перемотки сбрасывает треки: прежние к новой позиции не относятся
+        if epoch != self._detections_epoch:
+            self._detections_epoch = epoch
+            self._last_detections = np.zeros((0, 6), dtype=np.float32)
+            if self.tracker is not None:
+                self.tracker.reset()
+        if self.tracker is not None:
+            if detections is None:
+                self._last_detections = self.tracker.predict()
+            else:
+                self._last_detections = self.tracker.update(detections)
+        elif detections is not None:
+            self._last_detections = detections
+        return self._last_detections
+
+    def _sync_source_fps(self, capture: Any) -> None:
+        # FPS сетевого потока известен только после подключения, поэтому
+        # до первого кадра он перечитывается из источника
+        self.source_fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        if self.media_writer is not None and self.source_fps > 0:
+            self.media_writer.fps = self.source_fps
+
+    def _load_keyframes(self, path: str, total_frames: int) -> None:
+        # Индекс строится один раз на файл и берётся из дискового кэша
+        self.keyframes = KeyframeIndex.load(path, total_frames)
+
+    def _decode_position(self, position: int) -> Optional[Dict[str, Any]]:
+        # Декодирует кадр с позицией position (номер кадра position - 1).
+        # Пропускаемые по пути кадры, близкие к цели, сохраняются в кэш
+        target = position - 1
+        capacity = self.frame_cache.capacity
+
+        def keep(index: int) -> None:
+            if target - index < capacity:
+                ret, frame = self._decode_pool.retrieve(self.capture)
+                if ret:
+                    # Исходный кадр не храним: при показе детекция пойдёт по кадру конвейера
+                    cached = self._make_packet(frame, index + 1,
+                                               self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                    cached.pop('source', None)
+                    cached['detections'] = None
+                    self.frame_cache.put(index + 1, cached)
+
+        with self.capture_lock:
+            seek_capture(self.capture, target, self.keyframes, on_frame=keep)
+            ret, frame = self._decode_pool.read(self.capture)
+            timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if not ret:
+            return None
+        packet = self._make_packet(frame, position, timestamp)
+        packet['detections'] = None
+        cached = self.frame_cache.put(position, packet)
+        if 'source' in packet:
+            cached['source'] = packet['source']  # Нужен для детекции по областям в step_frame
+        return cached
+
+    def _make_packet(self, frame: np.ndarray, position: float, timestamp: float) -> Dict[str, Any]:
+        # Вписывает кадр в размер конвейера с полями (без искажения пропорций).
+        # Для детекции по областям сохраняется и кадр исходного разрешения
+        with self.metrics.time('resize'):
+            width, height = self.frame_size
+            buffer = self._frame_pool.next((height, width) + frame.shape[2:], frame.dtype)
+            resized, scale, pad = letterbox(frame, (height, width), dst=buffer)
+        packet = {
+            'position': int(position),
+            'timestamp': timestamp,
+            'frame': resized,
+            'letterbox': (scale, pad),
+        }
+        if self.region_detector is not None:
+            packet['source'] = frame
+        return packet
+
+    def _infer(self, packets: List[Dict[str, Any]], batched: bool = False) -> List[Any]:
+        # Прямой проход по пакетам. С областями интереса детекция идёт по кропам
+        # исходного кадра, а рамки переводятся в координаты кадра конвейера
+        if self.region_detector is not None:
+            sources = [p.get('source', p['frame']) for p in packets]
+            detections = self.region_detector.detect_batch(sources)
+            return [project_boxes(dets, *p['letterbox']) if 'source' in p else dets
+                    for dets, p in zip(detections, packets)]
+        if batched or len(packets) > 1:
+            return self.yolo.predict_batch([p['frame'] for p in packets])
+        return [self.yolo.predict(packets[0]['frame'])]
+
+    def _count_frames(self, count: int) -> None:
+        self.frame_count += count
+        with self._fps_lock:
+            self._fps_meter.tick(count)
+        self.metrics.tick_frame(count)
+
+    def _render(self, frame: np.ndarray, detections: np.ndarray) -> np.ndarray:
+        # Накладывает рамки только если кадр кто-то будет смотреть
+        if not self.render:
+            return frame
+        with self.metrics.time('render'):
+            return self.overlay.draw(frame, detections)
+
+    def _take_latest(self) -> Optional[np.ndarray]:
+        # Забирает самый свежий готовый кадр, не блокируя вызывающий поток
+        packet = self._output_queue.get_latest(timeout=0) if self._output_queue else None
+        if packet is None or packet['epoch'] != self._seek_epoch:
+            return None
+        self.detections = packet['detections']
+        self.current_frame = self._render(packet['frame'], self.detections)
+        self.current_position = packet['position']
+        self.current_timestamp = packet['timestamp']
+        if self.metrics.enabled:
+            self.metrics.observe('end_to_end', time.perf_counter() - packet['captured_at'])
+        return self.current_frame
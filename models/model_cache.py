@@ -0,0 +1,117 @@
+# models/model_cache.py
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from models.yolo_model import BACKEND_TORCH, YOLOModel
+
+DEFAULT_MODEL_PATH = 'models/best.pt'
+
+# Состояния фоновой загрузки модели
+STATUS_IDLE = 'idle'  # Загрузка ещё не запускалась
+STATUS_LOADING = 'loading'  # Идёт импорт библиотек и чтение весов
+STATUS_READY = 'ready'  # Модель загружена и прогрета
+STATUS_FAILED = 'failed'  # Загрузка завершилась ошибкой
+
+_cache: Dict[Tuple[str, str, Optional[int]], YOLOModel] = {}
+_cache_lock = threading.Lock()
+_key_locks: Dict[Tuple[str, str, Optional[int]], threading.Lock] = {}
+
+
+def _cache_key(model_path: str, backend: str, threads: Optional[int]) -> Tuple[str, str, Optional[int]]:
+    return os.path.abspath(model_path), backend, threads
+
+
+def get_model(model_path: str = DEFAULT_MODEL_PATH, backend: str = BACKEND_TORCH,
+              threads: Optional[int] = None) -> YOLOModel:
+    """
+    Возвращает модель из кэша процесса, загружая её при первом обращении.
+    Повторное открытие главного окна и новые потоки получают тот же
+    объект без перечитывания весов. Одновременные запросы одной модели
+    ждут единственную загрузку.
+    """
+    key = _cache_key(model_path, backend, threads)
+    with _cache_lock:
+        model = _cache.get(key)
+        if model is not None:
+            return model
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _cache_lock:
+            model = _cache.get(key)
+        if model is None:
+            model = YOLOModel(model_path, backend=backend, threads=threads)
+            with _cache_lock:
+                _cache[key] = model
+    return model
+
+
+def is_cached(model_path: str = DEFAULT_MODEL_PATH, backend: str = BACKEND_TORCH,
+              threads: Optional[int] = None) -> bool:
+    """
+    Проверяет, загружена ли модель в кэш процесса.
+    """
+    with _cache_lock:
+        return _cache_key(model_path, backend, threads) in _cache
+
+
+def clear_cache() -> None:
+    """
+    Очищает кэш моделей (например, после замены файла весов).
+    """
+    with _cache_lock:
+        _cache.clear()
+        _key_locks.clear()
+
+
+class ModelLoader:
+    """
+    Фоновая загрузка модели через кэш процесса.
+    Поток загрузки не трогает Tk: интерфейс опрашивает status и model
+    из своего цикла after(). Если модель уже в кэше, start() сразу
+    переводит загрузчик в состояние ready.
+    """
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, backend: str = BACKEND_TORCH,
+                 threads: Optional[int] = None,
+                 on_done: Optional[Callable[['ModelLoader'], None]] = None):
+        self.model_path = model_path
+        self.backend = backend
+        self.threads = threads
+        self.on_done = on_done  # Вызывается из потока загрузки по завершении
+        self.status = STATUS_IDLE
+        self.model: Optional[YOLOModel] = None
+        self.error: Optional[Exception] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == STATUS_READY
+
+    def start(self) -> 'ModelLoader':
+        """
+        Запускает загрузку в фоновом потоке (повторный вызов ничего не делает).
+        """
+        if self._thread is not None:
+            return self
+        self.status = STATUS_LOADING
+        self._thread = threading.Thread(target=self._load, name='model-loader', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[YOLOModel]:
+        """
+        Ожидает окончания загрузки и возвращает модель (None при ошибке).
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.model
+
+    def _load(self) -> None:
+        try:
+            self.model = get_model(self.model_path, self.backend, self.threads)
+            self.status = STATUS_READY
+        except Exception as e:
+            self.error = e
+            self.status = STATUS_FAILED
+            print(f"Ошибка фоновой загрузки модели: {e}")
+        if self.on_done is not None:
+            self.on_done(self)
@@ -1,34 +1,336 @@
-import torch
+import ast
+import os
+from abc import ABC, abstractmethod
+import cv2
 import numpy as np
-from ultralytics import YOLO
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
+from utils.image import letterbox, scale_boxes
+from utils.overlay import OverlayRenderer
 
-class YOLOModel:
-    def __init__(self, model_path: str = 'models/best.pt'):
-        # Загружаем модель YOLOv8
-        self.model = self.load_model(model_path)
-        self.classes = self.model.names  # Список классов (названия объектов)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'  # Выбор устройства: GPU или CPU
-        print(torch.cuda.is_available())  # Отладочный вывод — доступность CUDA
+# Доступные бэкенды инференса
+BACKEND_TORCH = 'torch'  # PyTorch через ultralytics
+BACKEND_ONNX = 'onnx'  # ONNX Runtime (CPU)
+BACKEND_OPENVINO = 'openvino'  # OpenVINO IR (CPU)
+BACKEND_AUTO = 'auto'  # Самый быстрый из найденных рядом с весами
 
-    def load_model(self, model_path: str):
-        """
-        Загружает модель YOLOv8 из указанного пути.
-        """
+
+class TorchBackend:
+    """
+    Инференс через ultralytics/PyTorch (исходный путь).
+    """
+    name = BACKEND_TORCH
+
+    def __init__(self, model_path: str, device: str, threads: Optional[int] = None):
+        # torch и ultralytics импортируются только при реальной загрузке модели
+        import torch
+        from ultralytics import YOLO
+        if threads:
+            torch.set_num_threads(threads)
         try:
-            return YOLO(model_path)
+            self.model = YOLO(model_path)
         except Exception as e:
             raise RuntimeError(f"Ошибка загрузки модели YOLOv8: {e}")
+        self.device = device
+        self.names = self.model.names
+
+    def predict(self, frames: List[np.ndarray]) -> List[Any]:
+        # Результаты ultralytics; детекции извлекаются позже через extract_detections
+        source = frames[0] if len(frames) == 1 else list(frames)
+        return list(self.model(source, verbose=False, device=self.device))
+
+
+class _ExportedBackend(ABC):
+    """
+    Общая часть бэкендов для экспортированной модели YOLOv8 с выходом
+    (batch, 4 + классы, якоря): letterbox-предобработка и постобработка
+    с NMS в том же формате [x1, y1, x2, y2, conf, cls], что у ultralytics.
+    Наследник реализует только прямой проход _run.
+    """
+    def __init__(self, imgsz: int, conf: float, iou: float, max_det: int):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self.batch_dynamic = False
 
-    def detect(self, frame: np.ndarray) -> Dict[str, Any]:
+    def _preprocess(self, frame: np.ndarray):
+        img, scale, pad = letterbox(frame, (self.imgsz, self.imgsz))
+        blob = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, scale, pad
+
+    def _postprocess(self, output: np.ndarray, scale: float, pad, shape) -> np.ndarray:
+        preds = output.T  # (якоря, 4 + классы)
+        scores = preds[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf > self.conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        xywh, conf, cls = preds[keep, :4], conf[keep], cls[keep]
+
+        # NMS по классам, рамки в формате (x, y, w, h) с левым верхним углом
+        tl = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes = np.concatenate([tl, xywh[:, 2:]], axis=1)
+        idx = cv2.dnn.NMSBoxesBatched(boxes.tolist(), conf.tolist(), cls.tolist(), self.conf, self.iou)
+        idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+        idx = idx[np.argsort(-conf[idx], kind='stable')][:self.max_det]
+
+        out = np.empty((len(idx), 6), dtype=np.float32)
+        out[:, :2] = tl[idx]
+        out[:, 2:4] = tl[idx] + xywh[idx, 2:]
+        out[:, 4] = conf[idx]
+        out[:, 5] = cls[idx]
+        scale_boxes(out, scale, pad, shape[:2])
+        return out
+
+    @abstractmethod
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        """
+        Прямой проход по блобу (batch, 3, imgsz, imgsz); выход (batch, 4 + классы, якоря).
+        """
+
+    def predict(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        prepared = [self._preprocess(f) for f in frames]
+        if self.batch_dynamic and len(prepared) > 1:
+            outputs = self._run(np.stack([p[0] for p in prepared]))
+        else:
+            outputs = np.concatenate([self._run(p[0][None]) for p in prepared])
+        return [self._postprocess(out, scale, pad, frame.shape)
+                for out, (_, scale, pad), frame in zip(outputs, prepared, frames)]
+
+
+class OnnxBackend(_ExportedBackend):
+    """
+    Инференс экспортированной ONNX-модели через ONNX Runtime на CPU.
+    """
+    name = BACKEND_ONNX
+
+    def __init__(self, model_path: str, threads: Optional[int] = None, imgsz: int = 640,
+                 conf: float = 0.25, iou: float = 0.7, max_det: int = 300):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("Для бэкенда ONNX установите onnxruntime") from e
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        super().__init__(shape[2] if isinstance(shape[2], int) else imgsz, conf, iou, max_det)
+        self.batch_dynamic = not isinstance(shape[0], int)
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = _parse_names(metadata.get('names'))
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    """
+    Инференс модели в формате OpenVINO IR на CPU.
+    """
+    name = BACKEND_OPENVINO
+
+    def __init__(self, model_path: str, threads: Optional[int] = None, imgsz: int = 640,
+                 conf: float = 0.25, iou: float = 0.7, max_det: int = 300):
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise RuntimeError("Для бэкенда OpenVINO установите openvino") from e
+        if os.path.isdir(model_path):
+            xml = [f for f in os.listdir(model_path) if f.endswith('.xml')]
+            if not xml:
+                raise RuntimeError(f"В каталоге {model_path} нет модели OpenVINO (*.xml)")
+            model_path = os.path.join(model_path, xml[0])
+        core = ov.Core()
+        model = core.read_model(model_path)
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = core.compile_model(model, 'CPU', config)
+        shape = model.inputs[0].get_partial_shape()
+        super().__init__(shape[2].get_length() if shape[2].is_static else imgsz, conf, iou, max_det)
+        self.batch_dynamic = shape[0].is_dynamic
+        names = None
+        if model.has_rt_info(['framework', 'names']):
+            names = model.get_rt_info(['framework', 'names']).astype(str)
+        if names is None:
+            metadata = os.path.join(os.path.dirname(model_path), 'metadata.yaml')
+            names = _read_names_from_yaml(metadata)
+        self.names = _parse_names(names)
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        return self.compiled(blob)[self.compiled.output(0)]
+
+
+def _parse_names(raw: Any) -> Dict[int, str]:
+    # Имена классов из метаданных экспорта: строка вида "{0: 'person', ...}" или словарь
+    if isinstance(raw, dict):
+        return {int(k): str(v) for k, v in raw.items()}
+    if isinstance(raw, str) and raw:
+        try:
+            return {int(k): str(v) for k, v in ast.literal_eval(raw).items()}
+        except (ValueError, SyntaxError):
+            pass
+    return {}
+
+
+def _read_names_from_yaml(path: str) -> Optional[Dict[int, str]]:
+    if not os.path.isfile(path):
+        return None
+    try:
+        import yaml
+        with open(path, encoding='utf-8') as f:
+            return (yaml.safe_load(f) or {}).get('names')
+    except Exception:
+        return None
+
+
+def exported_path(model_path: str, backend: str) -> str:
+    """
+    Путь к экспортированной модели рядом с весами (как их называет
+    ultralytics export): best.pt -> best.onnx, best_openvino_model/.
+    """
+    stem = os.path.splitext(model_path)[0]
+    if backend == BACKEND_ONNX:
+        return stem + '.onnx'
+    if backend == BACKEND_OPENVINO:
+        return stem + '_openvino_model'
+    return model_path
+
+
+def export_model(model_path: str = 'models/best.pt', backend: str = BACKEND_ONNX, imgsz: int = 640) -> str:
+    """
+    Экспортирует веса PyTorch в формат ONNX или OpenVINO рядом с исходным файлом.
+    """
+    from ultralytics import YOLO
+    formats = {BACKEND_ONNX: 'onnx', BACKEND_OPENVINO: 'openvino'}
+    if backend not in formats:
+        raise ValueError(f"Экспорт поддерживается только для {', '.join(formats)}")
+    return YOLO(model_path).export(format=formats[backend], imgsz=imgsz)
+
+
+def select_device(backend: str = BACKEND_TORCH) -> str:
+    """
+    Устройство для PyTorch: GPU, если доступна CUDA, иначе CPU.
+    Экспортированные бэкенды работают на CPU и не импортируют torch.
+    """
+    if backend in (BACKEND_ONNX, BACKEND_OPENVINO):
+        return 'cpu'
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+class YOLOModel:
+    def __init__(self, model_path: str = 'models/best.pt', backend: str = BACKEND_TORCH,
+                 threads: Optional[int] = None, warmup: int = 1):
+        self.device = select_device(backend)  # Выбор устройства: GPU или CPU
+        # Загружаем модель YOLOv8 выбранным бэкендом
+        self.backend = self.load_backend(model_path, backend, threads)
+        self.model = getattr(self.backend, 'model', None)  # Объект ultralytics (только для torch)
+        self.classes = self.backend.names  # Список классов (названия объектов)
+        self.overlay = OverlayRenderer(self.classes)  # Отрисовка для onnx/openvino, одна на модель
+        self.warmup(warmup)
+
+    def load_backend(self, model_path: str, backend: str = BACKEND_TORCH, threads: Optional[int] = None):
+        """
+        Загружает модель выбранным бэкендом. Для onnx/openvino model_path
+        может указывать как на экспортированный файл, так и на best.pt —
+        тогда экспорт ищется рядом. auto выбирает OpenVINO, затем ONNX,
+        если они установлены и экспорт найден, иначе PyTorch.
+        """
+        if backend == BACKEND_AUTO:
+            for candidate in (BACKEND_OPENVINO, BACKEND_ONNX):
+                path = exported_path(model_path, candidate)
+                if os.path.exists(path):
+                    try:
+                        return self.load_backend(path, candidate, threads)
+                    except RuntimeError as e:
+                        print(f"Бэкенд {candidate} недоступен: {e}")
+            backend = BACKEND_TORCH
+
+        if backend == BACKEND_TORCH:
+            return TorchBackend(model_path, self.device, threads)
+        if backend in (BACKEND_ONNX, BACKEND_OPENVINO):
+            if model_path.endswith('.pt'):
+                model_path = exported_path(model_path, backend)
+            if not os.path.exists(model_path):
+                raise RuntimeError(f"Экспортированная модель не найдена: {model_path}")
+            cls = OnnxBackend if backend == BACKEND_ONNX else OpenVinoBackend
+            return cls(model_path, threads)
+        raise ValueError(f"Неизвестный бэкенд инференса: {backend}")
+
+    def warmup(self, runs: int = 1) -> None:
+        """
+        Прогревочные проходы на пустом кадре, чтобы первый реальный кадр
+        не платил за ленивую инициализацию бэкенда.
+        """
+        dummy = np.zeros((480, 640, 3), dtype=np.uint8)
+        for _ in range(max(0, runs)):
+            self.backend.predict([dummy])
+
+    def detect(self, frame: np.ndarray, render: bool = True) -> Dict[str, Any]:
         """
         Выполняет детекцию объектов на изображении.
         Возвращает кадр с аннотациями и данные о найденных объектах.
+        При render=False кадр не отрисовывается и 'frame' равен None.
+        У onnx/openvino кадр рисуется в переиспользуемый буфер модели: он
+        действителен до следующего вызова detect через один.
         """
-        results = self.model(frame, verbose=False)[0]  # Получаем первый результат (batch size = 1)
-        rendered_frame = results.plot()  # Отрисовка аннотаций на кадре
+        results = self.predict(frame)
+        detections = self.extract_detections(results)
+
+        rendered_frame = None
+        if render:
+            if isinstance(results, np.ndarray):
+                rendered_frame = self.overlay.draw(frame, detections)
+            else:
+                rendered_frame = self.render(results)
 
         return {
-            'detections': results.boxes.data.cpu().numpy(),  # Детекции в виде массива NumPy
+            'detections': detections,  # Детекции в виде массива NumPy
             'frame': rendered_frame  # Кадр с отрисованными боксами
         }
+
+    def predict(self, frame: np.ndarray) -> Any:
+        """
+        Выполняет только прямой проход модели, без отрисовки.
+        Возвращает результат бэкенда: объект ultralytics (torch) или
+        готовый массив детекций (onnx/openvino).
+        """
+        return self.backend.predict([frame])[0]  # Получаем первый результат (batch size = 1)
+
+    def predict_batch(self, frames: Sequence[np.ndarray]) -> List[Any]:
+        """
+        Выполняет один прямой проход модели по нескольким кадрам.
+        Возвращает список результатов бэкенда в порядке кадров.
+        """
+        if len(frames) == 0:
+            return []
+        return self.backend.predict(list(frames))
+
+    def detect_batch(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Пакетная детекция объектов без отрисовки.
+        Для каждого кадра возвращает массив [x1, y1, x2, y2, conf, cls].
+        """
+        return [self.extract_detections(r) for r in self.predict_batch(frames)]
+
+    @staticmethod
+    def extract_detections(results: Any) -> np.ndarray:
+        """
+        Извлекает детекции в формате [x1, y1, x2, y2, conf, cls].
+        """
+        if isinstance(results, np.ndarray):
+            return results
+        return results.boxes.data.cpu().numpy()
+
+    @staticmethod
+    def render(results: Any) -> np.ndarray:
+        """
+        Отрисовывает аннотации на кадре из результата predict() (только torch).
+        """
+        return results.plot()
@@ -0,0 +1,72 @@
+"""
+Общие заглушки и фикстуры тестов: модель без весов и короткие MJPG-клипы,
+в которых номер кадра зашит в яркость.
+"""
+import time
+from typing import Callable, Optional, Tuple
+import cv2
+import numpy as np
+import pytest
+
+FRAME_STEP = 4  # Шаг яркости между соседними кадрами клипа
+
+
+class StubModel:
+    """
+    Заглушка YOLOModel: на каждый кадр возвращает одни и те же детекции
+    [x1, y1, x2, y2, conf, cls], считает прямые проходы и размеры пакетов.
+    """
+    classes = {0: 'person'}
+
+    def __init__(self, detections=((1, 2, 30, 40, 0.9, 0),)):
+        self.detections = np.array(detections, dtype=np.float32).reshape(-1, 6)
+        self.calls = 0
+        self.batches = []
+
+    def predict(self, frame):
+        self.calls += 1
+        return self.detections.copy()
+
+    def predict_batch(self, frames):
+        self.batches.append(len(frames))
+        return [self.predict(f) for f in frames]
+
+    @staticmethod
+    def extract_detections(result):
+        return result
+
+
+def make_clip(path: str, frames: int = 60, size: Tuple[int, int] = (160, 120), fps: float = 25,
+              draw: Optional[Callable[[int], np.ndarray]] = None) -> str:
+    """
+    Пишет MJPG-клип (ширина, высота) = size. По умолчанию кадр i залит
+    яркостью i * FRAME_STEP; draw(i) задаёт кадр явно.
+    """
+    width, height = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for i in range(frames):
+        writer.write(draw(i) if draw is not None
+                     else np.full((height, width, 3), i * FRAME_STEP, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def frame_number(frame: np.ndarray) -> int:
+    # Номер кадра клипа make_clip по его яркости
+    return int(round(frame.mean() / FRAME_STEP))
+
+
+def next_frame(processor, timeout: float = 5.0) -> Optional[np.ndarray]:
+    # Ждёт следующего кадра конвейера VideoProcessor (None — не дождались)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        frame = processor.process_frame()
+        if frame is not None:
+            return frame
+        time.sleep(0.002)
+    return None
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    return make_clip(tmp_path / "clip.avi")
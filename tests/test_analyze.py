@@ -0,0 +1,75 @@
+import csv
+import json
+import numpy as np
+import pytest
+from core.analyze import analyze_video, save_detections, DETECTION_COLUMNS
+from conftest import StubModel
+
+
+def _stub_model():
+    # Одна детекция 'person' на каждом кадре
+    return StubModel(detections=[[1, 2, 3, 4, 0.5, 0]])
+
+
+def test_analyze_video_stride_and_batching(video_file):
+    result = analyze_video(video_file, yolo=_stub_model(), stride=3, batch_size=4)
+    assert result['frames'] == 20
+    assert [row[0] for row in result['detections']] == list(range(0, 60, 3))
+    assert all(classes == ['person'] for _, classes in result['detection_log'])
+    assert {'decode', 'resize', 'inference'} <= set(result['timings'])
+
+
+def test_analyze_video_max_frames(video_file):
+    result = analyze_video(video_file, yolo=_stub_model(), max_frames=5)
+    assert result['frames'] == 5
+
+
+def test_analyze_video_missing_file():
+    with pytest.raises(FileNotFoundError):
+        analyze_video("missing.mp4", yolo=_stub_model())
+
+
+@pytest.mark.parametrize("ext", [".csv", ".json", ".npz"])
+def test_save_detections(tmp_path, ext):
+    rows = [[0, 0.1, 0, 'person', 0.5, 1.0, 2.0, 3.0, 4.0, -1]]
+    path = str(tmp_path / f"out{ext}")
+    save_detections(rows, path)
+    if ext == ".csv":
+        with open(path, newline='', encoding='utf-8') as f:
+            header, *lines = list(csv.reader(f))
+        assert header == DETECTION_COLUMNS
+        assert lines == [[str(value) for value in rows[0]]]
+    elif ext == ".json":
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == [dict(zip(DETECTION_COLUMNS, rows[0]))]
+    else:
+        data = np.load(path)
+        assert set(data.files) == set(DETECTION_COLUMNS)
+        assert [data[name][0] for name in DETECTION_COLUMNS] == rows[0]
+
+
+def test_analyze_video_with_scheduler_reuses_detections(video_file):
+    from core.scheduler import InferenceScheduler
+    scheduler = InferenceScheduler(every_n=4)
+    result = analyze_video(video_file, yolo=_stub_model(), scheduler=scheduler, batch_size=3)
+    assert result['frames'] == 60
+    assert scheduler.frames_inferred == 15
+    assert len(result['detection_log']) == 60
+    assert all(classes == ['person'] for _, classes in result['detection_log'])
+
+
+def test_analyze_video_with_tracker_labels_by_track(video_file):
+    from core.tracker import Tracker
+    result = analyze_video(video_file, yolo=_stub_model(), tracker=Tracker())
+    assert all(labels == ['person #1'] for _, labels in result['detection_log'])
+    assert {row[-1] for row in result['detections']} == {1}
+
+
+def test_analyze_video_persists_session_to_store(video_file, tmp_path):
+    from core.detection_store import DetectionStore
+    store = DetectionStore(str(tmp_path / "detections.db"), classes=StubModel.classes)
+    result = analyze_video(video_file, yolo=_stub_model(), batch_size=4, store=store)
+    stored = store.log(result['session'])
+    assert list(stored) == list(result['detection_log'])
+    assert store.count(source=video_file, class_name='person') == 60
+    store.close()
@@ -0,0 +1,95 @@
+import sqlite3
+import time
+import pytest
+import auth.auth as auth
+from auth.db import ConnectionPool, close_pools, get_pool
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "data" / "users.db")
+    monkeypatch.setattr(auth, 'DB_PATH', path)
+    auth.init_db()
+    yield path
+    close_pools(path)
+
+
+def test_init_db_creates_admin_and_verifies(db):
+    user = auth.verify_user("admin", "admin123")
+    assert user == {"id": 1, "username": "admin", "is_admin": True}
+    assert auth.verify_user("admin", "wrong") is None
+    assert auth.verify_user("nobody", "x") is None
+
+
+def test_create_user_invalidates_cached_lookup(db):
+    assert auth.verify_user("operator", "secret") is None
+    auth.create_user("operator", "secret")
+    assert auth.verify_user("operator", "secret")["is_admin"] is False
+    with pytest.raises(sqlite3.IntegrityError):
+        auth.create_user("operator", "other")
+
+
+def _write_directly(path, sql, params):
+    # Изменение таблицы в обход auth (как из другого процесса): кэш не сбрасывается
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_lookup_cache_keeps_only_found_users_for_a_short_time(db, monkeypatch):
+    # Отсутствующий логин не кэшируется: пользователь из другого процесса виден сразу
+    assert auth.verify_user("operator", "secret") is None
+    _write_directly(db, auth.SQL_INSERT_USER, ("operator", auth.hash_password("secret"), 0))
+    assert auth.verify_user("operator", "secret") is not None
+
+    # Найденная строка живёт не дольше TTL: смена пароля в обход auth видна после него
+    monkeypatch.setattr(auth._user_cache, 'ttl', 0.05)
+    auth._user_cache.clear()
+    assert auth.verify_user("admin", "admin123") is not None
+    _write_directly(db, "UPDATE users SET password=? WHERE username=?",
+                    (auth.hash_password("changed"), "admin"))
+    time.sleep(0.1)
+    assert auth.verify_user("admin", "admin123") is None
+    assert auth.verify_user("admin", "changed") is not None
+
+
+def test_bulk_import_and_keyset_pages(db):
+    users = [(f"op{i:05d}", "pw") for i in range(2500)]
+    users += [("op00001", "dup"), ("", "pw"), ("lead", "pw", "1")]
+    created, skipped = auth.bulk_import_users(users, batch_size=1000)
+    assert (created, skipped) == (2501, 2)
+    assert auth.count_users() == 2502 and auth.count_users("op000") == 100
+    assert auth.verify_user("lead", "pw")["is_admin"]
+
+    seen, after = [], 0
+    while True:
+        page = auth.list_users(after, 1000)
+        if not page:
+            break
+        seen.extend(u['username'] for u in page)
+        after = page[-1]['id']
+    assert len(seen) == 2502 and seen[0] == "admin"
+    assert [u["username"] for u in auth.list_users(0, 5, "op002")] == [
+        f"op{i:05d}" for i in range(200, 205)]
+
+
+def test_read_users_csv_skips_header(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("username,password,is_admin\nivan,pw,0\n\nanna,pw,1\n", encoding='utf-8')
+    assert list(auth.read_users_csv(str(path))) == [["ivan", "pw", "0"], ["anna", "pw", "1"]]
+
+
+def test_pool_reuses_configured_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2, timeout=0.1)
+    with pool.connection() as first:
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        with pool.connection() as second:
+            assert second is not first
+            with pytest.raises(TimeoutError):
+                pool.acquire()  # Пул исчерпан
+    with pool.connection() as again:
+        assert again in (first, second)
+    pool.close()
+    assert get_pool(str(tmp_path / "x.db")) is get_pool(str(tmp_path / "x.db"))
+    close_pools()
@@ -0,0 +1,54 @@
+import json
+from benchmarks import suite
+from benchmarks.synthetic import StandInModel, make_video
+
+
+def test_stand_in_model_finds_synthetic_objects(tmp_path):
+    import cv2
+    path = make_video(str(tmp_path / "clip.avi"), frames=5, size=(320, 240), objects=3)
+    ok, frame = cv2.VideoCapture(path).read()
+    assert ok
+    result = StandInModel().detect(frame)
+    assert 1 <= len(result['detections']) <= 3
+    assert result['frame'].shape == frame.shape
+
+
+def test_suite_writes_json_with_requested_params(tmp_path):
+    out = tmp_path / "bench.json"
+    assert suite.main(['--quick', '--runs', '5', '--only', 'resize,detect', '--out', str(out)]) == 0
+    current = json.loads(out.read_text(encoding='utf-8'))
+    assert set(current['results']) == {'resize', 'detect'}
+    assert current['environment']['model'] == 'stand-in'
+    # Явный --runs не перекрывается объёмами --quick
+    assert current['environment']['params']['runs'] == 5
+    assert current['results']['resize']['runs'] == 5
+    assert current['environment']['params']['video_frames'] == 60
+
+
+def _write_baseline(path, current, factors):
+    # Базовый прогон из текущего: p50 стадии делится на factor (factor > 1 — прежде было быстрее)
+    baseline = json.loads(json.dumps(current))
+    for name, factor in factors.items():
+        baseline['results'][name]['p50_ms'] /= factor
+    path.write_text(json.dumps(baseline), encoding='utf-8')
+    return str(path)
+
+
+def test_suite_flags_regression_against_baseline(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    # Порог с запасом на шум коротких замеров; внесённое замедление — 20 раз
+    args = ['--quick', '--runs', '5', '--only', 'resize,detect', '--threshold', '4']
+    assert suite.main(args + ['--out', str(out)]) == 0
+    current = json.loads(out.read_text(encoding='utf-8'))
+
+    # Прежде detect был в 20 раз быстрее: новый прогон — регрессия
+    slow = _write_baseline(tmp_path / "fast_before.json", current, {'detect': 20.0})
+    capsys.readouterr()
+    assert suite.main(args + ['--baseline', slow]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert any(l.startswith('detect') and 'РЕГРЕССИЯ' in l for l in lines)
+    assert not any(l.startswith('resize') and 'РЕГРЕССИЯ' in l for l in lines)
+
+    # Прежде обе стадии были в 20 раз медленнее: регрессии нет
+    fast = _write_baseline(tmp_path / "slow_before.json", current, {'detect': 0.05, 'resize': 0.05})
+    assert suite.main(args + ['--baseline', fast]) == 0
@@ -0,0 +1,57 @@
+import numpy as np
+from utils.detection_log import DetectionLog, DETECTION_DTYPE
+
+
+def _dets(n, cls=0, track=None):
+    out = np.zeros((n, 7 if track is not None else 6), dtype=np.float32)
+    out[:, :4] = [1, 2, 3, 4]
+    out[:, 4] = 0.8
+    out[:, 5] = cls
+    if track is not None:
+        out[:, 6] = track
+    return out
+
+
+def test_append_and_iter_frames_matches_report_format():
+    log = DetectionLog(classes={0: 'person', 1: 'car'})
+    log.append(0.0, _dets(1, cls=0, track=3))
+    log.append(0.5, None)
+    log.append(1.0, np.vstack([_dets(1, cls=1), _dets(1, cls=0)]))
+    assert list(log) == [(0.0, ['person #3']), (0.5, []), (1.0, ['car', 'person'])]
+    assert len(log) == 3
+    assert log.num_detections == 3
+
+
+def test_query_time_range():
+    log = DetectionLog(classes={0: 'person'})
+    for i in range(10):
+        log.append(float(i), _dets(2))
+    rows = log.query(3.0, 5.0)
+    assert rows.dtype == DETECTION_DTYPE
+    assert sorted(set(rows['time'])) == [3.0, 4.0, 5.0]
+    assert len(log.frames(8.0)) == 2
+
+
+def test_spills_to_disk_when_memory_cap_hit(tmp_path):
+    log = DetectionLog(classes={0: 'person'}, chunk_rows=16, max_memory_mb=0.002,
+                       spill_dir=str(tmp_path))
+    for i in range(500):
+        log.append(i * 0.1, _dets(1, track=i % 5))
+    assert (tmp_path / "detections.bin").exists()
+    assert log._detections.memory_bytes + log._frames.memory_bytes <= log.max_memory_bytes
+    assert log.num_detections == 500
+    frames = list(log.iter_frames(window=7))
+    assert len(frames) == 500
+    assert abs(frames[123][0] - 12.3) < 1e-9
+    assert frames[123][1] == ['person #3']
+    assert len(log.query(10.0, 19.95)) == 100
+    log.close()
+    assert not (tmp_path / "detections.bin").exists()
+
+
+def test_non_monotonic_time_after_seek():
+    log = DetectionLog()
+    log.append(5.0, _dets(1))
+    log.append(1.0, _dets(1))
+    assert not log.monotonic
+    assert len(log.query(0.0, 2.0)) == 1
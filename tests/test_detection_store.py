@@ -0,0 +1,111 @@
+import threading
+import numpy as np
+import pytest
+from core.detection_store import DetectionStore, connect
+from utils.detection_log import DetectionLog
+from utils.intervals import intervals_from_log
+
+CLASSES = {0: 'person', 1: 'car'}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DetectionStore(str(tmp_path / "detections.db"), classes=CLASSES, batch_size=64)
+    yield store
+    store.close()
+
+
+def _dets(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 7)
+
+
+def test_batched_writes_and_indexed_queries(store):
+    session = store.start_session(user='admin')
+    for i in range(300):
+        cam = f"cam{i % 3}"
+        dets = _dets([0, 0, 10, 10, 0.9, i % 2, 7]) if i % 5 else None
+        store.append(session, cam, i / 25.0, dets, wall_time=1000.0 + i)
+    assert store.flush(timeout=5)
+    stats = store.stats()
+    assert stats['frames_written'] == 300 and stats['detections_written'] == 240
+    assert stats['batches_written'] < 300  # Кадры пишутся пакетами
+
+    persons = store.query(source='cam0', class_name='person', t0=1000.0, t1=1100.0)
+    expected = [i for i in range(0, 101) if i % 3 == 0 and i % 5 and i % 2 == 0]
+    assert [round(p['time'] - 1000.0) for p in persons] == expected
+    assert persons[0]['class'] == 'person' and persons[0]['track_id'] == 7
+    assert store.count(class_name='car') == 120 and store.query(class_name='truck') == []
+
+    conn = connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    plan = " ".join(str(r) for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM detections WHERE source = ? AND time BETWEEN ? AND ?",
+        ('cam0', 0, 1)))
+    assert 'idx_detections_source_time' in plan
+    conn.close()
+
+
+def test_session_log_matches_in_memory_journal(store):
+    session = store.start_session()
+    other = store.start_session()
+    memory = DetectionLog(classes=CLASSES)
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        present = rng.random() < 0.7
+        dets = _dets([0, 0, 5, 5, 0.8, 0, 1], [1, 1, 6, 6, 0.7, 1, 2]) if present else None
+        store.append(session, 'file.mp4', i * 0.1, dets)
+        store.append(other, 'file.mp4', i * 0.1, _dets([0, 0, 5, 5, 0.8, 1, 9]))
+        memory.append(i * 0.1, dets)
+
+    log = store.log(session)
+    assert len(log) == 200 and log.monotonic
+    assert intervals_from_log(log, 0.5) == intervals_from_log(memory, 0.5)
+    assert list(log) == list(memory)
+    store.end_session(session)
+    assert store.sessions()[0]['ended'] is not None
+
+
+def test_store_survives_reopen(tmp_path):
+    path = str(tmp_path / "detections.db")
+    store = DetectionStore(path, classes=CLASSES)
+    session = store.start_session()
+    store.append(session, 0, 1.0, _dets([0, 0, 1, 1, 0.5, 1, -1]))
+    store.close()  # Очередь дописывается при закрытии
+
+    reopened = DetectionStore(path)
+    rows = reopened.query(source=0)
+    assert len(rows) == 1 and rows[0]['class'] == 'car' and 'track_id' not in rows[0]
+    reopened.close()
+
+
+def test_bad_row_does_not_kill_writer(store):
+    session = store.start_session()
+    store.append(session, 'cam', 0.0, _dets([0, 0, 1, 1, 0.9, 0, 1]))
+    store.append(session, 'cam', 0.1, _dets([0, 0, 1, 1, 0.9, np.nan, 1]))  # int(nan) в записи
+    store.append(session, 'cam', 0.2, _dets([0, 0, 1, 1, 0.9, 1, 2]))
+    assert store.flush(timeout=5)
+    # Теряется только неверный кадр, соседние по пакету записаны
+    assert store.stats()['errors'] == 1 and store.frames_written == 2
+    store.append(session, 'cam', 0.3, None)
+    assert store.flush(timeout=5) and store.frames_written == 3
+    store.end_session(session)
+
+
+def test_non_blocking_append_drops_when_writer_lags(tmp_path, monkeypatch):
+    store = DetectionStore(str(tmp_path / "detections.db"), classes=CLASSES, queue_size=4,
+                           block=False)
+    release = threading.Event()
+    write_frames = store._write_frames
+
+    def slow_write(conn, frames):
+        release.wait(5)  # Диск «завис»
+        write_frames(conn, frames)
+
+    monkeypatch.setattr(store, '_write_frames', slow_write)
+    session = store.start_session()
+    accepted = sum(store.append(session, 'cam', i * 0.1, None) for i in range(50))
+    assert accepted < 50 and store.stats()['frames_dropped'] == 50 - accepted
+    assert not store.flush(timeout=0.05)  # Ожидание ограничено
+    release.set()
+    assert store.flush(timeout=5) and store.frames_written == accepted
+    store.close()
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+from core.seek import FrameCache
+from core.video_processor import VideoProcessor
+from utils.frame_pool import DisplayBuffer, FramePool
+from utils.image import letterbox
+from conftest import StubModel, frame_number
+
+
+def test_pool_reuses_buffers_round_robin():
+    pool = FramePool(3)
+    first = [pool.next((4, 4, 3)) for _ in range(3)]
+    again = [pool.next((4, 4, 3)) for _ in range(3)]
+    assert all(a is b for a, b in zip(first, again))
+    assert len({id(b) for b in first}) == 3 and pool.allocations == 3
+    assert pool.next((8, 8, 3)).shape == (8, 8, 3) and pool.allocations == 4
+
+
+def test_pool_read_decodes_into_ring(video_file):
+    capture = cv2.VideoCapture(video_file)
+    pool = FramePool(2)
+    frames = [pool.read(capture)[1] for _ in range(6)]
+    capture.release()
+    assert pool.allocations == 2  # Дальше декодер пишет в готовые буферы
+    assert frames[0] is frames[2] is frames[4] and frames[1] is frames[3]
+
+
+def test_letterbox_into_buffer_matches_allocating_path():
+    frame = np.random.default_rng(0).integers(0, 255, (90, 200, 3), dtype=np.uint8)
+    expected, scale, pad = letterbox(frame, (480, 640))
+    dst = np.zeros((480, 640, 3), dtype=np.uint8)
+    result, scale2, pad2 = letterbox(frame, (480, 640), dst=dst)
+    assert result is dst and np.array_equal(result, expected)
+    assert (scale2, pad2) == (scale, pad)
+
+
+def test_frame_cache_copies_and_recycles_frames():
+    cache = FrameCache(capacity=2, copy_frames=True)
+    buf = np.zeros((2, 2, 3), dtype=np.uint8)
+    stored = cache.put(1, {'frame': buf})
+    buf[:] = 255  # Буфер конвейера перезаписан — копия в кэше не меняется
+    assert cache.get(1)['frame'].max() == 0 and stored is cache.get(1)
+    cache.put(2, {'frame': buf})
+    cache.put(3, {'frame': buf})  # Вытесняет кадр 1, его память уходит под следующую копию
+    recycled = stored['frame']
+    assert cache.put(4, {'frame': buf})['frame'] is recycled
+
+
+def test_pipeline_frames_survive_buffer_reuse(video_file):
+    vp = VideoProcessor(yolo=StubModel(detections=[]), render=False)
+    assert vp.start_stream(video_file)
+    for _ in range(30):  # Больше кадров, чем буферов в кольце
+        vp.process_frame()
+    assert vp._frame_pool.allocations == vp._frame_pool.size
+    frame = vp.step_frame(-20)  # Из кэша кадров: копия не перезаписана кольцом
+    assert frame_number(frame) == 9
+    vp.stop_stream()
+
+
+def test_display_buffer_shares_memory_with_image():
+    display = DisplayBuffer()
+    frame = np.zeros((2, 3, 3), dtype=np.uint8)
+    frame[0, 0] = (255, 0, 0)  # Синий в BGR
+    image = display.update(frame)
+    assert image.size == (3, 2) and image.getpixel((0, 0)) == (0, 0, 255, 255)
+    frame[0, 0] = (0, 0, 255)
+    assert display.update(frame) is image and image.getpixel((0, 0)) == (255, 0, 0, 255)
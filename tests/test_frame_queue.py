@@ -0,0 +1,35 @@
+from core.frame_queue import FrameQueue, DROP_OLDEST, BLOCK
+
+
+def test_frame_queue_drop_oldest():
+    q = FrameQueue(maxsize=2, policy=DROP_OLDEST)
+    for i in range(5):
+        assert q.put(i)
+    assert len(q) == 2
+    assert q.dropped == 3
+    assert q.get(timeout=0) == 3
+    assert q.get(timeout=0) == 4
+    assert q.get(timeout=0) is None
+
+
+def test_frame_queue_block_times_out_when_full():
+    q = FrameQueue(maxsize=1, policy=BLOCK)
+    assert q.put("a")
+    assert q.put("b", timeout=0.01) is False
+    assert q.get_latest(timeout=0) == "a"
+
+
+def test_frame_queue_close_wakes_consumer():
+    q = FrameQueue(maxsize=1)
+    q.close()
+    assert q.get(timeout=1) is None
+    assert q.put("a") is False
+
+
+def test_frame_queue_get_batch_collects_available_items():
+    q = FrameQueue(maxsize=8)
+    for i in range(3):
+        q.put(i)
+    assert q.get_batch(2, wait=0.0, timeout=0) == [0, 1]
+    assert q.get_batch(4, wait=0.01, timeout=0) == [2]
+    assert q.get_batch(4, wait=0.0, timeout=0) == []
@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import pytest
+from core.inference_pool import InferencePool
+from core.analyze import analyze_video
+
+
+class _PidModel:
+    """Модель-заглушка процесса: в детекции пишет среднюю яркость кадра и pid процесса."""
+    classes = {0: 'person'}
+
+    def predict(self, frame):
+        if frame.shape[0] == 13:
+            raise ValueError("плохой кадр")
+        return np.array([[frame.mean(), 0, frame.shape[1], frame.shape[0], 0.9, 0, os.getpid()]],
+                        dtype=np.float64)
+
+    @staticmethod
+    def extract_detections(result):
+        return result
+
+
+def _make_model():
+    return _PidModel()
+
+
+def _broken_model():
+    raise RuntimeError("нет весов")
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with InferencePool(workers=2, threads=1, slots=3, slot_bytes=640 * 480 * 3,
+                       model_factory=_make_model) as pool:
+        yield pool
+
+
+def test_results_come_back_in_submit_order(pool):
+    assert pool.classes == {0: 'person'}
+    ids = [pool.submit(np.full((120, 160, 3), i, dtype=np.uint8)) for i in range(3)]
+    collected = []
+    for i in range(3, 20):  # Слотов меньше, чем кадров: submit ждёт освобождения
+        collected.append(pool.get(timeout=10))
+        ids.append(pool.submit(np.full((120, 160, 3), i, dtype=np.uint8)))
+    while pool.pending():
+        collected.append(pool.get(timeout=10))
+    assert [frame_id for frame_id, _ in collected] == ids == list(range(ids[0], ids[0] + 20))
+    assert [int(dets[0, 0]) for _, dets in collected] == list(range(20))
+    assert {int(dets[0, 6]) for _, dets in collected} - {os.getpid()}  # Считали другие процессы
+
+
+def test_predict_batch_and_errors(pool):
+    frames = [np.full((60, 80, 3), 7, dtype=np.uint8), np.zeros((13, 10), dtype=np.uint8)]
+    with pytest.raises(RuntimeError, match="плохой кадр"):
+        pool.predict_batch(frames)
+    assert pool.predict(frames[0])[0, 2:4].tolist() == [80, 60]
+    with pytest.raises(ValueError):
+        pool.submit(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    assert pool.stats()['frames'] >= 3
+
+
+def test_pool_as_model_for_analyze(pool, video_file):
+    result = analyze_video(video_file, yolo=pool, batch_size=4)
+    assert result['frames'] == 60
+    assert len(result['detections']) == 60
+
+
+def test_worker_load_error_is_reported():
+    with pytest.raises(RuntimeError, match="нет весов"):
+        InferencePool(workers=1, slot_bytes=1024, model_factory=_broken_model, start_timeout=60)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from utils.intervals import PresenceIntervals, compute_intervals, intervals_from_log, log_to_arrays
+from utils.detection_log import DetectionLog
+from benchmarks.bench_intervals import legacy_intervals
+
+
+def _random_log(frames=3000, classes=('person', 'car', 'dog'), seed=0):
+    rng = np.random.default_rng(seed)
+    state = {c: False for c in classes}
+    log = []
+    for i in range(frames):
+        for c in classes:
+            if rng.random() < 0.03:
+                state[c] = not state[c]
+        log.append((i * 0.04, [c for c in classes if state[c] and rng.random() > 0.05]))
+    return log
+
+
+def _sorted(intervals):
+    return {k: sorted(v) for k, v in intervals.items()}
+
+
+def test_incremental_and_vectorized_match_legacy():
+    log = _random_log()
+    expected = _sorted(legacy_intervals(log))
+
+    incremental = PresenceIntervals()
+    for time_sec, labels in log:
+        incremental.update(time_sec, labels)
+    assert _sorted(incremental.finalize()) == expected
+    assert _sorted(intervals_from_log(log)) == expected
+
+
+def test_gap_tolerance_bridges_short_dropouts():
+    log = [(t * 0.5, ['person'] if t not in (4, 5) else []) for t in range(12)]
+    assert intervals_from_log(log, min_duration=0) == {'person': [(0.0, 1.5), (3.0, 5.5)]}
+    assert intervals_from_log(log, min_duration=0, gap_tolerance=1.0) == {'person': [(0.0, 5.5)]}
+
+    incremental = PresenceIntervals(gap_tolerance=1.0)
+    for time_sec, labels in log:
+        incremental.update(time_sec, labels)
+    assert incremental.finalize(min_duration=0) == {'person': [(0.0, 5.5)]}
+
+
+def test_presence_intervals_apply_report_gap_tolerance():
+    log = _random_log()
+    incremental = PresenceIntervals()
+    for time_sec, labels in log:
+        incremental.update(time_sec, labels)
+    for gap_tolerance in (0.04, 0.1, 0.5):
+        expected = _sorted(intervals_from_log(log, gap_tolerance=gap_tolerance))
+        assert expected != _sorted(intervals_from_log(log))
+        assert _sorted(intervals_from_log(incremental, gap_tolerance=gap_tolerance)) == expected
+
+
+def test_incremental_reports_open_intervals():
+    incremental = PresenceIntervals()
+    for i in range(60):
+        incremental.update(i * 0.1, ['car'])
+    assert incremental.intervals(min_duration=5.0) == {'car': [(0.0, pytest.approx(5.9))]}
+    assert incremental.intervals(min_duration=5.0, include_open=False) == {}
+
+
+def test_detection_log_vectorized_path_uses_track_labels():
+    log = DetectionLog(classes={0: 'person'})
+    for i in range(100):
+        dets = np.array([[0, 0, 1, 1, 0.9, 0, 1], [2, 2, 3, 3, 0.9, 0, 2]], dtype=np.float32)
+        log.append(i * 0.1, dets if i < 50 else dets[:1])
+    result = intervals_from_log(log, min_duration=1.0)
+    assert result == {'person #1': [(0.0, pytest.approx(9.9))], 'person #2': [(0.0, pytest.approx(4.9))]}
+
+
+def test_non_monotonic_log_falls_back_to_streaming():
+    log = [(5.0, ['a']), (6.0, ['a']), (1.0, ['a']), (2.0, ['a'])]
+    assert intervals_from_log(log, min_duration=0) == {'a': [(1.0, 2.0), (5.0, 6.0)]}
+
+
+def test_compute_intervals_empty():
+    keys, starts, ends = compute_intervals(np.arange(5.0), [], [])
+    assert len(keys) == len(starts) == len(ends) == 0
+
+
+def test_log_to_arrays():
+    times, frames, keys, labels = log_to_arrays([(0.0, ['a', 'b']), (1.0, ['b'])])
+    assert times.tolist() == [0.0, 1.0]
+    assert frames.tolist() == [0, 0, 1]
+    assert [labels[k] for k in keys] == ['a', 'b', 'b']
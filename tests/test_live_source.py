@@ -0,0 +1,134 @@
+import time
+import numpy as np
+from core.live_source import FRESHEST, SMOOTH, LiveSource, is_network_source
+from conftest import frame_number, make_clip
+
+
+def test_is_network_source():
+    assert is_network_source('rtsp://camera/stream')
+    assert is_network_source('http://host:8080/video.mjpg')
+    assert not is_network_source('video.mp4')
+    assert not is_network_source(0)
+
+
+def test_freshest_mode_skips_to_latest_frame(tmp_path):
+    clip = make_clip(tmp_path / 'clip.avi', frames=40, size=(64, 48), fps=100.0)
+    source = LiveSource(clip, mode=FRESHEST, pace=True, backoff_min=5.0)
+    try:
+        assert source.wait_connected(timeout=5)
+        time.sleep(0.2)  # Потребитель отстал: свежий кадр вытесняет прежние
+        ret, frame = source.read()
+        assert ret and frame_number(frame) > 5
+        stats = source.stats()
+        assert stats['frames_dropped'] > 0
+        assert stats['state'] == 'streaming'
+    finally:
+        source.release()
+    assert not source.isOpened()
+
+
+def test_smooth_mode_keeps_order_and_reconnects(tmp_path):
+    clip = make_clip(tmp_path / 'clip.avi', frames=10, size=(64, 48))
+    source = LiveSource(clip, mode=SMOOTH, buffer_size=16, backoff_min=0.01,
+                        failures_to_reconnect=1)
+    image = np.empty((48, 64, 3), dtype=np.uint8)
+    try:
+        assert source.wait_connected(timeout=5)
+        indexes = []
+        for _ in range(10):
+            ret, frame = source.read(image)
+            assert ret and frame is image
+            indexes.append(frame_number(frame))
+        assert indexes == list(range(10))
+        # Конец файла — обрыв потока: источник переподключается сам
+        deadline = time.monotonic() + 5
+        while source.reconnects == 0 and time.monotonic() < deadline:
+            source.read()
+        stats = source.stats()
+        assert stats['reconnects'] >= 1
+        assert stats['decode_errors'] >= 1
+        assert source.read()[0]
+    finally:
+        source.release()
+
+
+def test_gives_up_after_max_reconnects():
+    attempts = []
+
+    def factory(src):
+        attempts.append(src)
+        raise ConnectionError("нет связи")
+
+    source = LiveSource('rtsp://stand-in', capture_factory=factory, backoff_min=0.01,
+                        max_reconnects=2, read_timeout=0.1)
+    try:
+        deadline = time.monotonic() + 5
+        while source.isOpened() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not source.isOpened()
+        assert source.read() == (False, None)
+        stats = source.stats()
+        assert stats['state'] == 'failed'
+        assert stats['reconnect_attempts'] == 2 and len(attempts) == 3
+        assert 'нет связи' in stats['last_error']
+    finally:
+        source.release()
+
+
+def test_default_factory_passes_read_timeout(monkeypatch):
+    import core.live_source as live_source
+    calls = []
+
+    def fake_open(src, open_timeout, read_timeout):
+        calls.append((open_timeout, read_timeout))
+        raise ConnectionError("нет связи")
+
+    monkeypatch.setattr(live_source, 'open_capture', fake_open)
+    source = LiveSource('rtsp://stand-in', open_timeout=3.0, read_timeout=0.25,
+                        max_reconnects=0)
+    try:
+        deadline = time.monotonic() + 5
+        while source.isOpened() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert calls == [(3.0, 0.25)]
+    finally:
+        source.release()
+
+
+class _CountingCapture:
+    # Бесконечный источник: кадр n залит значением n % 256
+    def __init__(self):
+        self.n = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        time.sleep(0.001)
+        self.n += 1
+        if image is None or image.shape != (8, 8, 3):
+            image = np.empty((8, 8, 3), dtype=np.uint8)
+        image[:] = self.n % 256
+        return True, image
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        pass
+
+
+def test_grabbed_frame_is_not_overwritten_before_retrieve():
+    import cv2
+    source = LiveSource('rtsp://stand-in', mode=SMOOTH, buffer_size=2,
+                        capture_factory=lambda src: _CountingCapture())
+    try:
+        for _ in range(20):
+            assert source.grab()
+            time.sleep(0.02)  # Декодер тем временем проходит десятки кадров
+            ret, frame = source.retrieve()
+            assert ret
+            seq = int(source.get(cv2.CAP_PROP_POS_FRAMES))
+            assert np.all(frame == seq % 256)
+    finally:
+        source.release()
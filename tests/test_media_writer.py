@@ -0,0 +1,85 @@
+import os
+import time
+import cv2
+import numpy as np
+from core.media_writer import MediaWriter, RECORD_CONTINUOUS, RECORD_EVENTS
+
+
+def _writer(tmp_path, **kwargs):
+    return MediaWriter(output_dir=str(tmp_path), fourcc='MJPG', extension='.avi', fps=25, **kwargs)
+
+
+def _count_frames(path):
+    capture = cv2.VideoCapture(path)
+    count = 0
+    while capture.read()[0]:
+        count += 1
+    capture.release()
+    return count
+
+
+def _frame(value=0):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def test_snapshot_is_written_in_background(tmp_path):
+    writer = _writer(tmp_path)
+    frame = _frame(200)
+    path = writer.snapshot(frame, str(tmp_path / "snap.png"))
+    frame[:] = 0  # Изменение исходного буфера не должно попасть в снимок
+    writer.close()
+    assert writer.pop_completed() == [(path, True)]
+    assert cv2.imread(path).mean() == 200
+
+
+def test_continuous_recording_writes_all_frames(tmp_path):
+    writer = _writer(tmp_path)
+    writer.start_recording(RECORD_CONTINUOUS)
+    for i in range(20):
+        writer.write(_frame(i * 10), np.zeros((0, 6), dtype=np.float32))
+    writer.stop_recording()
+    writer.close()
+    assert len(writer.clips) == 1 and _count_frames(writer.clips[0]) == 20
+
+
+def test_event_clip_includes_pre_roll(tmp_path):
+    writer = _writer(tmp_path, pre_roll=10.0, post_roll=0.05)
+    writer.start_recording(RECORD_EVENTS)
+    empty = np.zeros((0, 6), dtype=np.float32)
+    for _ in range(5):
+        writer.write(_frame(), empty)  # Предзапись
+    writer.write(_frame(), np.array([[1, 1, 20, 20, 0.9, 0]], dtype=np.float32))
+    time.sleep(0.1)
+    writer.write(_frame(), empty)  # post_roll истёк — клип закрывается
+    writer.write(_frame(), empty)
+    writer.close()
+    assert len(writer.clips) == 1
+    assert _count_frames(writer.clips[0]) == 6
+    assert os.path.basename(writer.clips[0]).startswith('clip_')
+
+
+def test_event_clip_closes_without_further_frames(tmp_path):
+    writer = _writer(tmp_path, pre_roll=1.0, post_roll=0.1)
+    writer.start_recording(RECORD_EVENTS)
+    writer.write(_frame(), np.array([[1, 1, 20, 20, 0.9, 0]], dtype=np.float32))
+    assert writer.recording
+    # Кадров больше нет (поток остановлен) — клип закрывается по сроку
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and not writer.clips:
+        time.sleep(0.01)
+    assert len(writer.clips) == 1 and not writer.recording
+    assert _count_frames(writer.clips[0]) == 1
+    writer.close()
+
+
+def test_write_never_blocks_on_backpressure(tmp_path):
+    writer = _writer(tmp_path, queue_size=2)
+    writer.start_recording(RECORD_CONTINUOUS)
+    big = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    started = time.perf_counter()
+    for _ in range(50):
+        writer.write(big)
+    assert time.perf_counter() - started < 2.0
+    writer.close()
+    stats = writer.stats()
+    assert stats['frames_written'] + stats['frames_dropped'] == 50
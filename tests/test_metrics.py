@@ -0,0 +1,99 @@
+import csv
+import json
+import time
+import urllib.request
+import pytest
+from core.metrics import PipelineMetrics, RollingFps, LatencyHistogram, MetricsServer, dump_metrics
+from core.video_processor import VideoProcessor
+from conftest import StubModel
+
+
+def test_histogram_quantiles_and_batches():
+    hist = LatencyHistogram(window=100)
+    for ms in range(1, 101):
+        hist.observe(ms / 1000.0)
+    hist.observe(0.4, count=4)  # Пакет из 4 кадров: 100 мс на кадр
+    summary = hist.summary()
+    assert summary['count'] == 104
+    assert 45 <= summary['p50_ms'] <= 56
+    assert summary['p99_ms'] >= 98
+    assert summary['max_ms'] == pytest.approx(100.0)
+
+
+def test_rolling_fps_reflects_recent_window():
+    fps = RollingFps(window=1.0)
+    for i in range(11):
+        fps.tick(now=i * 0.1)
+    assert fps.value(now=1.0) == pytest.approx(10.0)
+    # Подвисание: новых кадров нет — окно пустеет и FPS падает
+    assert fps.value(now=5.0) == 0.0
+
+
+def test_processor_fps_decays_when_frames_stop(video_file):
+    vp = VideoProcessor(yolo=StubModel(), render=False)
+    vp._fps_meter = RollingFps(window=0.3)
+    assert vp.start_stream(video_file)
+    try:
+        for _ in range(10):
+            vp.process_frame()
+        assert vp.fps > 0
+        time.sleep(0.4)  # Кадров нет: FPS падает при чтении, без нового кадра
+        assert vp.fps == 0.0
+    finally:
+        vp.stop_stream()
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = PipelineMetrics(enabled=False)
+    with metrics.time('inference'):
+        pass
+    metrics.observe('decode', 0.1)
+    metrics.inc('dropped')
+    metrics.tick_frame()
+    snap = metrics.snapshot()
+    assert snap['stages'] == {} and snap['counters'] == {}
+
+
+def test_prometheus_text_and_http_endpoint():
+    metrics = PipelineMetrics()
+    metrics.observe('inference', 0.02)
+    metrics.inc('dropped', 3)
+    metrics.register_gauge('queue_depth', lambda: {'capture': 2})
+    text = metrics.to_prometheus()
+    assert 'visionedge_stage_latency_seconds{stage="inference",quantile="0.95"} 0.02' in text
+    assert 'visionedge_dropped_total 3' in text
+    assert 'visionedge_queue_depth_capture 2' in text
+
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as resp:
+            assert 'visionedge_fps' in resp.read().decode('utf-8')
+    finally:
+        server.stop()
+
+
+def test_dump_metrics_json_and_csv(tmp_path):
+    metrics = PipelineMetrics()
+    metrics.observe('decode', 0.005)
+    dump_metrics(metrics, str(tmp_path / 'm.jsonl'))
+    dump_metrics(metrics, str(tmp_path / 'm.jsonl'))
+    lines = (tmp_path / 'm.jsonl').read_text().splitlines()
+    assert len(lines) == 2 and 'decode' in json.loads(lines[0])['stages']
+
+    dump_metrics(metrics, str(tmp_path / 'm.csv'))
+    dump_metrics(metrics, str(tmp_path / 'm.csv'))
+    with open(tmp_path / 'm.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2 and float(rows[0]['stage_decode_p50_ms']) == pytest.approx(5.0)
+
+
+def test_video_processor_reports_stage_metrics(video_file):
+    vp = VideoProcessor(yolo=StubModel(), metrics=PipelineMetrics())
+    assert vp.start_stream(video_file)
+    for _ in range(5):
+        assert vp.process_frame() is not None
+    vp.stop_stream()
+    snap = vp.get_metrics()
+    assert {'decode', 'resize', 'inference', 'postprocess', 'render'} <= set(snap['stages'])
+    assert snap['counters']['frames'] == 5
+    assert snap['gauges']['queue_depth_capture'] == 0
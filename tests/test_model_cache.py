@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import threading
+import time
+import pytest
+import models.model_cache as model_cache
+from models.model_cache import ModelLoader, get_model, STATUS_READY, STATUS_FAILED
+
+
+class _SlowModel:
+    """Модель-заглушка: считает загрузки и имитирует долгое чтение весов."""
+    loads = 0
+
+    def __init__(self, model_path, backend='torch', threads=None):
+        if model_path == 'missing.pt':
+            raise RuntimeError("нет файла")
+        type(self).loads += 1
+        time.sleep(0.05)
+        self.classes = {0: 'person'}
+
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch):
+    _SlowModel.loads = 0
+    monkeypatch.setattr(model_cache, 'YOLOModel', _SlowModel)
+    model_cache.clear_cache()
+    yield
+    model_cache.clear_cache()
+
+
+def test_get_model_loads_weights_once():
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_model('a.pt'))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _SlowModel.loads == 1
+    assert all(m is results[0] for m in results)
+    assert get_model('a.pt') is results[0]
+    assert get_model('b.pt') is not results[0]
+
+
+def test_model_loader_reports_status():
+    loader = ModelLoader('a.pt').start()
+    assert loader.wait(timeout=5) is get_model('a.pt')
+    assert loader.status == STATUS_READY and loader.ready
+
+    failed = ModelLoader('missing.pt').start()
+    assert failed.wait(timeout=5) is None
+    assert failed.status == STATUS_FAILED
+    assert isinstance(failed.error, RuntimeError)
+
+
+def test_ui_import_does_not_load_torch():
+    code = ("import sys, ui.vision_ui, auth.login_window; "
+            "print('torch' in sys.modules or 'ultralytics' in sys.modules)")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
@@ -0,0 +1,25 @@
+import numpy as np
+from utils.overlay import OverlayRenderer
+
+
+def test_draw_does_not_modify_source_and_reuses_buffers():
+    renderer = OverlayRenderer({0: 'person'})
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    dets = np.array([[10, 20, 60, 80, 0.9, 0]], dtype=np.float32)
+
+    first = renderer.draw(frame, dets)
+    second = renderer.draw(frame, dets)
+    third = renderer.draw(frame, dets)
+
+    assert not frame.any()
+    assert first.any()
+    assert first is not second
+    assert third is first
+
+
+def test_draw_without_detections_returns_plain_copy():
+    renderer = OverlayRenderer()
+    frame = np.full((10, 10, 3), 7, dtype=np.uint8)
+    out = renderer.draw(frame, np.zeros((0, 6), dtype=np.float32))
+    assert out is not frame
+    assert np.array_equal(out, frame)
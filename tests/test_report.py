@@ -0,0 +1,78 @@
+from pathlib import Path
+import numpy as np
+import pytest
+import utils.report as report
+from utils.detection_log import DetectionLog
+from utils.intervals import PresenceIntervals
+from utils.report import generate_report, generate_session_reports, summarize
+
+
+def _log():
+    # Два человека с 5.5 по 19.5 с, машина — периодически весь журнал
+    return [(i * 0.5, (['person #1', 'person #2'] if 10 < i < 40 else [])
+             + (['car'] if i % 50 < 30 else [])) for i in range(400)]
+
+
+def test_summary_aggregates_and_timeline():
+    summary = summarize(_log(), min_duration=0, bins=40)
+    assert summary.classes == ['car', 'person']
+    assert summary.aggregates['person'] == {'count': 2, 'dwell': 28.0, 'peak': 2,
+                                            'first': 5.5, 'last': 19.5}
+    assert summary.aggregates['car']['count'] == 8
+    assert summary.aggregates['car']['dwell'] == 8 * 14.5
+    # Ячейки по ~5 с: ячейку 2 два человека покрывают целиком, соседние — частично
+    assert summary.timeline['person'][2] == pytest.approx(2.0)
+    assert 0 < summary.timeline['person'][1] < 2 and 0 < summary.timeline['person'][3] < 2
+    assert summary.timeline['person'][5:].max() == 0
+    labels = [label for label, _, _ in summary.iter_intervals()]
+    assert labels[:8] == ['car'] * 8 and set(labels[8:]) == {'person #1', 'person #2'}
+
+
+def test_peak_counts_detections_on_one_frame():
+    log = DetectionLog(classes={0: 'person'})
+    for i in range(20):
+        log.append(i * 0.5, np.array([[0, 0, 1, 1, 0.9, 0]] * (3 if i == 7 else 1)))
+    summary = summarize(log)
+    assert summary.aggregates['person']['peak'] == 3
+    assert summary.frames == 20
+
+
+def test_report_registers_font_once(tmp_path, monkeypatch):
+    created = []
+
+    class CountingFont(report.TTFont):
+        def __init__(self, *args, **kwargs):
+            created.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(report, 'TTFont', CountingFont)
+    presence = PresenceIntervals()
+    for time_sec, labels in _log():
+        presence.update(time_sec, labels)
+    for name in ('a.pdf', 'b.pdf'):
+        generate_report(presence, str(tmp_path / name))
+        assert (tmp_path / name).read_bytes().startswith(b'%PDF')
+    assert len(created) <= 1
+
+
+def test_session_reports_in_process_pool(tmp_path):
+    from core.detection_store import DetectionStore
+    db = str(tmp_path / "detections.db")
+    store = DetectionStore(db, classes={0: 'person'})
+    for _ in range(2):
+        session = store.start_session()
+        for i in range(50):
+            store.append(session, 'cam1', i * 0.2, np.array([[0, 0, 1, 1, 0.9, 0]]))
+        store.end_session(session)
+    store.close()
+    paths = generate_session_reports(db, str(tmp_path / "reports"), workers=2, details=False)
+    assert [Path(p).name for p in paths] == ['session_1.pdf', 'session_2.pdf']
+    for path in paths:
+        assert open(path, 'rb').read(4) == b'%PDF'
+
+
+def test_session_reports_need_existing_database(tmp_path):
+    db = tmp_path / "missing.db"
+    with pytest.raises(FileNotFoundError):
+        generate_session_reports(str(db), str(tmp_path / "reports"))
+    assert not db.exists()
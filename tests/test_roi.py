@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from core.roi import (Region, RegionDetector, OVERLAP_IOS, load_regions, nms, save_regions,
+                      tile_grid)
+from core.video_processor import VideoProcessor
+from utils.image import letterbox, project_boxes, scale_boxes
+from conftest import make_clip
+
+
+class _BrightSpotModel:
+    """Заглушка модели: рамка вокруг самого яркого пикселя кропа, если он ярче 200."""
+    classes = {0: 'spot'}
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, frames):
+        self.batches.append([f.shape for f in frames])
+        return [self.predict(f) for f in frames]
+
+    def predict(self, frame):
+        gray = frame.max(axis=2)
+        y, x = np.unravel_index(np.argmax(gray), gray.shape)
+        if gray[y, x] < 200:
+            return np.zeros((0, 6), dtype=np.float32)
+        return np.array([[x - 2, y - 2, x + 3, y + 3, 0.9, 0]], dtype=np.float32)
+
+    @staticmethod
+    def extract_detections(result):
+        return result
+
+
+def _frame_with_spot(x, y, shape=(1080, 1920)):
+    frame = np.zeros(shape + (3,), dtype=np.uint8)
+    frame[y, x] = 255
+    return frame
+
+
+def test_tile_grid_covers_region_with_equal_tiles():
+    tiles = tile_grid((0, 0, 1000, 500), 400, overlap=0.25)
+    assert all(x2 - x1 == 400 and y2 - y1 == 400 for x1, y1, x2, y2 in tiles)
+    assert max(t[2] for t in tiles) == 1000 and max(t[3] for t in tiles) == 500
+    assert tile_grid((10, 10, 100, 100), 640) == [(10, 10, 100, 100)]
+
+
+def test_nms_merges_same_class_only():
+    dets = np.array([[0, 0, 10, 10, 0.9, 0],
+                     [1, 1, 10, 10, 0.8, 0],
+                     [1, 1, 10, 10, 0.7, 1],
+                     [2, 2, 6, 6, 0.6, 0]], dtype=np.float32)
+    kept = nms(dets, 0.5)
+    assert kept[:, 4].tolist() == pytest.approx([0.9, 0.7, 0.6])
+    # IoS склеивает рамку, обрезанную краем тайла, с полной
+    assert len(nms(dets[[0, 3]], 0.5, OVERLAP_IOS)) == 1
+
+
+def test_polygon_region_contains_normalized_points():
+    region = Region(polygon=[[0, 0], [1, 0], [0, 1]], normalized=True)
+    points = np.array([[10, 10], [90, 90]], dtype=np.float32)
+    assert region.contains(points, (100, 100)).tolist() == [True, False]
+    assert region.bounds((100, 200)) == (0, 0, 200, 100)
+
+
+def test_region_detector_maps_boxes_to_full_frame_in_one_batch():
+    model = _BrightSpotModel()
+    detector = RegionDetector(model, [Region(rect=[1000, 500, 1800, 1000])], tile_size=320)
+    dets = detector.detect(_frame_with_spot(1500, 700))
+    assert len(model.batches) == 1 and len(model.batches[0]) > 1  # Тайлы одним пакетом
+    assert len(dets) == 1
+    assert dets[0, :4].tolist() == pytest.approx([1498, 698, 1503, 703])
+    # Объект вне области не ищется
+    assert len(detector.detect(_frame_with_spot(100, 100))) == 0
+
+
+def test_polygon_filter_drops_detections_outside_shape():
+    model = _BrightSpotModel()
+    triangle = Region(polygon=[[0, 0], [400, 0], [0, 400]])
+    detector = RegionDetector(model, [triangle])
+    assert len(detector.detect(_frame_with_spot(50, 50))) == 1
+    assert len(detector.detect(_frame_with_spot(350, 350))) == 0  # Внутри рамки, но вне треугольника
+
+
+def test_regions_config_roundtrip(tmp_path):
+    path = str(tmp_path / "rois.json")
+    save_regions({'cam.mp4': {'regions': [Region(rect=[0, 0, 10, 10], name='door')],
+                              'tile_size': 640}}, path)
+    loaded = load_regions(path)['cam.mp4']
+    assert loaded['tile_size'] == 640 and loaded['regions'][0].name == 'door'
+    assert load_regions(str(tmp_path / "missing.json")) == {}
+
+
+def test_letterbox_roundtrip_preserves_aspect():
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    boxed, scale, pad = letterbox(frame, (480, 640))
+    assert boxed.shape == (480, 640, 3) and pad == (0, 60)
+    boxes = np.array([[100.0, 200.0, 300.0, 400.0]])
+    restored = scale_boxes(project_boxes(boxes.copy(), scale, pad), scale, pad, (1080, 1920))
+    assert restored == pytest.approx(boxes)
+
+
+def test_video_processor_detects_in_regions_of_high_res_source(tmp_path):
+    def draw(i):
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        frame[396:405, 796:805] = 255
+        return frame
+    path = make_clip(tmp_path / "hd.avi", frames=3, size=(1280, 720), fps=10, draw=draw)
+
+    vp = VideoProcessor(yolo=_BrightSpotModel(), render=False)
+    vp.configure_regions([Region(rect=[640, 360, 1280, 720])], tile_size=320)
+    assert vp.start_stream(path)
+    frame = vp.process_frame()
+    vp.stop_stream()
+    assert frame.shape == (480, 640, 3)
+    # 720p вписывается в 640x480 с масштабом 0.5 и полями по 60 пикселей сверху и снизу
+    center = (vp.detections[0, :2] + vp.detections[0, 2:4]) / 2
+    assert center == pytest.approx([400, 260], abs=3)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from core.scheduler import InferenceScheduler, MotionGate, MOTION_DIFF, MOTION_MOG2
+
+
+def _frame(value=0, box=None):
+    frame = np.full((240, 320, 3), value, dtype=np.uint8)
+    if box is not None:
+        x, y = box
+        frame[y:y + 60, x:x + 60] = 255
+    return frame
+
+
+def test_every_nth_frame():
+    scheduler = InferenceScheduler(every_n=3)
+    decisions = [scheduler.should_infer(_frame()) for _ in range(7)]
+    assert decisions == [True, False, False, True, False, False, True]
+    assert scheduler.stats()['frames_inferred'] == 3
+    assert scheduler.stats()['frames_skipped'] == 4
+
+
+def test_motion_gate_skips_static_scene_and_fires_on_entry():
+    scheduler = InferenceScheduler(motion_gate=MotionGate(MOTION_DIFF), max_skip=100)
+    static = [scheduler.should_infer(_frame()) for _ in range(10)]
+    assert static[0] is True
+    assert not any(static[1:])
+    assert scheduler.should_infer(_frame(box=(100, 80))) is True
+
+
+def test_static_scene_refreshed_after_max_skip():
+    scheduler = InferenceScheduler(motion_gate=MotionGate(), max_skip=5)
+    decisions = [scheduler.should_infer(_frame()) for _ in range(11)]
+    assert [i for i, d in enumerate(decisions) if d] == [0, 5, 10]
+
+
+def test_reset_forces_next_inference():
+    scheduler = InferenceScheduler(every_n=10)
+    scheduler.should_infer(_frame())
+    assert scheduler.should_infer(_frame()) is False
+    scheduler.reset()
+    assert scheduler.should_infer(_frame()) is True
+
+
+def test_mog2_gate_runs():
+    gate = MotionGate(MOTION_MOG2)
+    for _ in range(5):
+        gate.check(_frame())
+    assert gate.check(_frame(box=(10, 10))) is True
+
+
+def test_unknown_motion_method():
+    with pytest.raises(ValueError):
+        MotionGate("optical_flow")
@@ -0,0 +1,112 @@
+import threading
+import time
+import cv2
+from core.seek import Debouncer, FrameCache, KeyframeIndex, seek_capture
+from core.video_processor import VideoProcessor
+from conftest import StubModel, frame_number, next_frame
+
+
+def test_keyframe_index_anchor_and_disk_cache(video_file, tmp_path):
+    index = KeyframeIndex([0, 12, 24], exact=True)
+    assert index.anchor(11) == 0 and index.anchor(12) == 12 and index.anchor(100) == 24
+
+    cache_dir = str(tmp_path / "cache")
+    built = KeyframeIndex.load(video_file, cache_dir=cache_dir, anchor_step=10)
+    assert built.frames[0] == 0
+    cached = KeyframeIndex.load(video_file, cache_dir=cache_dir, anchor_step=10)
+    assert cached.frames == built.frames and cached.exact == built.exact
+
+
+def test_seek_capture_is_frame_accurate(video_file):
+    capture = cv2.VideoCapture(video_file)
+    index = KeyframeIndex(list(range(0, 60, 10)), exact=False)
+    for target in (45, 3, 17, 16, 59, 0):
+        seek_capture(capture, target, index)
+        ret, frame = capture.read()
+        assert ret and frame_number(frame) == target
+    capture.release()
+
+
+def test_frame_cache_evicts_least_recently_used():
+    cache = FrameCache(capacity=2)
+    cache.put(1, {'frame': 1})
+    cache.put(2, {'frame': 2})
+    cache.get(1)
+    cache.put(3, {'frame': 3})
+    assert 1 in cache and 3 in cache and 2 not in cache
+
+
+def test_step_frame_back_and_forth_uses_cache(video_file):
+    model = StubModel()
+    vp = VideoProcessor(yolo=model, render=False)
+    assert vp.start_stream(video_file)
+    for _ in range(10):
+        vp.process_frame()
+    assert vp.current_position == 10
+    calls = model.calls
+    frame = vp.step_frame(-1)
+    assert vp.paused and vp.current_position == 9 and frame_number(frame) == 8
+    vp.step_frame(1)
+    assert vp.current_position == 10 and model.calls == calls  # Оба кадра из кэша
+
+    # Промах кэша: кадр декодируется, соседние кадры попадают в кэш
+    vp.frame_cache.clear()
+    vp.current_position = 40
+    assert frame_number(vp.step_frame(-1)) == 38
+    assert 38 in vp.frame_cache
+    assert frame_number(vp.step_frame(-1)) == 37
+
+    vp.resume()
+    assert not vp.paused
+    assert frame_number(vp.process_frame()) == 38
+    vp.stop_stream()
+
+
+def test_debouncer_fires_once_after_last_request():
+    pending = {}
+    calls = []
+
+    def schedule(delay, fn):
+        token = len(pending) + 1
+        pending[token] = fn
+        return token
+
+    debouncer = Debouncer(schedule, lambda token: pending.pop(token), 100, calls.append)
+    for value in (1, 2, 3):
+        debouncer.request(value)
+    assert len(pending) == 1
+    pending.popitem()[1]()
+    assert calls == [3] and not debouncer.pending
+
+
+class _ThreadRecordingModel(StubModel):
+    """Заглушка, запоминающая потоки прямых проходов."""
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def predict(self, frame):
+        self.threads.add(threading.current_thread().name)
+        return super().predict(frame)
+
+
+def test_seek_preview_on_pause_infers_in_pipeline(video_file):
+    model = _ThreadRecordingModel()
+    vp = VideoProcessor(pipeline=True, yolo=model, render=False)
+    assert vp.start_stream(video_file)
+    try:
+        assert next_frame(vp) is not None
+        vp.pause()
+        time.sleep(0.05)  # Кадры, бывшие в конвейере до паузы, успевают выйти
+        calls = model.calls
+        vp.seek_preview(30)
+        assert vp.current_position == 31
+        frame = next_frame(vp)
+        assert frame is not None and frame_number(frame) == 30
+        assert vp.paused and vp.current_position == 31
+        # На паузе конвейер обработал ровно один кадр, и не в вызывающем потоке
+        assert next_frame(vp, timeout=0.2) is None
+        assert model.calls == calls + 1
+        assert model.threads == {'ve-inference'}
+    finally:
+        vp.stop_stream()
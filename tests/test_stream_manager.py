@@ -0,0 +1,84 @@
+import time
+import pytest
+from core.stream_manager import StreamManager, ROUND_ROBIN, FRESHNESS, parse_source
+from conftest import StubModel
+
+
+def _counting_model():
+    return StubModel(detections=[[1, 1, 10, 10, 0.9, 0]])
+
+
+def test_parse_source():
+    assert parse_source("0") == 0
+    assert parse_source("rtsp://cam/1") == "rtsp://cam/1"
+
+
+@pytest.mark.parametrize("schedule", [ROUND_ROBIN, FRESHNESS])
+def test_same_file_opened_many_times_shares_one_model(video_file, schedule):
+    model = _counting_model()
+    manager = StreamManager(yolo=model, schedule=schedule, batch_size=3)
+    names = [manager.add_stream(video_file) for _ in range(3)]
+    manager.start()
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        if all(manager.get_stats()[n]['finished'] and manager.get_stats()[n]['queue_depth'] == 0
+               for n in names):
+            break
+        time.sleep(0.01)
+    manager.stop()
+
+    stats = manager.get_stats()
+    assert set(stats) == set(names)
+    for name in names:
+        assert stats[name]['frames_captured'] == 60
+        assert stats[name]['frames_processed'] >= 1
+        assert manager.get_latest(name)['detections'].shape == (1, 6)
+        assert manager.get_latest(name, render=True)['frame'].shape == (480, 640, 3)
+    assert max(model.batches) <= 3
+
+
+def test_unknown_schedule_rejected():
+    with pytest.raises(ValueError):
+        StreamManager(yolo=_counting_model(), schedule="random")
+
+
+def test_region_stream_maps_crop_detections_to_stream_frame(video_file):
+    from core.roi import Region
+    model = _counting_model()
+    manager = StreamManager(yolo=model, batch_size=2)
+    # Кадр 160x120 вписывается в 640x480 с масштабом 4; область — правая половина кадра
+    name = manager.add_stream(video_file, regions=[Region(rect=[80, 0, 160, 120])])
+    manager.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and manager.get_latest(name) is None:
+        time.sleep(0.01)
+    manager.stop()
+    packet = manager.get_latest(name)
+    assert 'source' not in packet
+    # Рамка [1, 1, 10, 10] кропа сдвигается на 80 пикселей и масштабируется
+    assert packet['detections'][0, :4].tolist() == pytest.approx([324, 4, 360, 40])
+
+
+def test_inference_errors_are_skipped_then_stop_all_streams(video_file):
+    class FailingModel(StubModel):
+        def predict_batch(self, frames):
+            if len(self.batches) < 2:
+                return super().predict_batch(frames)
+            self.batches.append(len(frames))
+            raise RuntimeError("сбой бэкенда")
+
+    model = FailingModel()
+    manager = StreamManager(yolo=model, batch_size=2, max_stage_errors=3)
+    names = [manager.add_stream(video_file, realtime=True) for _ in range(2)]
+    manager.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and not manager.errors.failed:
+        time.sleep(0.01)
+    try:
+        assert manager.errors.failed and 'сбой бэкенда' in manager.errors.last
+        assert len(model.batches) == 5  # Два удачных пакета и три сбоя подряд
+        assert not manager._inference_thread.is_alive()
+        stats = manager.get_stats()
+        assert sum(stats[name]['frames_processed'] for name in names) == sum(model.batches[:2])
+    finally:
+        manager.stop()
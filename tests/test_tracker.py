@@ -0,0 +1,56 @@
+import numpy as np
+from core.tracker import Tracker, iou_matrix
+
+
+def _det(x, y, conf=0.9, cls=0, size=40):
+    return [x, y, x + size, y + size, conf, cls]
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]], rtol=1e-6)
+
+
+def test_two_objects_of_same_class_keep_separate_ids():
+    tracker = Tracker()
+    ids = None
+    for step in range(10):
+        dets = np.array([_det(10 + step * 3, 10), _det(300 - step * 3, 200)], dtype=np.float32)
+        out = tracker.update(dets)
+        assert out.shape == (2, 7)
+        current = sorted(out[:, 6].astype(int))
+        ids = ids or current
+        assert current == ids
+    assert ids == [1, 2]
+
+
+def test_track_survives_missed_detection():
+    tracker = Tracker(max_age=5)
+    first = tracker.update(np.array([_det(100, 100)], dtype=np.float32))
+    tracker.update(None)
+    again = tracker.update(np.array([_det(102, 101)], dtype=np.float32))
+    assert int(again[0, 6]) == int(first[0, 6])
+
+
+def test_predict_propagates_with_velocity():
+    tracker = Tracker(alpha=1.0, beta=1.0)
+    tracker.update(np.array([_det(100, 100)], dtype=np.float32))
+    tracker.update(np.array([_det(110, 100)], dtype=np.float32))
+    predicted = tracker.predict()
+    assert predicted.shape == (1, 7)
+    assert predicted[0, 0] > 110
+
+
+def test_low_confidence_detection_does_not_spawn_track():
+    tracker = Tracker(high_conf=0.5, low_conf=0.1)
+    assert len(tracker.update(np.array([_det(0, 0, conf=0.3)], dtype=np.float32))) == 0
+    assert len(tracker) == 0
+
+
+def test_stale_tracks_are_removed():
+    tracker = Tracker(max_age=2)
+    tracker.update(np.array([_det(0, 0)], dtype=np.float32))
+    for _ in range(3):
+        tracker.predict()
+    assert len(tracker) == 0
@@ -1,5 +1,13 @@
+import threading
+import time
+import cv2
+import numpy as np
 import pytest
+from core.scheduler import InferenceScheduler
+from core.tracker import Tracker
+from core.frame_queue import BLOCK
 from core.video_processor import VideoProcessor
+from conftest import StubModel, next_frame
 
 def test_process_live_stream_positive():
     vp = VideoProcessor()
@@ -19,4 +27,160 @@ def test_process_live_stream_negative():
 def test_process_video_file_negative():
     vp = VideoProcessor()
     with pytest.raises(FileNotFoundError):
-        vp.process_video_file("invalid_path.mp4")
\ No newline at end of file
+        vp.process_video_file("invalid_path.mp4")
+
+
+class _RecordingTracker(Tracker):
+    """Трекер, запоминающий, из какого потока его сбрасывали."""
+    def reset(self):
+        self.reset_threads = getattr(self, 'reset_threads', []) + [threading.current_thread().name]
+        super().reset()
+
+
+class _RecordingScheduler(InferenceScheduler):
+    """Расписание, запоминающее, из какого потока его сбрасывали."""
+    reset_threads = ()
+
+    def reset(self):
+        self.reset_threads = self.reset_threads + (threading.current_thread().name,)
+        super().reset()
+
+
+def test_seek_while_pipeline_runs(video_file):
+    tracker = _RecordingTracker()
+    tracker.reset_threads = []
+    scheduler = _RecordingScheduler(every_n=3)
+    vp = VideoProcessor(pipeline=True, yolo=StubModel(), tracker=tracker, scheduler=scheduler,
+                        render=False)
+    assert vp.start_stream(video_file)
+    try:
+        for target in [40, 5, 30, 10, 50] * 10:
+            vp.seek(target)
+            assert next_frame(vp) is not None
+            # Кадры, захваченные до перемотки, не показываются
+            assert vp.current_position > target
+        assert all(thread.is_alive() for thread in vp._threads)
+        assert tracker.reset_threads and set(tracker.reset_threads) == {'ve-postprocess'}
+        assert scheduler.reset_threads and set(scheduler.reset_threads) == {'ve-inference'}
+    finally:
+        vp.stop_stream()
+
+
+class _FlakyModel(StubModel):
+    """Модель, падающая на каждом fail_every-м прямом проходе (или всегда)."""
+    def __init__(self, fail_every=None):
+        super().__init__()
+        self.fail_every = fail_every
+
+    def predict(self, frame):
+        self.calls += 1
+        if self.fail_every is None or self.calls % self.fail_every == 0:
+            raise RuntimeError("сбой бэкенда")
+        return self.detections.copy()
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not predicate():
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_pipeline_processes_clip_end_to_end(video_file):
+    vp = VideoProcessor(pipeline=True, drop_policy=BLOCK, yolo=StubModel(), tracker=Tracker(),
+                        scheduler=InferenceScheduler(every_n=2))
+    assert vp.start_stream(video_file)
+    try:
+        # С блокирующими очередями через три стадии проходит каждый кадр файла
+        assert _wait(lambda: vp.frame_count == 60)
+        assert next_frame(vp).shape == (480, 640, 3)
+        assert vp.detections.shape == (1, 7) and vp.get_detections_info()[0]['label'] == 'person #1'
+        assert vp.get_inference_stats()['frames_inferred'] == 30
+        assert vp.errors.count == 0
+    finally:
+        vp.stop_stream()
+    assert not any(thread.is_alive() for thread in vp._threads)
+
+
+def test_pipeline_skips_failed_frames_and_stops_on_error_streak(video_file):
+    vp = VideoProcessor(pipeline=True, drop_policy=BLOCK, yolo=_FlakyModel(fail_every=7))
+    assert vp.start_stream(video_file)
+    try:
+        assert _wait(lambda: vp.frame_count == 60 - 60 // 7)
+        assert vp.errors.count == 60 // 7 and not vp.errors.failed
+        assert all(thread.is_alive() for thread in vp._threads)
+    finally:
+        vp.stop_stream()
+
+    vp = VideoProcessor(pipeline=True, yolo=_FlakyModel(), max_stage_errors=3)
+    assert vp.start_stream(video_file)
+    try:
+        assert _wait(lambda: vp.errors.failed)
+        assert 'сбой бэкенда' in vp.errors.last and vp.frame_count == 0
+        threads = list(vp._threads)
+        assert _wait(lambda: not any(thread.is_alive() for thread in threads))
+    finally:
+        vp.stop_stream()
+
+
+class _SilentCapture:
+    # Сетевой поток, который открывается, но не отдаёт кадров
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        time.sleep(0.05)
+        return False, None
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        pass
+
+
+def test_live_read_does_not_hold_capture_lock(monkeypatch):
+    import core.live_source as live_source
+    monkeypatch.setattr(live_source, 'open_capture', lambda src, *args: _SilentCapture())
+    vp = VideoProcessor(pipeline=True, yolo=StubModel())
+    assert vp.start_stream('rtsp://stand-in')
+    try:
+        time.sleep(0.2)  # Стадия захвата ждёт кадра в LiveSource.read до read_timeout
+        for _ in range(5):
+            start = time.monotonic()
+            with vp.capture_lock:
+                pass
+            assert time.monotonic() - start < 0.2
+            time.sleep(0.05)
+    finally:
+        vp.stop_stream()
+
+
+class _SlowCamera(_SilentCapture):
+    # Поток с FPS 30, который долго подключается и отдаёт тёмные кадры
+    def read(self, image=None):
+        time.sleep(0.01)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def get(self, prop):
+        return 30.0 if prop == cv2.CAP_PROP_FPS else 0.0
+
+
+def test_start_live_stream_does_not_wait_for_connection(monkeypatch):
+    import core.live_source as live_source
+
+    def slow_open(src, *args):
+        time.sleep(1.0)
+        return _SlowCamera()
+
+    monkeypatch.setattr(live_source, 'open_capture', slow_open)
+    vp = VideoProcessor(pipeline=True, yolo=StubModel())
+    start = time.monotonic()
+    assert vp.start_stream('rtsp://stand-in')
+    try:
+        assert time.monotonic() - start < 0.5
+        assert vp.get_source_health()['state'] == live_source.STATE_CONNECTING
+        assert next_frame(vp) is not None
+        assert vp.source_fps == 30.0
+    finally:
+        vp.stop_stream()
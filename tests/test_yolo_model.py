@@ -19,4 +19,50 @@ def test_detect_objects_negative():
 def test_train_model_negative():
     model = YOLOModel()
     with pytest.raises(Exception):
-        model.train_model("/empty/folder")
\ No newline at end of file
+        model.train_model("/empty/folder")
+
+def test_detect_batch_matches_single_frame_layout():
+    import numpy as np
+    model = YOLOModel()
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(3)]
+    batch = model.detect_batch(frames)
+    assert len(batch) == 3
+    for dets, frame in zip(batch, frames):
+        single = model.detect(frame)['detections']
+        assert dets.shape[1:] == single.shape[1:] == (6,)
+
+def test_onnx_backend_matches_torch():
+    import os
+    import numpy as np
+    pytest.importorskip("onnxruntime")
+    if not os.path.exists("models/best.onnx"):
+        pytest.skip("нет экспортированной модели models/best.onnx")
+    from models.yolo_model import BACKEND_ONNX
+    torch_model = YOLOModel(warmup=0)
+    onnx_model = YOLOModel(backend=BACKEND_ONNX, warmup=0)
+    rng = np.random.default_rng(0)
+    # Квадратный кадр: letterbox обоих путей совпадает без полей
+    frame = (rng.random((640, 640, 3)) * 255).astype(np.uint8)
+    expected = torch_model.detect(frame, render=False)['detections']
+    actual = onnx_model.detect(frame, render=False)['detections']
+    _assert_same_detections(actual, expected)
+
+    # Неквадратные кадры: ultralytics вписывает их в вход .pt без полей до
+    # квадрата, поэтому эталон — ultralytics на том же ONNX-файле
+    from ultralytics import YOLO
+    reference = YOLO("models/best.onnx", task="detect")
+    for shape in ((480, 640, 3), (720, 1280, 3), (640, 360, 3)):
+        frame = (rng.random(shape) * 255).astype(np.uint8)
+        expected = reference(frame, verbose=False, device="cpu")[0].boxes.data.cpu().numpy()
+        actual = onnx_model.detect(frame, render=False)['detections']
+        _assert_same_detections(actual, expected)
+        assert onnx_model.detect(frame)['frame'].shape == shape
+
+
+def _assert_same_detections(actual, expected):
+    import numpy as np
+    assert actual.shape == expected.shape
+    if len(expected):
+        np.testing.assert_allclose(actual[:, :4], expected[:, :4], atol=2.0)
+        np.testing.assert_allclose(actual[:, 4], expected[:, 4], atol=1e-2)
+        np.testing.assert_array_equal(actual[:, 5], expected[:, 5])
@@ -1,17 +1,23 @@
 # ui/admin_ui.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from auth.auth import hash_password, init_db, DB_PATH
+from tkinter import ttk, messagebox, filedialog
+from auth.auth import create_user, bulk_import_users, read_users_csv, count_users, list_users
 import sqlite3
 
+PAGE_SIZE = 200  # Строк списка пользователей на странице
+
+
 class AdminUI(tk.Toplevel):
     """
     Окно админ-панели для создания и просмотра пользователей.
+    Список показывается постранично (по PAGE_SIZE строк, переход по ключу
+    id), поэтому окно не зависит от числа учётных записей; новый
+    пользователь добавляется в список одной строкой без перечитывания.
     """
     def __init__(self, master=None):
         super().__init__(master)
         self.title("Админ-панель")
-        self.geometry("400x300")
+        self.geometry("400x420")
         self.resizable(False, False)
 
         # Форма создания пользователя
@@ -29,53 +35,110 @@ class AdminUI(tk.Toplevel):
         self.is_admin_var = tk.BooleanVar()
         ttk.Checkbutton(frm, text="Админ", variable=self.is_admin_var).grid(row=2, column=0, columnspan=2, pady=(5,0))
 
-        ttk.Button(frm, text="Добавить", command=self.add_user).grid(row=3, column=0, columnspan=2, pady=10)
+        ttk.Button(frm, text="Добавить", command=self.add_user).grid(row=3, column=0, pady=10)
+        ttk.Button(frm, text="Импорт CSV…", command=self.import_users).grid(row=3, column=1, pady=10)
         frm.columnconfigure(1, weight=1)
 
+        # Поиск по началу логина
+        search = ttk.Frame(self)
+        search.pack(fill=tk.X, padx=10)
+        ttk.Label(search, text="Поиск:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.bind("<Return>", lambda e: self.refresh_users())
+
         # Список пользователей
         self.tree = ttk.Treeview(self, columns=("username", "is_admin"), show="headings")
         self.tree.heading("username", text="Логин")
         self.tree.heading("is_admin", text="Админ")
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0,10))
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        self.refresh_users()
+        # Постраничная навигация
+        nav = ttk.Frame(self)
+        nav.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self.prev_button = ttk.Button(nav, text="◀", width=3, command=self.prev_page)
+        self.prev_button.pack(side=tk.LEFT)
+        self.next_button = ttk.Button(nav, text="▶", width=3, command=self.next_page)
+        self.next_button.pack(side=tk.LEFT, padx=5)
+        self.page_var = tk.StringVar()
+        ttk.Label(nav, textvariable=self.page_var).pack(side=tk.LEFT, padx=5)
 
-    def get_connection(self):
-        return sqlite3.connect(DB_PATH)
+        self._page_starts = [0]  # after_id начала каждой открытой страницы
+        self._last_id = 0  # id последней строки текущей страницы
+        self._total = 0
+        self.refresh_users()
 
     def refresh_users(self):
-        # Очищаем и заполняем список
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT username, is_admin FROM users ORDER BY id ASC")
-        for username, is_admin in cur.fetchall():
-            self.tree.insert('', tk.END, values=(username, bool(is_admin)))
-        conn.close()
+        # Перечитывает счётчик и открывает первую страницу
+        self._total = count_users(self.search_var.get().strip())
+        self._page_starts = [0]
+        self.load_page()
+
+    def load_page(self):
+        # Показывает одну страницу, начиная после id self._page_starts[-1]
+        rows = list_users(self._page_starts[-1], PAGE_SIZE + 1, self.search_var.get().strip())
+        has_next = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+        self.tree.delete(*self.tree.get_children())
+        for user in rows:
+            self.tree.insert('', tk.END, iid=str(user['id']), values=(user['username'], user['is_admin']))
+        self._last_id = rows[-1]['id'] if rows else self._page_starts[-1]
+        self.prev_button.config(state=tk.NORMAL if len(self._page_starts) > 1 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if has_next else tk.DISABLED)
+        self.update_page_label()
+
+    def update_page_label(self):
+        first = (len(self._page_starts) - 1) * PAGE_SIZE
+        shown = len(self.tree.get_children())
+        self.page_var.set(f"{first + 1 if shown else 0}–{first + shown} из {self._total}")
+
+    def next_page(self):
+        self._page_starts.append(self._last_id)
+        self.load_page()
+
+    def prev_page(self):
+        if len(self._page_starts) > 1:
+            self._page_starts.pop()
+            self.load_page()
 
     def add_user(self):
         username = self.login_entry.get().strip()
         password = self.pass_entry.get().strip()
-        is_admin = int(self.is_admin_var.get())
+        is_admin = self.is_admin_var.get()
         if not username or not password:
             messagebox.showwarning("Ошибка", "Введите логин и пароль")
             return
-        hashed = hash_password(password)
-        conn = self.get_connection()
-        cur = conn.cursor()
         try:
-            cur.execute(
-                "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
-                (username, hashed, is_admin)
-            )
-            conn.commit()
-            messagebox.showinfo("Успех", f"Пользователь '{username}' создан")
-            self.login_entry.delete(0, tk.END)
-            self.pass_entry.delete(0, tk.END)
-            self.is_admin_var.set(False)
-            self.refresh_users()
+            user_id = create_user(username, password, is_admin)
         except sqlite3.IntegrityError:
             messagebox.showerror("Ошибка", "Такой логин уже существует")
-        finally:
-            conn.close()
+            return
+        messagebox.showinfo("Успех", f"Пользователь '{username}' создан")
+        self.login_entry.delete(0, tk.END)
+        self.pass_entry.delete(0, tk.END)
+        self.is_admin_var.set(False)
+        # Новый id больше всех существующих: строка нужна, только если
+        # открыта последняя страница и в ней есть место
+        if username.startswith(self.search_var.get().strip()):
+            self._total += 1
+            if str(self.next_button['state']) == tk.DISABLED:
+                if len(self.tree.get_children()) < PAGE_SIZE:
+                    self.tree.insert('', tk.END, iid=str(user_id), values=(username, is_admin))
+                    self._last_id = user_id
+                else:
+                    self.next_button.config(state=tk.NORMAL)
+            self.update_page_label()
+
+    def import_users(self):
+        # Массовое создание операторов из CSV: логин,пароль[,is_admin]
+        path = filedialog.askopenfilename(parent=self, filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        try:
+            created, skipped = bulk_import_users(read_users_csv(path))
+        except (OSError, UnicodeDecodeError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Не удалось импортировать пользователей: {e}")
+            return
+        messagebox.showinfo("Импорт", f"Создано: {created}, пропущено: {skipped}")
+        self.refresh_users()
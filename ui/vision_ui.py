@@ -1,31 +1,72 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import cv2
 import time
 from core.video_processor import VideoProcessor
+from core.scheduler import InferenceScheduler, MotionGate
+from core.tracker import Tracker
+from core.metrics import PipelineMetrics
+from core.seek import Debouncer
+from core.roi import load_regions
+from core.media_writer import MediaWriter, RECORD_CONTINUOUS, RECORD_EVENTS
+from core.live_source import (STATE_CLOSED, STATE_CONNECTING, STATE_FAILED, STATE_RECONNECTING,
+                              STATE_STREAMING, is_network_source)
 from ui.admin_ui import AdminUI
+from models.model_cache import ModelLoader, STATUS_LOADING, STATUS_READY
 from utils.report import generate_report
+from utils.detection_log import DetectionLog
+from core.detection_store import DetectionStore
+from utils.frame_pool import DisplayBuffer
+
+# Подписи состояний сетевого источника
+SOURCE_STATES = {
+    STATE_CONNECTING: "подключение...",
+    STATE_STREAMING: "идёт приём",
+    STATE_RECONNECTING: "переподключение...",
+    STATE_FAILED: "недоступен",
+}
+
+
 class VisionEdgeUI(tk.Tk):
     def __init__(self,user=None):
         super().__init__()
         self.user = user
         self.title(f"VisionEdge — {self.user['username']}")
         self.geometry("1920x1080")
-        self.detection_log = []
-
-        self.video_processor = VideoProcessor()
+        # Модель грузится в фоне: окно появляется сразу, а обработчик видео
+        # и журнал создаются, когда веса готовы (см. poll_model_loader)
+        self.video_processor = None
+        self.detection_log = None
+        self.detection_store = None
+        self.session_id = None  # Сессия базы детекций текущего запуска потока
+        self.session_source = None
+        self.media_writer = None
         self.setup_ui()  # Инициализация интерфейса
+        self.model_loader = ModelLoader().start()  # Повторно открытое окно берёт модель из кэша
+        self.poll_model_loader()
 
         # Метка для отображения видео
         self.video_label = tk.Label(self)
         self.video_label.pack(side=tk.RIGHT, padx=10, pady=10)
+        # Одно изображение Tk на всё время работы: кадры копируются в него через
+        # paste() из постоянного RGBA-буфера, новые объекты на кадр не создаются
+        self._display = DisplayBuffer()
+        self._photo = None
+        self._preview_buffer = None
 
         # Слайдер перемотки видео
         self.seek_var = tk.DoubleVar()
         self.seek_slider = ttk.Scale(self, from_=0, to=100, orient="horizontal",
                                      variable=self.seek_var, command=self.on_seek)
         self.seek_slider.pack(side=tk.RIGHT, fill=tk.X, padx=10, pady=5)
+        # Во время перетаскивания показывается быстрый предпросмотр по опорным
+        # кадрам, а точная перемотка выполняется после паузы в движении слайдера
+        self._scrubbing = False
+        self.preview_debouncer = Debouncer(self.after, self.after_cancel, 30, self.show_preview)
+        self.seek_debouncer = Debouncer(self.after, self.after_cancel, 200, self.seek_to)
+        self.seek_slider.bind("<ButtonPress-1>", self.on_scrub_start)
+        self.seek_slider.bind("<ButtonRelease-1>", self.on_scrub_end)
 
         # Метка с временем
         self.time_label = ttk.Label(self, text="00:00 / 00:00")
@@ -34,6 +75,37 @@ class VisionEdgeUI(tk.Tk):
 
         self.update_video()  # Запуск обновления видео
 
+    def poll_model_loader(self):
+        # Опрос фоновой загрузки модели из главного потока Tk
+        loader = self.model_loader
+        if loader.status == STATUS_LOADING:
+            dots = "." * (int(time.time() * 2) % 3 + 1)
+            self.model_status_var.set(f"Модель: загрузка{dots}")
+            self.after(200, self.poll_model_loader)
+        elif loader.status == STATUS_READY:
+            self.on_model_ready(loader.model)
+        else:
+            self.model_status_var.set("Модель: ошибка загрузки")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить модель: {loader.error}")
+
+    def on_model_ready(self, model):
+        # Конвейерный режим: захват и инференс идут вне главного потока Tk.
+        # Детекция запускается только при движении в кадре, иначе раз в 30 кадров;
+        # между детекциями рамки продвигает трекер, он же даёт объектам устойчивые ID
+        # Снимки и клипы пишутся в фоне, обработка кадров диск не ждёт
+        self.media_writer = MediaWriter(classes=model.classes)
+        self.video_processor = VideoProcessor(
+            pipeline=True, yolo=model,
+            scheduler=InferenceScheduler(motion_gate=MotionGate(), max_skip=30), tracker=Tracker(),
+            metrics=PipelineMetrics(), media_writer=self.media_writer)
+        # Колоночный журнал детекций: старые блоки выгружаются на диск
+        self.detection_log = DetectionLog(classes=model.classes)
+        # Детекции сохраняются в data/detections.db фоновыми пакетными транзакциями;
+        # поток Tk не ждёт диск: при полной очереди кадр отбрасывается и учитывается
+        self.detection_store = DetectionStore(classes=model.classes, block=False)
+        self.model_status_var.set("Модель: готова")
+        self.start_button.config(state="normal")
+
     def format_time(self, seconds: float) -> str:
         # Форматирование времени в mm:ss
         minutes = int(seconds) // 60
@@ -41,12 +113,61 @@ class VisionEdgeUI(tk.Tk):
         return f"{minutes:02}:{sec:02}"
 
     def on_seek(self, value):
-        # Перемотка видео к заданной позиции
-        cap = self.video_processor.capture
-        if cap is not None and cap.get(cv2.CAP_PROP_FPS):
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            seek_frame = int(float(value) / 100 * frame_count)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, seek_frame)
+        # Перемотка видео к заданной позиции: события слайдера сглаживаются,
+        # чтобы декодер не перематывался на каждое движение мыши
+        vp = self.video_processor
+        if vp is not None and vp.capture is not None and vp.source_fps:
+            seek_frame = int(float(value) / 100 * vp.total_frames)
+            if self._scrubbing:
+                self.preview_debouncer.request(seek_frame)
+            self.seek_debouncer.request(seek_frame)
+
+    def on_scrub_start(self, event):
+        self._scrubbing = True
+
+    def on_scrub_end(self, event):
+        # Слайдер отпущен — точная перемотка сразу, без ожидания
+        self._scrubbing = False
+        self.preview_debouncer.flush()
+        self.seek_debouncer.flush()
+
+    def seek_to(self, frame_index):
+        # Перемотка без инференса в потоке Tk: сразу показывается кадр из кэша
+        # или опорный кадр, точный кадр с рамками приносит конвейер (и на паузе)
+        vp = self.video_processor
+        if vp is None or vp.capture is None:
+            return
+        self.show_scaled(vp.seek_preview(frame_index))
+
+    def show_preview(self, frame_index):
+        self.show_scaled(self.video_processor.preview(frame_index))
+
+    def show_scaled(self, frame):
+        # Кадр другого размера (уменьшенный опорный) растягивается до размера видео
+        if frame is None:
+            return
+        if frame.shape[:2] != (480, 640):
+            self._preview_buffer = cv2.resize(frame, (640, 480), dst=self._preview_buffer,
+                                              interpolation=cv2.INTER_NEAREST)
+            frame = self._preview_buffer
+        self.show_frame(frame)
+
+    def toggle_pause(self):
+        vp = self.video_processor
+        if vp is None or vp.capture is None:
+            return
+        if vp.paused:
+            vp.resume()
+        else:
+            vp.pause()
+
+    def step(self, delta):
+        # Покадровый шаг (ставит воспроизведение на паузу)
+        if self.video_processor is not None:
+            frame = self.video_processor.step_frame(delta)
+            if frame is not None:
+                self.show_frame(frame)
+                self.update_info()
 
     def select_video_file(self):
         # Выбор файла видео через диалог
@@ -63,14 +184,35 @@ class VisionEdgeUI(tk.Tk):
         # Операции: старт, стоп, снимок
         operations_frame = ttk.LabelFrame(control_frame, text="Операции", padding=10)
         operations_frame.pack(fill=tk.X, pady=5)
-        ttk.Button(operations_frame, text="Старт", command=self.start_stream).pack(fill=tk.X)
+        # Старт доступен только после загрузки модели
+        self.start_button = ttk.Button(operations_frame, text="Старт", command=self.start_stream,
+                                       state="disabled")
+        self.start_button.pack(fill=tk.X)
         ttk.Button(operations_frame, text="Стоп", command=self.stop_stream).pack(fill=tk.X)
+        ttk.Button(operations_frame, text="Пауза / Продолжить", command=self.toggle_pause).pack(fill=tk.X)
+        step_frame = ttk.Frame(operations_frame)
+        step_frame.pack(fill=tk.X)
+        ttk.Button(step_frame, text="◀ Кадр", command=lambda: self.step(-1)).pack(
+            side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(step_frame, text="Кадр ▶", command=lambda: self.step(1)).pack(
+            side=tk.LEFT, expand=True, fill=tk.X)
         ttk.Button(operations_frame, text="Снимок", command=self.take_snapshot).pack(fill=tk.X)
+        self.record_button = ttk.Button(operations_frame, text="Запись",
+                                        command=lambda: self.toggle_recording(RECORD_CONTINUOUS))
+        self.record_button.pack(fill=tk.X)
+        self.event_record_button = ttk.Button(operations_frame, text="Запись по событию",
+                                              command=lambda: self.toggle_recording(RECORD_EVENTS))
+        self.event_record_button.pack(fill=tk.X)
         ttk.Button(operations_frame, text="Отчет", command=self.create_report).pack(fill=tk.X)
 
         # Информация о детекциях
         info_frame = ttk.LabelFrame(control_frame, text="Информация", padding=10)
         info_frame.pack(fill=tk.X, pady=5)
+        self.model_status_var = tk.StringVar(value="Модель: загрузка...")
+        ttk.Label(info_frame, textvariable=self.model_status_var).pack(anchor=tk.W)
+        # Состояние сетевого источника: подключение идёт в фоне, окно не ждёт его
+        self.source_status_var = tk.StringVar(value="")
+        ttk.Label(info_frame, textvariable=self.source_status_var).pack(anchor=tk.W)
         self.info_text = tk.Text(info_frame, height=10, width=30)
         self.info_text.pack()
 
@@ -90,85 +232,176 @@ class VisionEdgeUI(tk.Tk):
     def create_report(self):
         filename = filedialog.asksaveasfilename(defaultextension=".pdf",
                         filetypes=[("PDF files", "*.pdf")])
-        if not filename:
+        if not filename or self.detection_log is None:
             return
+        # Интервалы считаются векторизованно по колонкам журнала
         generate_report(self.detection_log, filename)
         messagebox.showinfo("Успех", f"Отчет сохранен: {filename}")
 
     def start_stream(self):
         # Запуск видеопотока
+        if self.video_processor is None:
+            return
         source = self.source_var.get()
+        # Области интереса и тайлинг источника из data/rois.json (если заданы)
+        roi = load_regions().get(source, {})
+        self.video_processor.configure_regions(roi.get('regions'), roi.get('tile_size'),
+                                               roi.get('overlap', 0.2))
         if source.isdigit():
             source = int(source)
 
         if self.video_processor.start_stream(source):
+            self.end_session()
+            self.session_id = self.detection_store.start_session(user=self.user['username'],
+                                                                 note=str(source))
+            self.session_source = source
             # Включить перемотку, если это видеофайл
             if isinstance(source, str) and not source.startswith("rtsp") and not source.startswith("http"):
                 self.seek_slider.config(state="normal")
-                total_frames = int(self.video_processor.capture.get(cv2.CAP_PROP_FRAME_COUNT))
-                if total_frames > 0:
+                if self.video_processor.total_frames > 0:
                     self.seek_slider.config(to=100)
             else:
                 self.seek_slider.config(state="disabled")
+            if is_network_source(source):
+                return  # Ход подключения показывает update_source_status
             messagebox.showinfo("Информация", "Видеопоток успешно запущен")
         else:
             messagebox.showerror("Ошибка", "Не удалось запустить видеопоток")
 
     def stop_stream(self):
         # Остановка видеопотока
-        self.video_processor.stop_stream()
+        if self.video_processor is not None:
+            self.video_processor.stop_stream()
+        self.end_session()
+
+    def end_session(self):
+        # Закрытие сессии базы детекций (дописывает очередь записи)
+        if self.session_id is not None:
+            self.detection_store.end_session(self.session_id)
+            self.session_id = None
 
     def take_snapshot(self):
         # Сохранение текущего кадра
-        if self.video_processor.current_frame is not None:
+        # Кадр ставится в очередь фоновой записи; current_frame уже в BGR,
+        # как и ждёт cv2.imwrite. Сообщение покажет poll_media_writer
+        if self.video_processor is not None and self.video_processor.current_frame is not None:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"snapshot_{timestamp}.jpg"
-            cv2.imwrite(filename, cv2.cvtColor(self.video_processor.current_frame, cv2.COLOR_RGB2BGR))
-            messagebox.showinfo("Информация", f"Снимок сохранен как {filename}")
+            self.media_writer.snapshot(self.video_processor.current_frame, filename)
+
+    def toggle_recording(self, mode):
+        # Включение и выключение записи клипов
+        writer = self.media_writer
+        if writer is None:
+            return
+        if writer.mode == mode:
+            writer.stop_recording()
+        else:
+            writer.start_recording(mode)
+        self.record_button.config(text="Остановить запись" if writer.mode == RECORD_CONTINUOUS else "Запись")
+        self.event_record_button.config(
+            text="Остановить запись по событию" if writer.mode == RECORD_EVENTS else "Запись по событию")
+
+    def poll_media_writer(self):
+        # Сообщения о снимках, записанных фоновым потоком
+        if self.media_writer is None:
+            return
+        for filename, ok in self.media_writer.pop_completed():
+            if ok:
+                messagebox.showinfo("Информация", f"Снимок сохранен как {filename}")
+            else:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить снимок {filename}")
 
     def update_video(self):
         # Обновление кадра в интерфейсе
-        frame = self.video_processor.process_frame()
+        if self.video_processor is None:
+            self.after(10, self.update_video)
+            return
+        self.poll_media_writer()
+        frame = self.video_processor.process_frame() if not self._scrubbing else None
         if frame is not None:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
+            self.show_frame(frame)
             self.update_info()
+        vp = self.video_processor
+        self.update_source_status()
+        if vp.errors.failed and vp.is_running:
+            # Конвейер остановился из-за серии сбоев: сообщаем один раз и закрываем поток
+            reason = vp.errors.last
+            self.stop_stream()
+            messagebox.showerror("Ошибка", f"Обработка видео остановлена: {reason}")
 
-        # Обновление положения слайдера и времени
-        cap = self.video_processor.capture
-        if cap is not None and self.seek_slider["state"] == "normal":
-            pos = cap.get(cv2.CAP_PROP_POS_FRAMES)
-            total = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-            if total > 0:
-                self.seek_var.set(pos / total * 100)
+        # Обновление положения слайдера и времени по последнему показанному кадру
+        if vp.capture is not None and self.seek_slider["state"] == "normal" and not self._scrubbing:
+            if vp.total_frames > 0:
+                self.seek_var.set(vp.current_position / vp.total_frames * 100)
 
-        if cap is not None:
-            fps = cap.get(cv2.CAP_PROP_FPS)
+        if vp.capture is not None:
+            fps = vp.source_fps
             if fps > 0:
-                current_sec = cap.get(cv2.CAP_PROP_POS_FRAMES) / fps
-                total_sec = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+                current_sec = vp.current_position / fps
+                total_sec = vp.total_frames / fps
                 self.time_label.config(
                     text=f"{self.format_time(current_sec)} / {self.format_time(total_sec)}"
                 )
 
         self.after(10, self.update_video)  # Циклическое обновление каждые 10 мс
 
+    def update_source_status(self):
+        # Состояние сетевого источника (для файлов и камер строка пустая)
+        health = self.video_processor.get_source_health()
+        status = ""
+        if health and health['state'] != STATE_CLOSED:
+            status = f"Поток: {SOURCE_STATES.get(health['state'], health['state'])}"
+            if health['state'] != STATE_STREAMING and health['last_error']:
+                status += f" ({health['last_error']})"
+        if self.source_status_var.get() != status:
+            self.source_status_var.set(status)
+
+    def show_frame(self, frame):
+        # Вывод BGR-кадра в метку видео
+        if frame is None:
+            return
+        with self.video_processor.metrics.time('display'):
+            image = self._display.update(frame)
+            if self._photo is None or (self._photo.width(), self._photo.height()) != image.size:
+                self._photo = ImageTk.PhotoImage(image=image)
+                self.video_label.configure(image=self._photo)
+            else:
+                self._photo.paste(image)
+
     def update_info(self):
         # Отображение FPS и списка детекций
-        info = f"FPS: {self.video_processor.fps:.1f}\n\nОбнаруженные объекты:\n"
-        for obj in self.video_processor.get_detections_info():
-            info += f"- {obj['class']} ({obj['confidence']:.2f})\n"
-        current_time = self.video_processor.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-        classes = [obj['class'] for obj in self.video_processor.get_detections_info()]
-        self.detection_log.append((current_time, classes))
+        stats = self.video_processor.get_inference_stats()
+        stages = self.video_processor.metrics.stage_summary()
+        info = (f"FPS: {self.video_processor.fps:.1f}\n"
+                f"Инференс: {stats['frames_inferred']}, пропущено: {stats['frames_skipped']}\n")
+        if 'inference' in stages:
+            info += f"Инференс p95: {stages['inference']['p95_ms']:.0f} мс\n"
+        if self.video_processor.errors.count:
+            info += f"Сбоев обработки: {self.video_processor.errors.count}\n"
+        info += "\nОбнаруженные объекты:\n"
+        objects = self.video_processor.get_detections_info()
+        for obj in objects:
+            info += f"- {obj['label']} ({obj['confidence']:.2f})\n"
+        current_time = self.video_processor.current_timestamp
+        # Журнал ведётся по трекам, чтобы отчёт различал отдельные объекты одного класса
+        self.detection_log.append(current_time, self.video_processor.detections)
+        if self.session_id is not None:
+            self.detection_store.append(self.session_id, self.session_source, current_time,
+                                        self.video_processor.detections)
 
         self.info_text.delete(1.0, tk.END)
         self.info_text.insert(tk.END, info)
 
     def on_closing(self):
         # Закрытие приложения и остановка потока
-        self.video_processor.stop_stream()
+        if self.video_processor is not None:
+            self.video_processor.stop_stream()
+        if self.media_writer is not None:
+            self.media_writer.close()
+        if self.detection_log is not None:
+            self.detection_log.close()
+        if self.detection_store is not None:
+            self.end_session()
+            self.detection_store.close()
         self.destroy()
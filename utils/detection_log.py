@@ -0,0 +1,281 @@
+# utils/detection_log.py
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Строка таблицы детекций: номер кадра в журнале, время, класс, уверенность, рамка, трек
+DETECTION_DTYPE = np.dtype([
+    ('frame', 'i8'),
+    ('time', 'f8'),
+    ('class_id', 'i2'),
+    ('confidence', 'f4'),
+    ('box', 'f4', (4,)),
+    ('track_id', 'i4'),  # -1, если трекер не использовался
+])
+
+# Строка таблицы кадров: время кадра и число детекций на нём.
+# Пустые кадры тоже пишутся — по ним закрываются интервалы присутствия.
+FRAME_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('count', 'i4'),
+])
+
+
+class _ChunkedTable:
+    """
+    Колоночная таблица из заранее выделенных блоков фиксированного размера.
+    Заполненные блоки при превышении лимита памяти дописываются в
+    append-only файл на диске и читаются обратно через np.memmap.
+    """
+    def __init__(self, dtype: np.dtype, chunk_rows: int, spill_path_fn):
+        self.dtype = dtype
+        self.chunk_rows = chunk_rows
+        self._spill_path_fn = spill_path_fn  # Лениво создаёт путь файла выгрузки
+        self._spill_path = None
+        self._spilled_rows = 0
+        self._sealed: List[np.ndarray] = []  # Заполненные блоки в памяти
+        self._current = np.empty(chunk_rows, dtype=dtype)
+        self._fill = 0
+        self._memmap = None
+
+    def __len__(self) -> int:
+        return self._spilled_rows + sum(len(c) for c in self._sealed) + self._fill
+
+    @property
+    def memory_bytes(self) -> int:
+        return (len(self._sealed) + 1) * self.chunk_rows * self.dtype.itemsize
+
+    def append_rows(self, rows: np.ndarray) -> None:
+        offset = 0
+        while offset < len(rows):
+            take = min(len(rows) - offset, self.chunk_rows - self._fill)
+            self._current[self._fill:self._fill + take] = rows[offset:offset + take]
+            self._fill += take
+            offset += take
+            if self._fill == self.chunk_rows:
+                self._sealed.append(self._current)
+                self._current = np.empty(self.chunk_rows, dtype=self.dtype)
+                self._fill = 0
+
+    def spill_oldest(self) -> bool:
+        """
+        Переносит самый старый заполненный блок на диск. False — нечего переносить.
+        """
+        if not self._sealed:
+            return False
+        chunk = self._sealed.pop(0)
+        if self._spill_path is None:
+            self._spill_path = self._spill_path_fn()
+        with open(self._spill_path, 'ab') as f:
+            chunk.tofile(f)
+        self._spilled_rows += len(chunk)
+        self._memmap = None  # Размер файла изменился — перечитаем при следующем запросе
+        return True
+
+    def parts(self) -> List[np.ndarray]:
+        """
+        Все данные таблицы по порядку: файл на диске, блоки в памяти, текущий блок.
+        """
+        parts = []
+        if self._spilled_rows:
+            if self._memmap is None or len(self._memmap) != self._spilled_rows:
+                self._memmap = np.memmap(self._spill_path, dtype=self.dtype, mode='r',
+                                         shape=(self._spilled_rows,))
+            parts.append(self._memmap)
+        parts.extend(self._sealed)
+        if self._fill:
+            parts.append(self._current[:self._fill])
+        return parts
+
+    def select(self, field: str, lo: Optional[float], hi: Optional[float],
+               sorted_field: bool) -> np.ndarray:
+        """
+        Строки, у которых field попадает в [lo, hi]. Фильтрация идёт по
+        частям, поэтому выгруженные данные не копируются в память целиком.
+        Для отсортированного поля используется бинарный поиск.
+        """
+        pieces = []
+        for part in self.parts():
+            values = part[field]
+            if sorted_field:
+                start = 0 if lo is None else np.searchsorted(values, lo, side='left')
+                end = len(values) if hi is None else np.searchsorted(values, hi, side='right')
+                if end > start:
+                    pieces.append(np.asarray(part[start:end]))
+            else:
+                mask = np.ones(len(values), dtype=bool)
+                if lo is not None:
+                    mask &= values >= lo
+                if hi is not None:
+                    mask &= values <= hi
+                if mask.any():
+                    pieces.append(part[mask])
+        if not pieces:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+
+
+class DetectionLog:
+    """
+    Журнал детекций с ограниченным потреблением памяти.
+    Хранит для каждого кадра время и число детекций, а для каждой
+    детекции — класс, уверенность, рамку и ID трека в колоночных
+    блоках NumPy. При превышении max_memory_mb старые блоки выгружаются
+    в append-only файлы в spill_dir (по умолчанию — временный каталог).
+    """
+    def __init__(self, classes: Optional[Dict[int, str]] = None, chunk_rows: int = 65536,
+                 max_memory_mb: float = 64.0, spill_dir: Optional[str] = None):
+        self.classes = classes or {}
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._lock = threading.Lock()
+        self._frames = _ChunkedTable(FRAME_DTYPE, chunk_rows, lambda: self._spill_file('frames.bin'))
+        self._detections = _ChunkedTable(DETECTION_DTYPE, chunk_rows,
+                                         lambda: self._spill_file('detections.bin'))
+        self._last_time = -np.inf
+        self.monotonic = True  # Время кадров не убывает (нет перемоток назад)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def num_detections(self) -> int:
+        return len(self._detections)
+
+    def append(self, time_sec: float, detections: Optional[np.ndarray]) -> None:
+        """
+        Добавляет кадр с детекциями [x1, y1, x2, y2, conf, cls(, track_id)].
+        """
+        count = 0 if detections is None else len(detections)
+        with self._lock:
+            frame_index = len(self._frames)
+            if time_sec < self._last_time:
+                self.monotonic = False
+            self._last_time = time_sec
+
+            frame_row = np.empty(1, dtype=FRAME_DTYPE)
+            frame_row['time'] = time_sec
+            frame_row['count'] = count
+            self._frames.append_rows(frame_row)
+
+            if count:
+                dets = np.asarray(detections)
+                rows = np.empty(count, dtype=DETECTION_DTYPE)
+                rows['frame'] = frame_index
+                rows['time'] = time_sec
+                rows['box'] = dets[:, :4]
+                rows['confidence'] = dets[:, 4]
+                rows['class_id'] = dets[:, 5]
+                rows['track_id'] = dets[:, 6] if dets.shape[1] > 6 else -1
+                self._detections.append_rows(rows)
+            self._enforce_memory_cap()
+
+    def query(self, t0: Optional[float] = None, t1: Optional[float] = None) -> np.ndarray:
+        """
+        Возвращает структурированный массив детекций с временем в [t0, t1].
+        """
+        with self._lock:
+            return self._detections.select('time', t0, t1, self.monotonic)
+
+    def frames(self, t0: Optional[float] = None, t1: Optional[float] = None) -> np.ndarray:
+        """
+        Возвращает таблицу кадров (time, count) с временем в [t0, t1].
+        """
+        with self._lock:
+            return self._frames.select('time', t0, t1, self.monotonic)
+
+    def label(self, class_id: int, track_id: int) -> str:
+        """
+        Ключ объекта в отчёте: «person #3» для трека или «person» без трекера.
+        """
+        name = self.classes.get(int(class_id), str(int(class_id)))
+        return f"{name} #{int(track_id)}" if track_id >= 0 else name
+
+    def iter_frames(self, t0: Optional[float] = None, t1: Optional[float] = None,
+                    window: int = 65536) -> Iterator[Tuple[float, List[str]]]:
+        """
+        Итерирует кадры в формате (time_sec, [labels]), который принимает
+        utils.report.generate_report. Данные читаются окнами по window кадров.
+        """
+        with self._lock:
+            total = len(self._frames)
+        for first in range(0, total, window):
+            last = min(first + window, total) - 1
+            with self._lock:
+                frames = self._frame_window(first, last)
+                dets = self._detections.select('frame', first, last, True)
+            mask = np.ones(len(frames), dtype=bool)
+            if t0 is not None:
+                mask &= frames['time'] >= t0
+            if t1 is not None:
+                mask &= frames['time'] <= t1
+            frame_ids = np.flatnonzero(mask)
+            # Номера кадров в таблице детекций возрастают, поэтому границы ищем бинарным поиском
+            starts = np.searchsorted(dets['frame'], frame_ids + first, side='left')
+            ends = np.searchsorted(dets['frame'], frame_ids + first, side='right')
+            for frame_id, start, end in zip(frame_ids, starts, ends):
+                chunk = dets[start:end]
+                labels = [self.label(c, t) for c, t in zip(chunk['class_id'], chunk['track_id'])]
+                yield float(frames['time'][frame_id]), labels
+
+    def __iter__(self) -> Iterator[Tuple[float, List[str]]]:
+        return self.iter_frames()
+
+    def clear(self) -> None:
+        """
+        Очищает журнал и удаляет файлы выгрузки.
+        """
+        with self._lock:
+            self._remove_spill_files()
+            chunk_rows = self._frames.chunk_rows
+            self._frames = _ChunkedTable(FRAME_DTYPE, chunk_rows, lambda: self._spill_file('frames.bin'))
+            self._detections = _ChunkedTable(DETECTION_DTYPE, chunk_rows,
+                                             lambda: self._spill_file('detections.bin'))
+            self._last_time = -np.inf
+            self.monotonic = True
+
+    def close(self) -> None:
+        """
+        Освобождает ресурсы; временный каталог выгрузки удаляется.
+        """
+        self.clear()
+
+    def _frame_window(self, first: int, last: int) -> np.ndarray:
+        # Кадры с номерами first..last включительно, собранные из частей таблицы
+        pieces, offset = [], 0
+        for part in self._frames.parts():
+            lo, hi = max(first - offset, 0), min(last + 1 - offset, len(part))
+            if hi > lo:
+                pieces.append(np.asarray(part[lo:hi]))
+            offset += len(part)
+        if not pieces:
+            return np.empty(0, dtype=FRAME_DTYPE)
+        return np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+
+    def _spill_file(self, name: str) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='visionedge_log_')
+        os.makedirs(self._spill_dir, exist_ok=True)
+        return os.path.join(self._spill_dir, name)
+
+    def _remove_spill_files(self) -> None:
+        for table in (self._frames, self._detections):
+            table._memmap = None
+            if table._spill_path and os.path.exists(table._spill_path):
+                os.remove(table._spill_path)
+        if self._owns_spill_dir and self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _enforce_memory_cap(self) -> None:
+        # Выгружаем самые старые заполненные блоки, пока не уложимся в лимит
+        while self._frames.memory_bytes + self._detections.memory_bytes > self.max_memory_bytes:
+            biggest = max((self._detections, self._frames), key=lambda t: t.memory_bytes)
+            if not biggest.spill_oldest():
+                other = self._frames if biggest is self._detections else self._detections
+                if not other.spill_oldest():
+                    break
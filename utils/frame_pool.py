@@ -0,0 +1,111 @@
+# utils/frame_pool.py
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class FramePool:
+    """
+    Кольцо заранее выделенных буферов кадров. Каждый вызов next()/read()
+    отдаёт следующий буфер кольца, поэтому буфер снова перезаписывается
+    только через size кадров. Размер кольца должен быть больше числа кадров,
+    одновременно живущих в очередях и у потребителей; кто держит кадр
+    дольше, должен его скопировать. Буферы выделяются при первом проходе
+    по кольцу и при смене размера кадра, дальше память не выделяется.
+    """
+    def __init__(self, size: int = 4):
+        self.size = max(1, int(size))
+        self.allocations = 0  # Сколько раз буфер пришлось (пере)выделить
+        self._buffers: List[Optional[np.ndarray]] = [None] * self.size
+        self._index = -1
+        self._lock = threading.Lock()
+
+    def resize(self, size: int) -> None:
+        """
+        Меняет число буферов в кольце (лишние освобождаются, новые
+        выделяются при первом использовании).
+        """
+        with self._lock:
+            size = max(1, int(size))
+            self._buffers = (self._buffers + [None] * size)[:size]
+            self.size = size
+            self._index %= size
+
+    def next(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Следующий буфер кольца формы shape. Содержимое не очищается.
+        """
+        with self._lock:
+            self._index = (self._index + 1) % self.size
+            buf = self._buffers[self._index]
+            if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+                buf = np.empty(shape, dtype=dtype)
+                self._buffers[self._index] = buf
+                self.allocations += 1
+            return buf
+
+    def read(self, capture: cv2.VideoCapture) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        capture.read() в следующий буфер кольца. Пока буфер не выделен
+        (или не подходит по размеру), кадр выделяет сам декодер, и этот
+        массив становится буфером кольца.
+        """
+        return self._decode(capture.read)
+
+    def retrieve(self, capture: cv2.VideoCapture) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        То же, что read(), для кадра, уже захваченного grab().
+        """
+        return self._decode(capture.retrieve)
+
+    def clear(self) -> None:
+        """
+        Освобождает все буферы.
+        """
+        with self._lock:
+            self._buffers = [None] * self.size
+            self._index = -1
+
+    def _decode(self, method) -> Tuple[bool, Optional[np.ndarray]]:
+        with self._lock:
+            self._index = (self._index + 1) % self.size
+            index = self._index
+            buf = self._buffers[index]
+        ret, frame = method(image=buf) if buf is not None else method()
+        if ret and frame is not buf:
+            with self._lock:
+                if index < len(self._buffers):
+                    self._buffers[index] = frame
+                self.allocations += 1
+        return ret, frame
+
+
+class DisplayBuffer:
+    """
+    Постоянный RGBA-буфер для вывода BGR-кадров в интерфейс. Цвет
+    преобразуется cv2.cvtColor прямо в буфер, а PIL-изображение создаётся
+    один раз и разделяет с ним память, так что на кадр не выделяется ничего.
+    Изображение пересоздаётся только при смене размера кадра.
+    """
+    def __init__(self):
+        self.buffer: Optional[np.ndarray] = None
+        self.image: Optional[Image.Image] = None
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        return None if self.image is None else self.image.size
+
+    def update(self, frame: np.ndarray) -> Image.Image:
+        """
+        Копирует BGR-кадр в буфер и возвращает изображение над буфером.
+        Изображение действительно до следующего update().
+        """
+        h, w = frame.shape[:2]
+        if self.buffer is None or self.buffer.shape[:2] != (h, w):
+            self.buffer = np.empty((h, w, 4), dtype=np.uint8)
+            self.image = Image.frombuffer('RGBA', (w, h), self.buffer, 'raw', 'RGBA', 0, 1)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.buffer)
+        return self.image
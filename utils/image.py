@@ -0,0 +1,66 @@
+# utils/image.py
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+LETTERBOX_COLOR = (114, 114, 114)  # Цвет полей, как в ultralytics
+
+
+def letterbox(frame: np.ndarray, new_shape: Tuple[int, int],
+              color: Tuple[int, int, int] = LETTERBOX_COLOR,
+              dst: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Масштабирует кадр в new_shape = (высота, ширина) с сохранением пропорций
+    и дополняет полями. Возвращает (кадр, коэффициент масштаба, (pad_x, pad_y)).
+    Координаты исходного кадра переводятся как x' = x * scale + pad_x.
+    dst — готовый буфер формы new_shape (например, из utils.frame_pool.FramePool):
+    кадр масштабируется прямо в него и всегда возвращается dst, без выделения памяти.
+    """
+    h, w = frame.shape[:2]
+    new_h, new_w = new_shape
+    scale = min(new_h / h, new_w / w)
+    resized_w, resized_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (new_w - resized_w) / 2, (new_h - resized_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+
+    if dst is not None:
+        inner = dst[top:top + resized_h, left:left + resized_w]
+        if (resized_w, resized_h) != (w, h):
+            cv2.resize(frame, (resized_w, resized_h), dst=inner, interpolation=cv2.INTER_LINEAR)
+        else:
+            np.copyto(inner, frame)
+        if top or bottom:
+            dst[:top] = color
+            dst[top + resized_h:] = color
+        if left or right:
+            dst[top:top + resized_h, :left] = color
+            dst[top:top + resized_h, left + resized_w:] = color
+        return dst, scale, (left, top)
+
+    if (resized_w, resized_h) != (w, h):
+        frame = cv2.resize(frame, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    if top or bottom or left or right:
+        frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return frame, scale, (left, top)
+
+
+def scale_boxes(boxes: np.ndarray, scale: float, pad: Tuple[float, float],
+                shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Переводит рамки [x1, y1, x2, y2] из координат letterbox-кадра в
+    координаты исходного кадра формы shape = (высота, ширина). Изменяет на месте.
+    """
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad[0]) / scale, 0, shape[1])
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad[1]) / scale, 0, shape[0])
+    return boxes
+
+
+def project_boxes(boxes: np.ndarray, scale: float, pad: Tuple[float, float]) -> np.ndarray:
+    """
+    Обратное к scale_boxes: переводит рамки из координат исходного кадра
+    в координаты letterbox-кадра. Изменяет на месте.
+    """
+    boxes[:, [0, 2]] = boxes[:, [0, 2]] * scale + pad[0]
+    boxes[:, [1, 3]] = boxes[:, [1, 3]] * scale + pad[1]
+    return boxes
@@ -0,0 +1,238 @@
+# utils/intervals.py
+import numpy as np
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+# Значения по умолчанию совпадают с прежним поведением отчёта
+DEFAULT_MIN_DURATION = 2.0  # Минимальная длительность присутствия, с
+DEFAULT_GAP_TOLERANCE = 0.0  # Допустимый разрыв, не закрывающий интервал, с
+
+Intervals = Dict[Hashable, List[Tuple[float, float]]]
+
+
+class PresenceIntervals:
+    """
+    Инкрементальный расчёт интервалов присутствия объектов.
+    Кадры подаются по мере поступления через update(), поэтому к моменту
+    запроса отчёта интервалы уже готовы. Интервал объекта закрывается,
+    когда объект отсутствует дольше gap_tolerance секунд; его конец —
+    время последнего кадра, где объект был виден.
+    """
+    def __init__(self, gap_tolerance: float = DEFAULT_GAP_TOLERANCE):
+        self.gap_tolerance = gap_tolerance
+        self._open: Dict[Hashable, List[float]] = {}  # label -> [start, last_seen]
+        self._closed: Intervals = {}
+        # (label, start) -> время предыдущего кадра, где объекта ещё не было:
+        # по нему считается разрыв при слиянии в intervals(gap_tolerance=...)
+        self._absent_until: Dict[Tuple[Hashable, float], float] = {}
+        self._prev_time: Optional[float] = None
+
+    def update(self, time_sec: float, labels: Iterable[Hashable]) -> None:
+        """
+        Учитывает очередной кадр со списком присутствующих объектов.
+        """
+        present = set(labels)
+        for label in present:
+            interval = self._open.get(label)
+            if interval is not None and time_sec < interval[1]:
+                # Перемотка назад: прежний интервал закрываем, начинаем новый
+                self._closed.setdefault(label, []).append(tuple(interval))
+                interval = None
+            if interval is None:
+                self._open[label] = [time_sec, time_sec]
+                if self._prev_time is not None:
+                    self._absent_until[(label, time_sec)] = self._prev_time
+            else:
+                interval[1] = time_sec
+        # Закрываем отсутствующие дольше допустимого разрыва
+        if len(present) < len(self._open):
+            for label in [l for l in self._open if l not in present]:
+                start, last_seen = self._open[label]
+                # Время назад (перемотка) закрывает интервал так же, как разрыв
+                if time_sec - last_seen > self.gap_tolerance or time_sec < last_seen:
+                    del self._open[label]
+                    self._closed.setdefault(label, []).append((start, last_seen))
+        self._prev_time = time_sec
+
+    def intervals(self, min_duration: float = DEFAULT_MIN_DURATION,
+                  include_open: bool = True,
+                  gap_tolerance: Optional[float] = None) -> Intervals:
+        """
+        Возвращает интервалы не короче min_duration, по порядку начала.
+        include_open — учитывать интервалы, которые ещё не закрыты.
+        gap_tolerance — разрыв для отчёта, если он больше заданного при
+        накоплении: соседние интервалы объекта, между которыми не больше
+        gap_tolerance секунд, сливаются до отбора по длительности.
+        Меньшее значение не действует — интервалы уже слиты при update().
+        """
+        result: Intervals = {}
+        items = [(label, iv) for label, ivs in self._closed.items() for iv in ivs]
+        if include_open:
+            items.extend((label, (start, last)) for label, (start, last) in self._open.items())
+        items.sort(key=lambda item: item[1][0])
+        if gap_tolerance is not None and gap_tolerance > self.gap_tolerance:
+            items = self._merge_gaps(items, gap_tolerance)
+        for label, (start, end) in items:
+            if end - start >= min_duration:
+                result.setdefault(label, []).append((start, end))
+        return result
+
+    def _merge_gaps(self, items: List[Tuple[Hashable, Tuple[float, float]]],
+                    gap_tolerance: float) -> List[Tuple[Hashable, Tuple[float, float]]]:
+        # Разрыв — как в compute_intervals: от последнего кадра с объектом
+        # до последнего кадра без него. items отсортированы по началу;
+        # интервал после перемотки назад не сливается с предыдущим
+        merged: List[Tuple[Hashable, Tuple[float, float]]] = []
+        last: Dict[Hashable, int] = {}  # label -> индекс последнего интервала в merged
+        for label, (start, end) in items:
+            index = last.get(label)
+            if index is not None:
+                prev_start, prev_end = merged[index][1]
+                absent_until = self._absent_until.get((label, start), start)
+                if start >= prev_end and absent_until - prev_end <= gap_tolerance:
+                    merged[index] = (label, (prev_start, end))
+                    continue
+            last[label] = len(merged)
+            merged.append((label, (start, end)))
+        return merged
+
+    def finalize(self, min_duration: float = DEFAULT_MIN_DURATION) -> Intervals:
+        """
+        Закрывает все открытые интервалы и возвращает итог.
+        """
+        for label, (start, last_seen) in self._open.items():
+            self._closed.setdefault(label, []).append((start, last_seen))
+        self._open.clear()
+        return self.intervals(min_duration, include_open=False)
+
+
+def compute_intervals(frame_times: np.ndarray, det_frames: np.ndarray, det_keys: np.ndarray,
+                      min_duration: float = DEFAULT_MIN_DURATION,
+                      gap_tolerance: float = DEFAULT_GAP_TOLERANCE
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Векторизованный расчёт интервалов присутствия для больших журналов.
+    frame_times — время каждого кадра (неубывающее), det_frames — номер
+    кадра каждой детекции, det_keys — целочисленный ключ объекта (класс
+    или трек). Маски присутствия по ключам кодируются длинами серий:
+    серия прерывается, если между двумя появлениями объекта есть кадры
+    без него и они тянутся дольше gap_tolerance. Возвращает массивы
+    (keys, starts, ends) длительностью не меньше min_duration.
+    """
+    frame_times = np.asarray(frame_times, dtype=np.float64)
+    det_frames = np.asarray(det_frames, dtype=np.int64)
+    det_keys = np.asarray(det_keys, dtype=np.int64)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    if len(det_frames) == 0:
+        return empty
+
+    # Уникальные пары (ключ, кадр), отсортированные по ключу, затем по кадру
+    if np.all(det_frames[1:] >= det_frames[:-1]):
+        # Журнал уже упорядочен по кадрам — достаточно устойчивой сортировки по ключу
+        order = np.argsort(det_keys, kind='stable')
+    else:
+        order = np.lexsort((det_frames, det_keys))
+    keys = det_keys[order]
+    frames = det_frames[order]
+    unique = np.ones(len(keys), dtype=bool)
+    unique[1:] = (keys[1:] != keys[:-1]) | (frames[1:] != frames[:-1])
+    keys, frames = keys[unique], frames[unique]
+
+    # Граница серии: смена ключа или пропуск кадров длиннее допустимого разрыва
+    prev, nxt = frames[:-1], frames[1:]
+    skipped = nxt > prev + 1
+    gap = frame_times[np.maximum(nxt - 1, 0)] - frame_times[prev]
+    breaks = (keys[1:] != keys[:-1]) | (skipped & (gap > gap_tolerance))
+
+    starts_idx = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+    ends_idx = np.concatenate((np.flatnonzero(breaks), [len(frames) - 1]))
+    starts = frame_times[frames[starts_idx]]
+    ends = frame_times[frames[ends_idx]]
+    keep = ends - starts >= min_duration
+    return keys[starts_idx][keep], starts[keep], ends[keep]
+
+
+def log_to_arrays(detection_log: Iterable[Tuple[float, Sequence[Hashable]]]
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Hashable]]:
+    """
+    Преобразует журнал вида [(time_sec, [labels]), ...] в массивы для
+    compute_intervals. Возвращает (frame_times, det_frames, det_keys, labels),
+    где labels[key] — исходная метка объекта.
+    """
+    times, det_frames, det_keys = [], [], []
+    key_of: Dict[Hashable, int] = {}
+    for index, (time_sec, labels) in enumerate(detection_log):
+        times.append(time_sec)
+        for label in labels:
+            key = key_of.get(label)
+            if key is None:
+                key = key_of[label] = len(key_of)
+            det_frames.append(index)
+            det_keys.append(key)
+    labels = [None] * len(key_of)
+    for label, key in key_of.items():
+        labels[key] = label
+    return (np.asarray(times, dtype=np.float64), np.asarray(det_frames, dtype=np.int64),
+            np.asarray(det_keys, dtype=np.int64), labels)
+
+
+def presence_arrays(detection_log) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[int, Hashable]]]:
+    """
+    Журнал в виде массивов для compute_intervals: (frame_times, det_frames,
+    det_keys, labels), где labels[key] — метка объекта. Подходит
+    DetectionLog (по колонкам) и список (time_sec, [labels]). Для
+    PresenceIntervals и журналов с немонотонным временем возвращает None:
+    их интервалы считаются потоково.
+    """
+    if isinstance(detection_log, PresenceIntervals):
+        return None
+    if hasattr(detection_log, 'query'):
+        if not detection_log.monotonic:
+            return None
+        frames = detection_log.frames()
+        rows = detection_log.query()
+        # Ключ объекта: класс в старших 32 битах, трек — в младших
+        keys = (rows['class_id'].astype(np.int64) << 32) | (rows['track_id'].astype(np.int64) & 0xFFFFFFFF)
+        labels = {}
+        for key in np.unique(keys):
+            track_id = int(key) & 0xFFFFFFFF
+            if track_id >= 1 << 31:
+                track_id -= 1 << 32
+            labels[int(key)] = detection_log.label(int(key) >> 32, track_id)
+        return frames['time'], rows['frame'], keys, labels
+    times, det_frames, det_keys, key_labels = log_to_arrays(detection_log)
+    if np.any(np.diff(times) < 0):
+        return None
+    return times, det_frames, det_keys, dict(enumerate(key_labels))
+
+
+def intervals_from_log(detection_log, min_duration: float = DEFAULT_MIN_DURATION,
+                       gap_tolerance: float = DEFAULT_GAP_TOLERANCE) -> Intervals:
+    """
+    Интервалы присутствия для любого журнала: PresenceIntervals (готовые
+    инкрементальные интервалы), DetectionLog (векторизованно по колонкам)
+    или список (time_sec, [labels]) (векторизованно после преобразования).
+    Журналы с немонотонным временем (после перемоток назад) считаются
+    потоково, в порядке записи. Для PresenceIntervals gap_tolerance
+    действует, только если он больше заданного при накоплении.
+    """
+    if isinstance(detection_log, PresenceIntervals):
+        return detection_log.intervals(min_duration, gap_tolerance=gap_tolerance)
+    if not hasattr(detection_log, 'query'):
+        detection_log = list(detection_log)
+    arrays = presence_arrays(detection_log)
+    if arrays is None:
+        return _streaming_intervals(detection_log, min_duration, gap_tolerance)
+    frame_times, det_frames, det_keys, labels = arrays
+    out_keys, starts, ends = compute_intervals(frame_times, det_frames, det_keys,
+                                               min_duration, gap_tolerance)
+    result: Intervals = {}
+    for i in np.argsort(starts, kind='stable'):
+        result.setdefault(labels[int(out_keys[i])], []).append((float(starts[i]), float(ends[i])))
+    return result
+
+
+def _streaming_intervals(detection_log, min_duration: float, gap_tolerance: float) -> Intervals:
+    tracker = PresenceIntervals(gap_tolerance)
+    for time_sec, labels in detection_log:
+        tracker.update(time_sec, labels)
+    return tracker.finalize(min_duration)
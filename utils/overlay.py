@@ -0,0 +1,59 @@
+# utils/overlay.py
+import cv2
+import numpy as np
+from typing import Dict, Optional
+
+# Палитра BGR-цветов для классов (повторяется по кругу)
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+]
+
+
+class OverlayRenderer:
+    """
+    Лёгкая отрисовка рамок детекций средствами cv2.
+    Вместо results.plot() рисует прямо в заранее выделенный буфер,
+    который переиспользуется между кадрами (два буфера попеременно,
+    чтобы предыдущий показанный кадр не перезаписывался сразу).
+    """
+    def __init__(self, classes: Optional[Dict[int, str]] = None, thickness: int = 2, font_scale: float = 0.5):
+        self.classes = classes or {}
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self._buffers = [None, None]
+        self._current = 0
+
+    def _next_buffer(self, frame: np.ndarray) -> np.ndarray:
+        self._current ^= 1
+        buf = self._buffers[self._current]
+        if buf is None or buf.shape != frame.shape or buf.dtype != frame.dtype:
+            buf = np.empty_like(frame)
+            self._buffers[self._current] = buf
+        np.copyto(buf, frame)
+        return buf
+
+    def draw(self, frame: np.ndarray, detections: np.ndarray) -> np.ndarray:
+        """
+        Возвращает копию кадра с рамками и подписями.
+        detections — массив [x1, y1, x2, y2, conf, cls] или [..., track_id].
+        """
+        canvas = self._next_buffer(frame)
+        for det in detections:
+            x1, y1, x2, y2, conf, cls_id = det[:6]
+            cls_id = int(cls_id)
+            color = PALETTE[cls_id % len(PALETTE)]
+            p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+            cv2.rectangle(canvas, p1, p2, color, self.thickness, cv2.LINE_AA)
+
+            label = f"{self.classes.get(cls_id, cls_id)} {conf:.2f}"
+            if len(det) > 6:  # Детекция от трекера: добавляем ID трека
+                label = f"{self.classes.get(cls_id, cls_id)} #{int(det[6])} {conf:.2f}"
+            (tw, th), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, 1)
+            top = max(p1[1] - th - baseline, 0)
+            cv2.rectangle(canvas, (p1[0], top), (p1[0] + tw, top + th + baseline), color, -1)
+            cv2.putText(canvas, label, (p1[0], top + th), cv2.FONT_HERSHEY_SIMPLEX,
+                        self.font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+        return canvas
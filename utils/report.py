@@ -1,67 +1,446 @@
 # utils/report.py
+import argparse
+import os
+import sys
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-import os
+from utils.intervals import (PresenceIntervals, compute_intervals, intervals_from_log, presence_arrays,
+                             DEFAULT_MIN_DURATION, DEFAULT_GAP_TOLERANCE)
+
+FONT_NAME = 'DejaVuSans'
+FONT_PATH = os.path.join(os.path.dirname(__file__), 'fonts', 'DejaVuSans.ttf')
+TIMELINE_BINS = 288  # Ячеек временной шкалы (для суток — по 5 минут)
+DETAIL_COLUMNS = 3  # Колонок в перечне интервалов
+MARGIN = 40
+LINE = 11  # Высота строки перечня, pt
+
+_font_lock = threading.Lock()
+
+
+def register_font() -> str:
+    """
+    Регистрирует TTF-шрифт с кириллицей один раз на процесс
+    (разбор TTF занимает заметное время) и возвращает его имя.
+    """
+    with _font_lock:
+        if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+            if not os.path.isfile(FONT_PATH):
+                raise FileNotFoundError(f"TTF-файл шрифта не найден: {FONT_PATH}")
+            pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    return FONT_NAME
+
+
+def object_class(label: Hashable) -> str:
+    """
+    Класс объекта по метке: «person #3» -> «person».
+    """
+    return str(label).split(' #', 1)[0]
+
+
+def format_time(sec: float) -> str:
+    sec = max(0.0, float(sec))
+    hours, rest = divmod(sec, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{int(hours)}:{int(minutes):02d}:{seconds:05.2f}"
+    return f"{int(minutes)}:{seconds:05.2f}"
+
+
+class ReportSummary:
+    """
+    Данные отчёта в массивах: интервалы присутствия объектов (ключ, начало,
+    конец), сводка по классам и временная шкала присутствия по ячейкам.
+    Сводка по классу: число появлений (интервалов), суммарное время
+    присутствия, пиковое число одновременно видимых объектов класса,
+    первое и последнее появление.
+    """
+    def __init__(self, labels: Dict[int, Hashable], keys: np.ndarray, starts: np.ndarray,
+                 ends: np.ndarray, t_start: float, t_end: float, frames: int = 0,
+                 frame_peaks: Optional[Dict[str, int]] = None, bins: int = TIMELINE_BINS):
+        self.labels = labels
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.t_start = float(t_start)
+        self.t_end = max(float(t_end), self.t_start)
+        self.frames = frames
+
+        # Класс каждого интервала
+        key_classes = {key: object_class(label) for key, label in labels.items()}
+        unique_keys, inverse = np.unique(self.keys, return_inverse=True)
+        names = sorted(set(key_classes[int(k)] for k in unique_keys))
+        class_index = {name: i for i, name in enumerate(names)}
+        key_index = np.array([class_index[key_classes[int(k)]] for k in unique_keys], dtype=np.int64)
+        self.interval_classes = key_index[inverse].reshape(-1)
+        self.objects = len(unique_keys)
+        durations = self.ends - self.starts
+        counts = np.bincount(self.interval_classes, minlength=len(names))
+        dwell = np.bincount(self.interval_classes, weights=durations, minlength=len(names))
+
+        self.aggregates: Dict[str, Dict[str, float]] = {}
+        for i, name in enumerate(names):
+            mask = self.interval_classes == i
+            peak = self._interval_peak(self.starts[mask], self.ends[mask])
+            if frame_peaks is not None:
+                peak = max(peak, frame_peaks.get(name, 0))
+            self.aggregates[name] = {
+                'count': int(counts[i]),
+                'dwell': float(dwell[i]),
+                'peak': int(peak),
+                'first': float(self.starts[mask].min()),
+                'last': float(self.ends[mask].max()),
+            }
+        # Классы по убыванию времени присутствия
+        self.classes = sorted(names, key=lambda n: -self.aggregates[n]['dwell'])
+        self.edges, self.timeline = self._timeline(names, max(1, int(bins)))
+
+    @staticmethod
+    def _interval_peak(starts: np.ndarray, ends: np.ndarray) -> int:
+        # Наибольшее число пересекающихся интервалов: начала +1, концы -1;
+        # при равном времени начало учитывается раньше конца (концы включительно)
+        if not len(starts):
+            return 0
+        times = np.concatenate((starts, ends))
+        deltas = np.concatenate((np.ones(len(starts)), -np.ones(len(ends))))
+        order = np.lexsort((-deltas, times))
+        return int(np.cumsum(deltas[order]).max())
+
+    def _timeline(self, names: List[str], bins: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        # Среднее число присутствующих объектов класса в каждой ячейке:
+        # покрытие C(t) = Σ по интервалам длины их части до t считается на
+        # границах ячеек через отсортированные начала/концы и кумулятивные суммы
+        span = max(self.t_end - self.t_start, 1e-9)
+        edges = self.t_start + np.linspace(0.0, span, bins + 1)
+        width = span / bins
+        timeline = {}
+        for i, name in enumerate(names):
+            mask = self.interval_classes == i
+            starts, ends = np.sort(self.starts[mask]), np.sort(self.ends[mask])
+            coverage = np.zeros(bins + 1)
+            for values, sign in ((starts, 1.0), (ends, -1.0)):
+                n = np.searchsorted(values, edges, side='left')
+                total = np.concatenate(([0.0], np.cumsum(values)))
+                coverage += sign * (edges * n - total[n])
+            timeline[name] = np.clip(np.diff(coverage) / width, 0.0, None)
+        return edges, timeline
+
+    def iter_intervals(self) -> Iterator[Tuple[Hashable, float, float]]:
+        """
+        Интервалы по объектам (объекты — по первому появлению), внутри — по времени.
+        """
+        if not len(self.keys):
+            return
+        order = np.lexsort((self.starts, self.keys))
+        keys = self.keys[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        group_start = self.starts[order][first]
+        group_id = np.cumsum(first) - 1
+        order = order[np.lexsort((self.starts[order], group_start[group_id]))]
+        for i in order:
+            yield self.labels[int(self.keys[i])], float(self.starts[i]), float(self.ends[i])
+
+
+def summarize(detection_log, min_duration: float = DEFAULT_MIN_DURATION,
+              gap_tolerance: float = DEFAULT_GAP_TOLERANCE, bins: int = TIMELINE_BINS) -> ReportSummary:
+    """
+    Сводка журнала для отчёта. DetectionLog и списки кадров считаются
+    по колонкам, а пиковая одновременность — по числу детекций класса
+    на одном кадре. Для PresenceIntervals и журналов с перемотками
+    назад доступны только интервалы, пик считается по их пересечениям.
+    """
+    if not hasattr(detection_log, 'query') and not isinstance(detection_log, PresenceIntervals):
+        detection_log = list(detection_log)
+    arrays = presence_arrays(detection_log)
+    if arrays is None:
+        intervals = intervals_from_log(detection_log, min_duration, gap_tolerance)
+        labels = dict(enumerate(intervals))
+        keys = np.array([k for k, ivs in enumerate(intervals.values()) for _ in ivs], dtype=np.int64)
+        pairs = np.array([iv for ivs in intervals.values() for iv in ivs], dtype=np.float64).reshape(-1, 2)
+        t_start = pairs[:, 0].min() if len(pairs) else 0.0
+        t_end = pairs[:, 1].max() if len(pairs) else 0.0
+        return ReportSummary(labels, keys, pairs[:, 0], pairs[:, 1], t_start, t_end, bins=bins)
+
+    frame_times, det_frames, det_keys, labels = arrays
+    keys, starts, ends = compute_intervals(frame_times, det_frames, det_keys, min_duration, gap_tolerance)
+
+    # Пик по кадрам: наибольшее число детекций класса на одном кадре
+    names = sorted(set(object_class(label) for label in labels.values()))
+    frame_peaks: Dict[str, int] = {}
+    if len(det_keys):
+        class_index = {name: i for i, name in enumerate(names)}
+        unique_keys, inverse = np.unique(det_keys, return_inverse=True)
+        key_class = np.array([class_index[object_class(labels[int(k)])] for k in unique_keys])
+        codes = np.asarray(det_frames, dtype=np.int64) * len(names) + key_class[inverse]
+        codes, counts = np.unique(codes, return_counts=True)
+        peaks = np.zeros(len(names), dtype=np.int64)
+        np.maximum.at(peaks, codes % len(names), counts)
+        frame_peaks = dict(zip(names, peaks.tolist()))
+    t_start = float(frame_times[0]) if len(frame_times) else 0.0
+    t_end = float(frame_times[-1]) if len(frame_times) else 0.0
+    return ReportSummary(labels, keys, starts, ends, t_start, t_end, len(frame_times), frame_peaks, bins)
+
 
-def generate_report(detection_log, output_path):
+class _PdfWriter:
     """
-    Сгенерировать PDF отчет на основе detection_log.
-    detection_log: list of tuples (time_sec, [classes])
+    Страничная вёрстка отчёта. reportlab держит содержимое всех готовых
+    страниц в памяти до save() и сжимает их только при записи файла,
+    поэтому память растёт с числом страниц (в основном — перечня
+    интервалов; details=False оставляет только сводку и шкалу).
+    От длины журнала она не зависит: рисуются уже посчитанные интервалы.
+    """
+    def __init__(self, output_path: str):
+        self.font = register_font()
+        self.canvas = canvas.Canvas(output_path, pagesize=letter, pageCompression=1)
+        self.width, self.height = letter
+        self.pages = 0
+        self.y = self.height - MARGIN
+
+    def new_page(self) -> None:
+        if self.pages:
+            self.canvas.showPage()
+        self.pages += 1
+        self.y = self.height - MARGIN
+        self.canvas.setFont(self.font, 8)
+        self.canvas.drawRightString(self.width - MARGIN, MARGIN / 2, str(self.pages))
+
+    def ensure(self, height: float) -> None:
+        # Новая страница, если до нижнего поля не помещается height
+        if self.pages == 0 or self.y - height < MARGIN:
+            self.new_page()
+
+    def heading(self, text: str, size: int = 13) -> None:
+        self.ensure(size + 30)
+        self.y -= size + 6
+        self.canvas.setFont(self.font, size)
+        self.canvas.drawString(MARGIN, self.y, text)
+        self.y -= 8
+
+    def save(self) -> None:
+        if self.pages == 0:
+            self.new_page()
+        self.canvas.save()
+
+
+def _draw_summary(pdf: _PdfWriter, summary: ReportSummary, title: str) -> None:
+    pdf.new_page()
+    c = pdf.canvas
+    pdf.y -= 16
+    c.setFont(pdf.font, 16)
+    c.drawString(MARGIN, pdf.y, title)
+    pdf.y -= 20
+    c.setFont(pdf.font, 10)
+    period = (f"Период: {format_time(summary.t_start)} – {format_time(summary.t_end)} "
+              f"({format_time(summary.t_end - summary.t_start)})")
+    if summary.frames:
+        period += f", кадров: {summary.frames}"
+    c.drawString(MARGIN, pdf.y, period)
+    pdf.y -= 14
+    c.drawString(MARGIN, pdf.y, f"Объектов: {summary.objects}, "
+                                f"интервалов присутствия: {len(summary.keys)}")
+
+    pdf.heading("Сводка по классам")
+    columns = [(MARGIN, "Класс", None), (MARGIN + 150, "Появлений", 'count'),
+               (MARGIN + 230, "Присутствие", 'dwell'), (MARGIN + 320, "Пик", 'peak'),
+               (MARGIN + 370, "Первое", 'first'), (MARGIN + 450, "Последнее", 'last')]
+
+    def header():
+        c.setFont(pdf.font, 9)
+        for x, name, _ in columns:
+            c.drawString(x, pdf.y, name)
+        c.line(MARGIN, pdf.y - 3, pdf.width - MARGIN, pdf.y - 3)
+        pdf.y -= LINE + 3
+
+    header()
+    for name in summary.classes:
+        if pdf.y < MARGIN + LINE:
+            pdf.new_page()
+            header()
+        stats = summary.aggregates[name]
+        c.setFont(pdf.font, 9)
+        for x, _, field in columns:
+            if field is None:
+                value = name
+            elif field in ('dwell', 'first', 'last'):
+                value = format_time(stats[field])
+            else:
+                value = str(stats[field])
+            c.drawString(x, pdf.y, value)
+        pdf.y -= LINE
+
+
+def _draw_timeline(pdf: _PdfWriter, summary: ReportSummary) -> None:
+    # Полоса на класс: оттенок ячейки — среднее число объектов класса в ней,
+    # нормированное на максимум класса. Соседние ячейки одного оттенка
+    # рисуются одним прямоугольником
+    if not summary.classes:
+        return
+    c = pdf.canvas
+    lane, label_width = 12, 90
+    left = MARGIN + label_width
+    chart_width = pdf.width - MARGIN - left
+    bins = len(summary.edges) - 1
+
+    def axis():
+        c.setFont(pdf.font, 7)
+        c.setFillGray(0)
+        for i in range(5):
+            x = left + chart_width * i / 4
+            t = summary.edges[0] + (summary.edges[-1] - summary.edges[0]) * i / 4
+            c.drawCentredString(x, pdf.y, format_time(t).split('.')[0])
+        pdf.y -= 6
+
+    pdf.heading("Временная шкала присутствия")
+    axis()
+    for name in summary.classes:
+        if pdf.y - lane < MARGIN:
+            pdf.new_page()
+            axis()
+        y = pdf.y - lane
+        c.setFillGray(0)
+        c.setFont(pdf.font, 8)
+        c.drawString(MARGIN, y + 3, name[:18])
+        c.setStrokeGray(0.8)
+        c.rect(left, y, chart_width, lane - 2, stroke=1, fill=0)
+        values = summary.timeline[name]
+        top = values.max()
+        if top > 0:
+            shades = np.round(values / top * 8).astype(np.int64)  # 8 уровней оттенка
+            change = np.flatnonzero(np.diff(shades)) + 1
+            for start, end in zip(np.concatenate(([0], change)), np.concatenate((change, [bins]))):
+                if shades[start]:
+                    c.setFillGray(0.9 - 0.7 * shades[start] / 8)
+                    c.rect(left + chart_width * start / bins, y, chart_width * (end - start) / bins,
+                           lane - 2, stroke=0, fill=1)
+        pdf.y -= lane
+    c.setFillGray(0)
+
+
+def _draw_intervals(pdf: _PdfWriter, summary: ReportSummary) -> None:
+    # Перечень интервалов в несколько колонок; строки формируются по мере
+    # вывода, а страница закрывается, как только заполнена
+    if not len(summary.keys):
+        return
+    c = pdf.canvas
+    pdf.heading("Интервалы присутствия")
+    column_width = (pdf.width - 2 * MARGIN) / DETAIL_COLUMNS
+    column, top = 0, pdf.y
+    y = top
+    current = None
+    for label, start, end in summary.iter_intervals():
+        lines = [] if label == current else [(True, f"Объект: {label}")]
+        lines.append((False, f"{format_time(start)} – {format_time(end)}"))
+        current = label
+        for bold, text in lines:
+            if y < MARGIN + LINE:
+                column += 1
+                if column == DETAIL_COLUMNS:
+                    pdf.new_page()
+                    column, top = 0, pdf.y
+                y = top
+            x = MARGIN + column * column_width + (0 if bold else 10)
+            c.setFont(pdf.font, 9 if bold else 8)
+            c.drawString(x, y, text)
+            y -= LINE
+
+
+def generate_report(detection_log, output_path, min_duration=DEFAULT_MIN_DURATION,
+                    gap_tolerance=DEFAULT_GAP_TOLERANCE, bins: int = TIMELINE_BINS,
+                    details: bool = True, title: str = "Отчет по детекции объектов") -> ReportSummary:
+    """
+    Сгенерировать PDF отчет на основе detection_log: сводка по классам
+    (появления, время присутствия, пик одновременно видимых объектов),
+    временная шкала присутствия и перечень интервалов (details=False — без него).
+    detection_log: list of tuples (time_sec, [labels]), где label — класс
+    или, при включённом трекере, класс с ID трека («person #3»);
+    подходит и utils.detection_log.DetectionLog (и журнал сессии из базы
+    детекций), а также уже посчитанные utils.intervals.PresenceIntervals
     output_path: path to save pdf
-    Отчёт включает объекты, которые были в кадре >2 секунд.
+    min_duration: минимальная длительность присутствия, с (по умолчанию 2)
+    gap_tolerance: разрыв, не прерывающий интервал, с (по умолчанию 0)
+    bins: число ячеек временной шкалы
+    Возвращает посчитанную сводку.
+    """
+    summary = summarize(detection_log, min_duration, gap_tolerance, bins)
+    pdf = _PdfWriter(output_path)
+    _draw_summary(pdf, summary, title)
+    _draw_timeline(pdf, summary)
+    if details:
+        _draw_intervals(pdf, summary)
+    pdf.save()
+    return summary
+
+
+def _session_report(db_path: str, session: int, source: Optional[str], output_path: str,
+                    options: Dict[str, Any]) -> str:
+    # Выполняется в процессе пула: своё соединение с базой только для чтения,
+    # шрифт регистрируется один раз на процесс
+    from core.detection_store import DetectionReader
+    reader = DetectionReader(db_path)
+    try:
+        title = f"Отчет по сессии {session}" + (f", {source}" if source else "")
+        generate_report(reader.log(session, source), output_path, title=title, **options)
+    finally:
+        reader.close()
+    return output_path
+
+
+def generate_session_reports(db_path: str, output_dir: str, sessions: Optional[Sequence[int]] = None,
+                             source: Optional[str] = None, workers: Optional[int] = None,
+                             **options) -> List[str]:
     """
-    # Регистрируем шрифт с поддержкой кириллицы
-    font_name = 'DejaVuSans'
-    font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'DejaVuSans.ttf')
-    if not os.path.isfile(font_path):
-        raise FileNotFoundError(f"TTF-файл шрифта не найден: {font_path}")
-    pdfmetrics.registerFont(TTFont(font_name, font_path))
-
-    # Сгруппируем интервалы присутствия по классу
-    intervals = {}
-    seen = {}
-    prev_time = {}
-
-    for time_sec, classes in detection_log:
-        for cls in classes:
-            if cls not in seen:
-                seen[cls] = time_sec
-        # Закрываем интервал для отсутствующих
-        for cls in list(seen.keys()):
-            if cls not in classes:
-                start = seen.pop(cls)
-                end = prev_time.get(cls, time_sec)
-                if end - start >= 2:
-                    intervals.setdefault(cls, []).append((start, end))
-        prev_time = {cls: time_sec for cls in classes}
-
-    # Закрываем оставшиеся интервалы
-    for cls, start in seen.items():
-        end = prev_time.get(cls, start)
-        if end - start >= 2:
-            intervals.setdefault(cls, []).append((start, end))
-
-    # Создаем PDF
-    c = canvas.Canvas(output_path, pagesize=letter)
-    width, height = letter
-    y = height - 50
-    c.setFont(font_name, 16)
-    c.drawString(50, y, "Отчет по детекции объектов")
-    y -= 30
-    c.setFont(font_name, 12)
-
-    for cls, ivs in intervals.items():
-        c.drawString(50, y, f"Объект: {cls}")
-        y -= 20
-        for start, end in ivs:
-            c.drawString(70, y, f"С {start:.2f}s до {end:.2f}s")
-            y -= 15
-        y -= 10
-        if y < 100:
-            c.showPage()
-            y = height - 50
-            c.setFont(font_name, 12)
-
-    c.save()
\ No newline at end of file
+    Отчёты по многим сессиям базы детекций (по умолчанию — по всем),
+    каждый в своём процессе пула из workers процессов. Файлы называются
+    session_<id>.pdf; options передаются в generate_report.
+    База только читается; если её нет — FileNotFoundError.
+    Возвращает пути в порядке сессий.
+    """
+    from core.detection_store import DetectionReader
+    reader = DetectionReader(db_path)
+    try:
+        if sessions is None:
+            sessions = [s['id'] for s in reader.sessions()]
+    finally:
+        reader.close()
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(db_path, int(s), source, os.path.join(output_dir, f"session_{int(s)}.pdf"), options)
+            for s in sessions]
+    if not jobs:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        return [_session_report(*job) for job in jobs]
+    # spawn: процессы не наследуют потоки записи и соединения SQLite родителя
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn')) as pool:
+        futures = [pool.submit(_session_report, *job) for job in jobs]
+        return [f.result() for f in futures]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from core.detection_store import DETECTIONS_DB_PATH
+    parser = argparse.ArgumentParser(prog='python -m utils.report',
+                                     description="PDF-отчёты по сессиям базы детекций")
+    parser.add_argument('--db', default=DETECTIONS_DB_PATH, help="База детекций")
+    parser.add_argument('--out', default='reports', help="Каталог для отчётов")
+    parser.add_argument('--sessions', help="ID сессий через запятую (по умолчанию все)")
+    parser.add_argument('--source', help="Только этот источник")
+    parser.add_argument('--workers', type=int, help="Процессов (по умолчанию по числу ядер)")
+    parser.add_argument('--no-details', action='store_true', help="Без перечня интервалов")
+    args = parser.parse_args(argv)
+    sessions = [int(s) for s in args.sessions.split(',')] if args.sessions else None
+    paths = generate_session_reports(args.db, args.out, sessions, args.source, args.workers,
+                                     details=not args.no_details)
+    for path in paths:
+        print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())